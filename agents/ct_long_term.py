@@ -29,14 +29,13 @@ class CTLongTermAgent(Agent):
         self.lst_symbol = token_symbol
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.lst_symbol)
+        vault = self.market.vault
 
-        lst_info = self.blockchain.tokens[self.lst_symbol]
-        lst_yield = lst_info.get('yield_per_block', 0.0)
+        lst_yield = self.market.yield_per_block
 
         expected_lst_yield = lst_yield * self.blockchain.num_blocks
 
-        ct_price = self.blockchain.get_amm(f'CT_{self.lst_symbol}').price_of_one_token_in_eth()
+        ct_price = self.market.ct_amm.price_of_one_token_in_eth()
         fixed_yield = 1 - ct_price
 
         risk_premium = fixed_yield - expected_lst_yield
@@ -45,10 +44,10 @@ class CTLongTermAgent(Agent):
             weighted_volume = buying_intent(
                 risk_premium, base_volume=1, threshold=self.percentage_threshold, growth_rate=3
             )
-            volume_to_buy = min(weighted_volume, self.wallet.eth_balance)
+            volume_to_buy = min(self.scaled_intent(weighted_volume), self.wallet.eth_balance)
             vault.ct_eth_amm.swap_eth_for_token(wallet=self.wallet, amount_eth=volume_to_buy)
 
-            self.log_action(f'Bought CT with {volume_to_buy:.4f} ETH')
+            self.log_action('Bought CT with {:.4f} ETH', volume_to_buy)
             self.log_trade({
                 'block': block_number,
                 'agent': self.name,
@@ -61,6 +60,12 @@ class CTLongTermAgent(Agent):
                     'percentage_threshold': self.percentage_threshold
                 },
             })
+        else:
+            # the premium only clears the threshold once CT gets cheaper
+            self.idle_until(
+                token=self.market.ct.name,
+                below=1 - expected_lst_yield - self.percentage_threshold,
+            )
 
         # CT selling not handled explicitly by this agent; handled by CT speculation agents.
 
@@ -55,7 +55,7 @@ class CTShortTermAgent(Agent):
         self.buying_pressure  = min(max(self.buying_pressure, 0.1), 5.0)
 
         self.log_action(
-            f"Adj buying_pressure → {self.buying_pressure:.3f} (profit {profit:+.2f} ETH)"
+            "Adj buying_pressure → {:.3f} (profit {:+.2f} ETH)", self.buying_pressure, profit
         )
 
     # ------------------------------------------------------------------
@@ -66,14 +66,17 @@ class CTShortTermAgent(Agent):
 
         # --- cool-down guard ------------------------------------------
         if block_number - self._last_trade_block < self.COOLDOWN_BLOCKS:
+            # nothing to do until the cool-down ends or the next re-tune
+            self.idle_until(block=min(
+                self._last_trade_block + self.COOLDOWN_BLOCKS,
+                (block_number // 100 + 1) * 100,
+            ))
             return
 
-        vault        = self.blockchain.get_vault(self.token_symbol)
+        vault        = self.market.vault
         ct_price     = vault.ct_eth_amm.price_of_one_token_in_eth()
         ds_price     = vault.ds_eth_amm.price_of_one_token_in_eth()
-        native_yield = self.blockchain.tokens[self.lst_symbol].get(
-            "yield_per_block", 0.0
-        )
+        native_yield = self.market.yield_per_block
 
         # ARP + slope
         arp = calculate_arp(
@@ -101,19 +104,19 @@ class CTShortTermAgent(Agent):
 
             volume_to_buy = min(notional_eth, self.wallet.eth_balance)
             vault.ct_eth_amm.swap_eth_for_token(self.wallet, volume_to_buy)
-            self.log_action(f"Bought CT for {volume_to_buy:.1f} ETH")
+            self.log_action("Bought CT for {:.1f} ETH", volume_to_buy)
 
             # repay borrowed CT if any
             borrowed = self.blockchain.borrowed_token.get(
                 self.wallet, {}
             ).get(f"CT_{self.token_symbol}", 0.0)
             repay = min(borrowed,
-                        self.wallet.token_balance(f"CT_{self.token_symbol}"))
+                        self.wallet.token_balance(self.market.ct))
             if repay:
                 self.blockchain.repay_token(
                     self.wallet, f"CT_{self.token_symbol}", repay
                 )
-                self.log_action(f"Repaid {repay:.1f} CT")
+                self.log_action("Repaid {:.1f} CT", repay)
 
             self.log_trade({
                 "block":  block_number,
@@ -134,17 +137,17 @@ class CTShortTermAgent(Agent):
             if notional_eth < self.MIN_TRADE_ETH:
                 return
 
-            current_ct  = self.wallet.token_balance(f"CT_{self.token_symbol}")
+            current_ct  = self.wallet.token_balance(self.market.ct)
             need_borrow = max(target_ct - current_ct, 0)
 
             if need_borrow:
                 self.blockchain.borrow_token(
                     self.wallet, f"CT_{self.token_symbol}", need_borrow
                 )
-                self.log_action(f"Borrowed {need_borrow:.1f} CT")
+                self.log_action("Borrowed {:.1f} CT", need_borrow)
 
             vault.ct_eth_amm.swap_token_for_eth(self.wallet, target_ct)
-            self.log_action(f"Sold {target_ct:.1f} CT")
+            self.log_action("Sold {:.1f} CT", target_ct)
 
             self.log_trade({
                 "block":  block_number,
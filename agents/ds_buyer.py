@@ -8,23 +8,23 @@ class DSBuyerAgent(Agent):
         self.token_symbol = token_symbol
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
         # Step 1: Buy DS with 1 ETH
         amount_eth_to_buy_ds = 1.0
-        self.log_action(f'Starting to buy DS with {amount_eth_to_buy_ds:.4f} ETH')
+        self.log_action('Starting to buy DS with {:.4f} ETH', amount_eth_to_buy_ds)
         vault.buy_ds(self.wallet, amount_eth_to_buy_ds)
-        self.log_action(f'Bought DS with {amount_eth_to_buy_ds:.4f} ETH')
+        self.log_action('Bought DS with {:.4f} ETH', amount_eth_to_buy_ds)
 
         # Step 2: Print balance after DS purchase
-        ds_balance = self.wallet.token_balance(f'DS_{self.token_symbol}')
-        self.log_action(f'Balance after DS purchase: {ds_balance:.4f} DS')
+        ds_balance = self.wallet.token_balance(self.market.ds)
+        self.log_action('Balance after DS purchase: {:.4f} DS', ds_balance)
 
         # Step 3: Sell DS back, rounded down to a full int for better debugging
         amount_ds_to_sell = int(ds_balance)
-        self.log_action(f'Starting to sell {amount_ds_to_sell:.4f} DS')
+        self.log_action('Starting to sell {:.4f} DS', amount_ds_to_sell)
         vault.sell_ds(self.wallet, amount_ds_to_sell)
-        self.log_action(f'Sold {amount_ds_to_sell:.4f} DS')
+        self.log_action('Sold {:.4f} DS', amount_ds_to_sell)
 
         # Step 4: Print balance after DS sale
         eth_balance_after_sale = self.wallet.eth_balance
-        self.log_action(f'Balance after DS sale: {eth_balance_after_sale:.4f} ETH')
+        self.log_action('Balance after DS sale: {:.4f} ETH', eth_balance_after_sale)
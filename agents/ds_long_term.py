@@ -31,25 +31,26 @@ class DSLongTermAgent(Agent):
     # Core loop
     # ------------------------------------------------------------------
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
 
         ds_price = vault.ds_eth_amm.price_of_one_token_in_eth()
         lst_price = vault.lst_eth_amm.price_of_one_token_in_eth()
 
         lst_yield_per_block = (
-            self.blockchain.tokens[self.lst_symbol].get("yield_per_block", 0.0)
+            self.market.yield_per_block
             * self.blockchain.num_blocks
         )
 
         buying_intent = self.calculate_buying_intent(ds_price, lst_yield_per_block)
-        amount_eth_to_buy_ds = (
-            buying_intent * self.wallet.eth_balance * self.buying_pressure
+        amount_eth_to_buy_ds = self.scaled_intent(
+            buying_intent * self.wallet.eth_balance * self.buying_pressure,
+            cap=self.wallet.eth_balance,
         )
 
         # ---------- BUY DS (guarded) ----------
         if amount_eth_to_buy_ds > 0:
             try:
-                self.log_action(f"Trying to buy DS with {amount_eth_to_buy_ds:.4f} ETH")
+                self.log_action("Trying to buy DS with {:.4f} ETH", amount_eth_to_buy_ds)
                 vault.buy_ds(self.wallet, amount_eth_to_buy_ds)
                 self.log_action("   ✔ buy succeeded")
                 self.log_trade(
@@ -68,22 +69,32 @@ class DSLongTermAgent(Agent):
                     }
                 )
             except ValueError as err:
-                self.log_action(f"   ✖ buy skipped ({err})")
+                self.log_action("   ✖ buy skipped ({})", err)
 
         # ---------- SELL DS on de-peg (guarded) ----------
         self.lst_price_history.append(lst_price)
 
+        if amount_eth_to_buy_ds <= 0 and lst_price > self.depeg_threshold:
+            # nothing to buy (no yield, no ETH or no buying pressure; the
+            # intent itself is never 0 unless it underflows), and nothing to
+            # sell until the LST de-pegs.  The yield only changes on events,
+            # which wake every agent, and the ETH balance only through this
+            # agent's own trades; the DS price may end an underflow.
+            self.idle_until(token=self.lst_symbol, below=self.depeg_threshold,
+                            watch=(vault.ds_eth_amm,))
+            return
+
         if lst_price <= self.depeg_threshold:
-            ds_balance = self.wallet.token_balance(f"DS_{self.token_symbol}")
+            ds_balance = self.wallet.token_balance(self.market.ds)
             extended_depeg_increase = self.count_consecutive_under_threshold(
                 self.lst_price_history, self.depeg_threshold
             )
-            amount_ds_to_sell = int(ds_balance * extended_depeg_increase * 0.1)
+            amount_ds_to_sell = int(self.scaled_intent(ds_balance * extended_depeg_increase * 0.1))
             amount_ds_to_sell = min(amount_ds_to_sell, ds_balance)
 
             if amount_ds_to_sell > 0:
                 try:
-                    self.log_action(f"Trying to sell {amount_ds_to_sell:.4f} DS")
+                    self.log_action("Trying to sell {:.4f} DS", amount_ds_to_sell)
                     vault.sell_ds(self.wallet, amount_ds_to_sell)
                     self.log_action("   ✔ sell succeeded")
                     self.log_trade(
@@ -102,7 +113,7 @@ class DSLongTermAgent(Agent):
                         }
                     )
                 except ValueError as err:
-                    self.log_action(f"   ✖ sell skipped ({err})")
+                    self.log_action("   ✖ sell skipped ({})", err)
 
     # ------------------------------------------------------------------
     # Helper functions
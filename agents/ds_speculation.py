@@ -6,6 +6,9 @@ from agents.utils.trigger_calculations import detect_sharp_decline, calculate_ar
 
 
 class DSShortTermAgent(Agent):
+    # Number of recent ARP values the slope detection looks at
+    ARP_WINDOW = 10
+
     def __init__(self, token_symbol: str, threshold=0.01, name: str = None):
         agent_name = name if name else f'DSShortTermAgent for {token_symbol}'
         super().__init__(agent_name)
@@ -15,11 +18,10 @@ class DSShortTermAgent(Agent):
         self.threshold = threshold
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
 
         ds_price = vault.ds_eth_amm.price_of_one_token_in_eth()
-        lst_info = self.blockchain.tokens[self.lst_symbol]
-        native_yield = lst_info.get('yield_per_block', 0.0)
+        native_yield = self.market.yield_per_block
 
         arp = calculate_arp(ds_price, native_yield, self.blockchain.num_blocks, self.blockchain.current_block)
 
@@ -28,7 +30,7 @@ class DSShortTermAgent(Agent):
         if len(self.arp_history) >= 3:
             sharp_decline, sharp_incline, ewa_slope = detect_sharp_decline(
                 self.arp_history,
-                n=10,
+                n=self.ARP_WINDOW,
                 alpha=0.3,
                 decline_threshold=-self.threshold,
                 incline_threshold=self.threshold
@@ -44,7 +46,7 @@ class DSShortTermAgent(Agent):
             if corrected_volume > 0:
                 try:
                     vault.buy_ds(self.wallet, corrected_volume)
-                    self.log_action(f'Bought DS with {corrected_volume:.4f} ETH')
+                    self.log_action('Bought DS with {:.4f} ETH', corrected_volume)
                     self.log_trade({
                         'block': block_number,
                         'agent': self.name,
@@ -52,7 +54,7 @@ class DSShortTermAgent(Agent):
                         'volume': corrected_volume,
                         'action': 'buy',
                         'reason': 'sharp decline',
-                        'additional_info': {'arp': arp, 'ewa_slope': ewa_slope, 'arp_history': self.arp_history}
+                        'additional_info': {'arp': arp, 'ewa_slope': ewa_slope, 'arp_history': self.arp_history[-self.ARP_WINDOW:]}
                     })
                 except ValueError:
                     pass
@@ -63,7 +65,7 @@ class DSShortTermAgent(Agent):
             if corrected_volume > 0:
                 try:
                     vault.sell_ds(self.wallet, corrected_volume)
-                    self.log_action(f'Sold {corrected_volume:.4f} DS')
+                    self.log_action('Sold {:.4f} DS', corrected_volume)
                     self.log_trade({
                         'block': block_number,
                         'agent': self.name,
@@ -71,7 +73,7 @@ class DSShortTermAgent(Agent):
                         'volume': corrected_volume / ds_price,
                         'action': 'sell',
                         'reason': 'sharp incline',
-                        'additional_info': {'arp': arp, 'ewa_slope': ewa_slope, 'arp_history': self.arp_history}
+                        'additional_info': {'arp': arp, 'ewa_slope': ewa_slope, 'arp_history': self.arp_history[-self.ARP_WINDOW:]}
                     })
                 except ValueError:
                     pass
\ No newline at end of file
@@ -26,16 +26,15 @@ class LoopingAgent(Agent):
         self.lltv = lltv
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
 
         self.borrow_rate += self.borrow_rate_changes.get(block_number, 0.0)
 
         ds_price = vault.ds_eth_amm.price_of_one_token_in_eth()
-        lst_info = self.blockchain.tokens[self.token_symbol]
-        native_yield = lst_info.get('yield_per_block', 0.0)
+        native_yield = self.market.yield_per_block
         total_yield = native_yield * (self.blockchain.num_blocks - self.blockchain.current_block)
 
-        amm = self.blockchain.get_amm(self.token_symbol)
+        amm = self.market.lst_amm
         lst_price_in_eth = amm.price_of_one_token_in_eth()    
         
         if (ds_price < (total_yield - self.borrow_rate)) and (self.wallet.eth_balance > 0.1):
@@ -53,7 +52,7 @@ class LoopingAgent(Agent):
             })
 
             vault.buy_ds(self.wallet, token_purchase_volume * ds_price)
-            self.log_action(f'Bought DS with {token_purchase_volume:.4f} ETH')
+            self.log_action('Bought DS with {:.4f} ETH', token_purchase_volume)
             self.log_trade({
                 'block': block_number,
                 'agent': self.name,
@@ -12,16 +12,16 @@ class LstMaximalist(Agent):
         self.lst_symbol = lst_symbol
 
     def on_block_mined(self, block_number: int):
-        amm = self.blockchain.get_amm(self.lst_symbol)
+        amm = self.market.lst_amm
 
         lst_price_in_eth = amm.price_of_one_token_in_eth()
 
         try:
             amm.swap_eth_for_token(self.wallet, lst_price_in_eth)
-            self.log_action(f'bought one {self.lst_symbol} with {lst_price_in_eth:.4f} ETH')
+            self.log_action('bought one {} with {:.4f} ETH', self.lst_symbol, lst_price_in_eth)
 
             amm.add_liquidity(self.wallet, 1, lst_price_in_eth)
-            self.log_action(f'added liquidity to ETH/{self.lst_symbol} with 1 ETH and {lst_price_in_eth:.4f} LST')
+            self.log_action('added liquidity to ETH/{} with 1 ETH and {:.4f} LST', self.lst_symbol, lst_price_in_eth)
 
         except ValueError:
-            self.log_action(f'no more ETH, would ❤️ to buy more.')
\ No newline at end of file
+            self.log_action('no more ETH, would ❤️ to buy more.')
\ No newline at end of file
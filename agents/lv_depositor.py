@@ -15,10 +15,9 @@ class LVDepositorAgent(Agent):
         self.expected_apy = expected_apy
         
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
 
-        lst_info = self.blockchain.tokens[self.token_symbol]
-        native_yield = lst_info.get('yield_per_block', 0.0)
+        native_yield = self.market.yield_per_block
 
         annualized_yield = native_yield * self.blockchain.num_blocks
 
@@ -26,15 +25,15 @@ class LVDepositorAgent(Agent):
 
         if yield_margin > self.yield_margin_threshold:
             deposit_amount = buying_intent(yield_margin, base_volume=1, threshold=0.25, growth_rate=3)
-            deposit_amount = min(deposit_amount, self.wallet.eth_balance)
+            deposit_amount = min(self.scaled_intent(deposit_amount), self.wallet.eth_balance)
             vault.deposit_eth(self.wallet, deposit_amount)
-            self.log_action(f'Deposited {deposit_amount} ETH into LV')
+            self.log_action('Deposited {} ETH into LV', deposit_amount)
 
         if yield_margin < native_yield:
             redeem_amount = self.wallet.lpt_balance(self.token_symbol)
             if redeem_amount > 0:
                 vault.withdraw_lp_tokens(self.wallet, redeem_amount)
-                self.log_action(f'Redeemed {redeem_amount} LV tokens')
+                self.log_action('Redeemed {} LV tokens', redeem_amount)
                 self.log_trade({
                     'block': block_number,
                     'agent': self.name,
@@ -4,10 +4,7 @@
 # redemption
 #immediately after purchase
 
-import math
-import numpy as np
-import pandas as pd
-
+from agents.utils.volume_calculations import maximize_profit
 from simulator.agent import Agent
 
 class RedemptionArbitrageAgent(Agent):
@@ -29,51 +26,27 @@ class RedemptionArbitrageAgent(Agent):
     --------
     on_block_mined():
         This method is called when a new block is mined. The agent evaluates the current prices of DS and LST tokens.
-        If the combined price of DS and LST is less than 1, it initiates the buy and redeem process.
+        If the combined price of DS and LST plus the redemption fee is less than 1, it sizes and executes one trade.
 
         - Evaluates the price of DS and LST on the AMM.
-        - Calculates the buying intent based on the depeg margin (i.e., how far DS + LST is from 1).
-        - Executes balanced buys of DS and LST tokens using the ETH wallet balance.
+        - Sizes the trade with `size_trade`.
+        - Buys DS through the vault and exactly as much LST on the AMM.
         - Immediately redeems the purchased DS and LST tokens for 1 ETH through the Peg Stability Module.
+        - Rolls the trade back if it turned out not to be profitable.
 
-    buying_intent_increasing_below_1(margin, base_volume=1, threshold=1, growth_rate=3):
-        Calculates the agent's buying intent based on the margin below 1. The closer DS + LST is to zero,
-        the stronger the intent, but the value is normalized to stay between 0 and 1.
-
-        Parameters:
-        ----------
-        margin : float
-            The margin as a decimal representing how far the combined price of DS and LST is from 1 (e.g., 0.2 for 20%).
-        base_volume : float, optional
-            The base volume of buying intent (default is 1).
-        threshold : float, optional
-            The margin threshold where buying intent is maximized (default is 1).
-        growth_rate : float, optional
-            The rate at which the buying intent grows as the margin decreases (default is 3).
+    size_trade(ds_price, lst_price_in_eth, redemption_fee):
+        Calculates the ETH to spend on DS that maximizes the profit of the trade.
 
-        Returns:
-        -------
-        float
-            The normalized buying intent, a value between 0 and 1.
-
-    calculate_ds_lst_amount(balance_in_eth, ds_price, lst_price, spending_percentage):
-        Calculates the amounts of DS and LST tokens to buy using a specified percentage of the ETH balance.
-
-        Parameters:
-        ----------
-        balance_in_eth : float
-            The current ETH balance available in the wallet.
-        ds_price : float
-            The price of one DS token in ETH.
-        lst_price : float
-            The price of one LST token in ETH.
-        spending_percentage : float
-            The percentage of the ETH balance to spend on buying DS and LST tokens (between 0 and 100).
+        Each LST bought redeems, with one DS, for `1 - redemption_fee` ETH. The vault mints DS with CT and
+        sells the CT, so a DS costs at least `ds_price / (ds_price + ct_price)` through it and `AMM.optimal_amount_in` (closed form on UniswapV2 pools, bisection on
+        YieldSpace pools) bounds the pairs worth buying. Within that bound the vault leg is quoted with
+        `Vault.calculate_buy_ds_outcome` and the LST leg with `AMM.get_input_amount`, and the profit is
+        maximized by a bounded bisection (`maximize_profit`) over the sizes whose two legs fit the balance.
 
         Returns:
         -------
-        tuple
-            A tuple containing the amounts of DS and LST tokens to be bought.
+        float
+            The ETH to spend on DS (0 if there is no profitable trade).
     """
     def __init__(self, name, token_symbol: str):
         super().__init__(name) 
@@ -82,120 +55,120 @@ class RedemptionArbitrageAgent(Agent):
         self.lst_symbol = token_symbol
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
+        vault = self.market.vault
         # buys in case of depeg when  LST+DS < 1
         # evaluate current price of DS at AMM
         ds_price = vault.ds_eth_amm.price_of_one_token_in_eth()
         # evaluate current price of LST at AMM
-        amm = self.blockchain.get_amm(self.lst_symbol)
-        lst_price_in_eth = amm.price_of_one_token_in_eth()    
+        amm = self.market.lst_amm
+        lst_price_in_eth = amm.price_of_one_token_in_eth()
 
-        # get psm 
-        psm = self.blockchain.get_psm(self.token_symbol)
+        # get psm
+        psm = self.market.psm
 
         # get redemption fee from psm
         redemption_fee = psm.redemption_fee
-        
-        if (lst_price_in_eth + ds_price + redemption_fee) < 1:
-            # determine buying intent 
-            # buying intent is scaled between 0 and 1
-            buying_intent = self.buying_intent_increasing_below_1(lst_price_in_eth + ds_price + redemption_fee)
-
-            # we need to balance the available ETH in wallet
-            # in order for the trade to work the agents needs to buy the same amount of DS & LST
-            # also we need to consider wallet balance
-            token_count = self.calculate_ds_lst_amount(self.wallet.eth_balance, ds_price, lst_price_in_eth, buying_intent*100)
-
-            ds_amount_in_eth = token_count * ds_price
-
-            if vault.calculate_buy_ds_outcome(ds_amount_in_eth) == 0:
-                return
-
-            vault.buy_ds(self.wallet, ds_amount_in_eth)
-
-            self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'DS', 
-                    'volume': ds_amount_in_eth, 
-                    'action': 'buy', 
-                    'reason': 'lst_price_in_eth + ds_price < 1',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-
-            # buys LST in the background to redeem
-            lst_amount_in_eth = token_count * lst_price_in_eth
-            amm.swap_eth_for_token(self.wallet, lst_amount_in_eth)
-
-            self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'LST', 
-                    'volume': lst_amount_in_eth, 
-                    'action': 'buy', 
-                    'reason': 'Match DS buy',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-
-            # immediately redeem LST+DS for 1 ETH
-            # this is happening on the Peg Stability Module
-            # get the peg stability module PSM
-            psm = self.blockchain.get_psm(self.token_symbol)
-            # get the current block number
-            block = self.blockchain.current_block
-
-            # we lose on fees and slippage when doing the above trades
-            # so we determine resulting amounts in wallet and sell all
-
-            lst_balance = self.wallet.token_balances[self.token_symbol]
-            ds_balance = self.wallet.token_balances[f"DS_{self.token_symbol}"]
-
-            redemption_amount = min(
-                lst_balance,
-                ds_balance
-            )
-
-            psm.redeem_with_token_and_ds(
-                self.wallet, 
-                redemption_amount,
-                block)
-            
-            self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'ETH', 
-                    'volume': redemption_amount, 
-                    'action': 'redeem', 
-                    'reason': 'Immediate Redeem after purchase',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-
-
-    def buying_intent_increasing_below_1(self, margin, base_volume=1, threshold=1, growth_rate=3):
+
+        if (lst_price_in_eth + ds_price + redemption_fee) >= 1:
+            # no spread until one of the two pools moves
+            self.idle_until(watch=(amm, vault.ds_eth_amm))
+            return
+
+        ds_amount_in_eth = self.size_trade(ds_price, lst_price_in_eth, redemption_fee)
+        if ds_amount_in_eth <= 0:
+            return
+
+        # the legs were quoted one at a time; keep the trade only if the whole of it pays
+        try:
+            with self.blockchain.transaction() as txn:
+                _, lst_amount_in_eth, redemption_amount, profit = self.buy_and_redeem(ds_amount_in_eth, block_number)
+                if profit <= 0:
+                    txn.rollback()
+        except ValueError:
+            return
+        if profit <= 0:
+            return
+
+        self.log_trade({
+                'block': block_number,
+                'agent': self.name,
+                'token': 'DS',
+                'volume': ds_amount_in_eth,
+                'action': 'buy',
+                'reason': 'lst_price_in_eth + ds_price < 1',
+                'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+                })
+
+        self.log_trade({
+                'block': block_number,
+                'agent': self.name,
+                'token': 'LST',
+                'volume': lst_amount_in_eth,
+                'action': 'buy',
+                'reason': 'Match DS buy',
+                'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+                })
+
+        self.log_trade({
+                'block': block_number,
+                'agent': self.name,
+                'token': 'ETH',
+                'volume': redemption_amount,
+                'action': 'redeem',
+                'reason': 'Immediate Redeem after purchase',
+                'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+                })
+
+    def size_trade(self, ds_price: float, lst_price_in_eth: float, redemption_fee: float) -> float:
         """
-        Calculate normalized buying intent (between 0 and 1) based on a percentage margin using an exponential function.
-        The intent increases as the margin goes below the threshold (1), but will not exceed 1.
-        
-        Parameters:
-        margin (float): The margin as a decimal (e.g., 0.2 for 20%).
-        base_volume (float): The baseline volume of buying intent (default is 1).
-        threshold (float): The margin threshold where buying intent is maximized (default is 1).
-        growth_rate (float): The rate at which the intent grows exponentially below the threshold (default is 3).
+        The ETH to spend on DS that maximizes the profit of buying DS and LST and redeeming them.
 
-        Returns:
-        float: Normalized buying intent between 0 and 1.
+        :param ds_price: The price of one DS in ETH.
+        :param lst_price_in_eth: The price of one LST in ETH.
+        :param redemption_fee: The redemption fee of the PSM.
+        :return: The ETH to spend on DS (0 if there is no profitable trade).
+        """
+        amm = self.market.lst_amm
+        vault = self.market.vault
+        balance = self.wallet.eth_balance
+        # ETH a redemption pays for one LST, net of the least the DS it needs can cost
+        ct_price = vault.ct_eth_amm.price_of_one_token_in_eth()
+        lst_value = 1 - redemption_fee - ds_price / (ds_price + ct_price)
+        lst_amount_in_eth = amm.optimal_amount_in(lst_value, 'eth_to_token', balance)
+        if lst_amount_in_eth <= 0:
+            return 0.0
+        # no more pairs than these pay, and a trade that pays spends less than the
+        # `1 - redemption_fee` ETH a pair redeems for on its DS
+        max_pairs = amm.get_expected_output_amount(lst_amount_in_eth, 'eth_to_token')
+        max_amount = min(balance, max_pairs * (1 - redemption_fee))
+
+        def profit(ds_amount_in_eth):
+            ds_bought = vault.calculate_buy_ds_outcome(ds_amount_in_eth)
+            if ds_bought <= 0:
+                return None
+            lst_cost = amm.get_input_amount(ds_bought, 'eth_to_token')
+            if ds_amount_in_eth + lst_cost > balance:
+                return None
+            return ds_bought * (1 - redemption_fee) - ds_amount_in_eth - lst_cost
+
+        ds_amount_in_eth, _ = maximize_profit(profit, max_amount)
+        return ds_amount_in_eth
+
+    def buy_and_redeem(self, ds_amount_in_eth: float, block_number: int):
+        """
+        Buy DS with `ds_amount_in_eth` through the vault, buy as much LST on the AMM and
+        redeem the pairs at the PSM.
+
+        :return: `(ds_amount_in_eth, lst_amount_in_eth, redemption_amount, profit)`, with the
+                 profit in ETH.
         """
-        if margin >= threshold:
-            return 0
-        else:
-            # Use a logistic function or similar to scale the output between 0 and 1
-            intent = base_volume * math.exp(growth_rate * (threshold - margin))
-            # Normalize the intent to be between 0 and 1
-            return 1 - (1 / (1 + intent))
-
-        
-    def calculate_ds_lst_amount(self, balance_in_eth, ds_price, lst_price, spending_percentage):
-        amount_to_spend = (spending_percentage / 100) * balance_in_eth
-        combined_price = ds_price + lst_price
-        token_count = amount_to_spend // combined_price
-        return token_count
\ No newline at end of file
+        market = self.market
+        eth_before = self.wallet.eth_balance
+        ds_bought = market.vault.buy_ds(self.wallet, ds_amount_in_eth)
+        lst_amount_in_eth = market.lst_amm.get_input_amount(ds_bought, 'eth_to_token')
+        lst_bought = market.lst_amm.swap_eth_for_token(self.wallet, lst_amount_in_eth)
+
+        # immediately redeem LST+DS for 1 ETH on the Peg Stability Module
+        redemption_amount = min(ds_bought, lst_bought)
+        market.psm.redeem_with_token_and_ds(self.wallet, redemption_amount, block_number)
+        return ds_amount_in_eth, lst_amount_in_eth, redemption_amount, self.wallet.eth_balance - eth_before
@@ -1,11 +1,6 @@
-import math
-import numpy as np
-import pandas as pd
-
+from agents.utils.volume_calculations import maximize_profit
 from simulator.agent import Agent
 
-from agents.utils.volume_calculations import buying_intent_increasing_above_1
-
 class RepurchaseArbitrageAgent(Agent):
     def __init__(self, name, token_symbol: str):
         super().__init__(name) 
@@ -14,77 +9,138 @@ class RepurchaseArbitrageAgent(Agent):
         self.lst_symbol = token_symbol
 
     def on_block_mined(self, block_number: int):
-        vault = self.blockchain.get_vault(self.token_symbol)
-        
+        vault = self.market.vault
+
         # evaluate current price of DS at AMM
         ds_price = vault.ds_eth_amm.price_of_one_token_in_eth()
         # evaluate current price of LST at AMM
-        amm = self.blockchain.get_amm(self.lst_symbol)
-        lst_price_in_eth = amm.price_of_one_token_in_eth()  
+        amm = self.market.lst_amm
+        lst_price_in_eth = amm.price_of_one_token_in_eth()
 
-        psm = self.blockchain.get_psm(self.token_symbol)
+        psm = self.market.psm
 
         repurchase_fee = psm.repurchase_fee
 
-        if (lst_price_in_eth + ds_price) > (1+repurchase_fee):
-            # determine buying intent and amount
-            buying_intent = buying_intent_increasing_above_1(lst_price_in_eth + ds_price-repurchase_fee)
-            
-            # calculate potential amount to buy
-            potential_amount = buying_intent * self.wallet.eth_balance
-
-            # check availability of tokens in PSM
-            token_reserve = psm.token_reserve
-
-            transaction_amount = min(self.wallet.eth_balance, token_reserve)
-
-            if transaction_amount > 0:
-                # this agent buys LST & DS directly from the peg stability module PSM
-                # price for both together at PSM is always 1
-                # get the peg stability module PSM
-
-                transaction_amount = psm.repurchase_token_and_ds(self.wallet, transaction_amount)
-
-                self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'LST',
-                    'volume': transaction_amount  * lst_price_in_eth,
-                    'action': 'Repurchase from PSM',
-                    'reason': 'lst_price_in_eth + ds_price > 1',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-
-                self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'DS', 
-                    'volume': transaction_amount * ds_price, 
-                    'action': 'Repurchase from PSM', 
-                    'reason': 'lst_price_in_eth + ds_price > 1',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-
-                # sell both at market rates (expected to be higher than 1 ETH for a pair)
-                vault.sell_ds(self.wallet, transaction_amount)
-                amm.swap_token_for_eth(self.wallet, transaction_amount)
-
-                self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'DS', 
-                    'volume': transaction_amount * ds_price, 
-                    'action': 'sell', 
-                    'reason': 'Immediate Sell at Market after Repurchase',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
-                
-                self.log_trade({
-                    'block': block_number,
-                    'agent': self.name,
-                    'token': 'LST', 
-                    'volume': transaction_amount * lst_price_in_eth, 
-                    'action': 'sell', 
-                    'reason': 'Immediate Sell at Market after Repurchase',
-                    'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
-                    })
+        if (lst_price_in_eth + ds_price) <= (1+repurchase_fee):
+            # no spread until one of the two pools moves
+            self.idle_until(watch=(amm, vault.ds_eth_amm))
+            return
+
+        amount_eth = self.size_trade(repurchase_fee)
+        if amount_eth <= 0:
+            return
+
+        # this agent buys LST & DS directly from the peg stability module PSM
+        # price for both together at PSM is always 1, then sells both at
+        # market rates (expected to be higher than 1 ETH for a pair);
+        # the legs were quoted one at a time, so keep the trade only if the whole of it pays
+        try:
+            with self.blockchain.transaction() as txn:
+                transaction_amount, profit = self.repurchase_and_sell(amount_eth)
+                if profit <= 0:
+                    txn.rollback()
+        except ValueError:
+            return
+        if profit <= 0:
+            return
+
+        self.log_trade({
+            'block': block_number,
+            'agent': self.name,
+            'token': 'LST',
+            'volume': transaction_amount  * lst_price_in_eth,
+            'action': 'Repurchase from PSM',
+            'reason': 'lst_price_in_eth + ds_price > 1',
+            'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+            })
+
+        self.log_trade({
+            'block': block_number,
+            'agent': self.name,
+            'token': 'DS',
+            'volume': transaction_amount * ds_price,
+            'action': 'Repurchase from PSM',
+            'reason': 'lst_price_in_eth + ds_price > 1',
+            'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+            })
+
+        self.log_trade({
+            'block': block_number,
+            'agent': self.name,
+            'token': 'DS',
+            'volume': transaction_amount * ds_price,
+            'action': 'sell',
+            'reason': 'Immediate Sell at Market after Repurchase',
+            'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+            })
+
+        self.log_trade({
+            'block': block_number,
+            'agent': self.name,
+            'token': 'LST',
+            'volume': transaction_amount * lst_price_in_eth,
+            'action': 'sell',
+            'reason': 'Immediate Sell at Market after Repurchase',
+            'additional_info': {'lst_price_in_eth': lst_price_in_eth, 'ds_price': ds_price}
+            })
+
+    def size_trade(self, repurchase_fee: float) -> float:
+        """
+        The ETH to spend on a repurchase that maximizes the profit of selling the LST and DS it returns.
+
+        Each pair costs `1 / (1 - repurchase_fee)` ETH at the PSM and its DS sells through the vault
+        for less than the `1 - redemption_fee` ETH the PSM pays for a CT and DS pair, so
+        `AMM.optimal_amount_in` (closed form on UniswapV2 pools, bisection on YieldSpace pools) bounds
+        the pairs worth repurchasing. Within that bound the repurchase and the DS sale are quoted by
+        running them and rolling them back (the sale redeems at the PSM the repurchase just paid), the
+        LST sale with `AMM.get_expected_output_amount`, and the profit is maximized by a bounded
+        bisection (`maximize_profit`).
+
+        :param repurchase_fee: The repurchase fee of the PSM.
+        :return: The ETH to spend (0 if there is no profitable trade).
+        """
+        amm = self.market.lst_amm
+        psm = self.market.psm
+        # pairs the balance can buy and the PSM can deliver
+        max_tokens = min(self.wallet.eth_balance * (1 - repurchase_fee), psm.token_reserve)
+        # ETH cost of one LST, net of the most its DS can sell for
+        lst_cost = 1 / (1 - repurchase_fee) - (1 - psm.redemption_fee)
+        if lst_cost <= 0:
+            tokens = max_tokens
+        else:
+            tokens = amm.optimal_amount_in(1 / lst_cost, 'token_to_eth', max_tokens)
+
+        def profit(tokens):
+            try:
+                _, eth_spent = self.blockchain.dry_run(self.repurchase_and_sell_ds, tokens / (1 - repurchase_fee))
+            except ValueError:
+                return None
+            return amm.get_expected_output_amount(tokens, 'token_to_eth') - eth_spent
+
+        tokens, _ = maximize_profit(profit, tokens)
+        return tokens / (1 - repurchase_fee)
+
+    def repurchase_and_sell_ds(self, amount_eth: float):
+        """
+        Repurchase LST and DS with `amount_eth` from the PSM and sell the DS through the vault.
+
+        :return: `(transaction_amount, eth_spent)`: the tokens repurchased and the ETH spent net
+                 of what the DS sold for.
+        """
+        market = self.market
+        eth_before = self.wallet.eth_balance
+        transaction_amount = market.psm.repurchase_token_and_ds(self.wallet, amount_eth)
+        market.vault.sell_ds(self.wallet, transaction_amount)
+        return transaction_amount, eth_before - self.wallet.eth_balance
+
+    def repurchase_and_sell(self, amount_eth: float):
+        """
+        Repurchase LST and DS with `amount_eth` from the PSM, sell the DS through the vault
+        and the LST on the AMM.
+
+        :return: `(transaction_amount, profit)`: the tokens repurchased and the profit in ETH.
+        """
+        eth_before = self.wallet.eth_balance
+        transaction_amount, _ = self.repurchase_and_sell_ds(amount_eth)
+        self.market.lst_amm.swap_token_for_eth(self.wallet, transaction_amount)
+        return transaction_amount, self.wallet.eth_balance - eth_before
@@ -35,3 +35,57 @@ def buying_intent_increasing_above_1(value, base_volume=1, growth_rate=3):
     else:
         # Scale the exponential to approach 1 as the value increases
         return 1 - math.exp(-growth_rate * (value - 1))
+
+
+# Bisection steps of maximize_profit, and its difference step relative to the range
+SIZING_ITERATIONS = 12
+SIZING_STEP = 1e-7
+
+
+def maximize_profit(profit, max_amount, iterations=SIZING_ITERATIONS):
+    """
+    Find the trade size in [0, max_amount] that maximizes a profit function.
+
+    `profit(amount)` must return None where the trade cannot be made (e.g. it
+    does not fit the balance), and be concave where it can.  The optimum is
+    the last size at which the profit still grows, found by bisection on the
+    sign of a forward difference.  A trade of nothing makes no profit, so if
+    the smallest size does not pay there is no trade and no bisection.
+
+    Parameters:
+    profit (callable): The profit of a trade of `amount`, or None.
+    max_amount (float): The largest size to consider.
+    iterations (int): Bisection steps.
+
+    Returns:
+    tuple: (amount, profit) of the best trade, (0.0, 0.0) if no size is profitable.
+    """
+    if max_amount <= 0:
+        return 0.0, 0.0
+    step = max_amount * SIZING_STEP
+
+    def growing(amount):
+        here = profit(amount)
+        if here is None:
+            return False
+        ahead = profit(amount + step)
+        return ahead is not None and ahead > here
+
+    smallest = profit(step)
+    if smallest is None or smallest <= 0:
+        return 0.0, 0.0
+    low, high = 0.0, max_amount - step
+    if growing(high):
+        low = high
+    else:
+        for _ in range(iterations):
+            middle = (low + high) / 2
+            if growing(middle):
+                low = middle
+            else:
+                high = middle
+
+    best = profit(low) if low > 0 else None
+    if best is None or best <= 0:
+        return 0.0, 0.0
+    return low, best
@@ -1,10 +1,29 @@
 # analysis.py ─────────────────────────────────────────────────────────
+import random
+import time
+
 import pandas as pd
 
+# Defaults of the calibration runs (the dashboard's defaults)
+CALIBRATION_CAPITAL = {"Yield Seeker (LP)": 5_000, "Hedge Fund": 3_000, "Arbitrage Desk": 2_000}
+CALIBRATION_CFG = dict(
+    token="stETH",
+    initial_eth=100.0,
+    blocks=500,
+    eth_yield=0.00001,
+    lst_yield=0.04 / 365,
+    amm_eth=50_000.0,
+    amm_token=50_000.0,
+    amm_fee=0.02,
+)
+
 def summarize(tokens_df: pd.DataFrame, psms_df: pd.DataFrame | None, peg=1.0):
     """
     tokens_df : chain.stats['tokens']
     psms_df   : chain.stats['psms']   (may be None)
+
+    Without recorded tables use chain.metrics.summary(), which streams the
+    same numbers during mining.
     """
     price = tokens_df["price"].values
     min_p = price.min()
@@ -23,3 +42,47 @@ def summarize(tokens_df: pd.DataFrame, psms_df: pd.DataFrame | None, peg=1.0):
         blocks_under_peg=under,
         psm_drawdown_pct=float(draw_pct),
     )
+
+
+def calibration_report(block_steps=(10, 25, 50), scenarios=None, depeg_pct=0.1,
+                       capital_map=None, cfg=None, seed=0) -> pd.DataFrame:
+    """
+    Error of coarse runs (cfg["block_step"] = k) against the block-by-block
+    run of the same config, for the bundled scenarios.
+
+    One row per (scenario, block_step, summary metric) with the fine and
+    coarse values, the absolute and relative error, and the speed-up of the
+    coarse run.  Every run starts from the same random seed.
+    """
+    from runner import run_simulation
+    from scenarios import SCENARIOS
+
+    capital_map = capital_map or CALIBRATION_CAPITAL
+    cfg = {**CALIBRATION_CFG, **(cfg or {})}
+
+    def run(scenario, block_step):
+        random.seed(seed)
+        started = time.perf_counter()
+        summary = run_simulation(
+            scenario, depeg_pct, capital_map, {**cfg, "block_step": block_step}
+        )["summary"]
+        return summary, time.perf_counter() - started
+
+    rows = []
+    for scenario in scenarios or list(SCENARIOS):
+        fine, fine_seconds = run(scenario, 1)
+        for block_step in block_steps:
+            coarse, coarse_seconds = run(scenario, block_step)
+            for metric, fine_value in fine.items():
+                error = coarse[metric] - fine_value
+                rows.append(dict(
+                    scenario=scenario,
+                    block_step=block_step,
+                    metric=metric,
+                    fine=fine_value,
+                    coarse=coarse[metric],
+                    abs_error=abs(error),
+                    rel_error=abs(error) / abs(fine_value) if fine_value else float("nan"),
+                    speedup=fine_seconds / coarse_seconds if coarse_seconds else float("nan"),
+                ))
+    return pd.DataFrame(rows)
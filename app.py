@@ -102,9 +102,12 @@ if run:
         left, right = st.columns([2, 1])
 
         # price path (matplotlib)
-        df_price = pd.DataFrame(res["tokens_stats"]).query("token == @token")
+        # downsampled from the stats pyramid; the band keeps short spikes
+        price = res.downsample("tokens", token, "price", points=2_000)
         fig, ax = plt.subplots(facecolor="#0E1117")
-        ax.plot(df_price["block"], df_price["price"], color="#00E7C5")
+        ax.fill_between(price["block"], price["min"], price["max"],
+                        color="#00E7C5", alpha=0.3, linewidth=0)
+        ax.plot(price["block"], price["last"], color="#00E7C5")
         ax.set_xlabel("Block"); ax.set_ylabel("Price (ETH)")
         ax.spines[:].set_color("#AAAAAA")
         ax.tick_params(colors="#AAAAAA")
@@ -130,6 +133,22 @@ if run:
         )
         right.altair_chart(gauge, use_container_width=True)
 
+    # ── pool depth at close ─────────────────────────────────────────
+    st.subheader("Pool depth at close (ETH per slippage)")
+    depth = (
+        alt.Chart(res["depth"])
+        .mark_line()
+        .encode(
+            x=alt.X("slippage:Q", axis=alt.Axis(format="%")),
+            y="eth:Q",
+            color=alt.Color("side:N",
+                scale=alt.Scale(domain=["buy","sell"],
+                                range=["#00E7C5","#F87171"])),
+        )
+        .properties(height=300)
+    )
+    st.altair_chart(depth, use_container_width=True)
+
     # ── final wallet face value bar chart ───────────────────────────
     bal = (pd.DataFrame(res["agents_stats"])
            .groupby("agent")["wallet_face_value"].last().reset_index())
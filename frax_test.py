@@ -10,6 +10,7 @@ from agents.lv_depositor import LVDepositorAgent
 from agents.looping import LoopingAgent
 from simulator.blockchain import Blockchain
 from simulator.amm import UniswapV2AMM, YieldSpaceAMM
+from simulator.export import flatten_agent_balances
 import pandas as pd
 
 
@@ -116,7 +117,7 @@ all_trades = pd.DataFrame(chain.all_trades)
 print(all_trades.query("agent in @agents"))
 # we have several trades for DS Short Term agent (all Buying)
 
-ds_short_term = agents_stats.query("agent in @agents")["wallet_token_balances"].apply(pd.Series)
-print((ds_short_term["DS_fraxETH"] > 0.0).sum())
+ds_short_term = flatten_agent_balances(agents_stats.query("agent in @agents"))
+print((ds_short_term["bal_DS_fraxETH"] > 0.0).sum())
 # but the agent never holds any DS_stETH tokens
 
@@ -5,7 +5,6 @@ main.py – Cork Protocol Simulation entry point
 """
 
 from typing import List, Dict, Optional
-import pandas as pd
 
 from agents.ct_long_term import CTLongTermAgent
 from agents.ct_speculation import CTShortTermAgent
@@ -19,6 +18,8 @@ from agents.lv_depositor import LVDepositorAgent
 from agents.looping import LoopingAgent
 from simulator.blockchain import Blockchain
 from simulator.amm import UniswapV2AMM
+from simulator.results import SimulationResult
+from simulator.stats import StatsPolicy
 
 # ------------------------------------------------------------------
 # Default constants (kept from the original file)
@@ -120,10 +121,12 @@ def main(
     agent_params: Optional[Dict[str, Dict]] = None,
     events_path: str = "events.json",
     agents_override: Optional[List[object]] = None,
+    stats_policy: Optional[StatsPolicy] = None,
 ):
     """
-    Run a single simulation and return a dict of Pandas DataFrames.
-    GUI or tests can override any argument.
+    Run a single simulation and return a `SimulationResult`: a read-only
+    mapping of the usual result keys whose DataFrames are built on first
+    access.  GUI or tests can override any argument.
     """
     amm_kwargs = amm_kwargs or {}
     psm_expiry_after_block = psm_expiry_after_block or num_blocks
@@ -137,6 +140,7 @@ def main(
         psm_expiry_after_block=psm_expiry_after_block,
         initial_eth_yield_per_block=initial_eth_yield_per_block,
         events_path=events_path,
+        stats_policy=stats_policy,
     )
 
     chain.add_token(
@@ -166,16 +170,7 @@ def main(
     chain.start_mining()
 
     # ---------------- results ----------------------------
-    return {
-        "agents_stats": chain.stats["agents"],
-        "tokens_stats": chain.stats["tokens"],
-        "vaults_stats": chain.stats["vaults"],
-        "amms_stats": chain.stats["amms"],
-        "borrowed_eth_stats": chain.stats["borrowed_eth"],
-        "borrowed_tokens_stats": chain.stats["borrowed_tokens"],
-        "all_trades": pd.DataFrame(chain.all_trades),
-        "final_block": num_blocks,
-    }
+    return SimulationResult(chain)
 
 
 # ------------------------------------------------------------------
@@ -1,9 +1,48 @@
 # runner.py ───────────────────────────────────────────────────────────
+from functools import cached_property
+
+import pandas as pd
+
 from simulator.blockchain import Blockchain
+from simulator.action_log import ACTIONS_OFF
 from simulator.amm import UniswapV2AMM
+from simulator.results import SimulationResult
+from simulator.stats import StatsPolicy
 from profiles import make_agents
 from scenarios import SCENARIOS
-from analysis import summarize
+
+
+class RunResult(SimulationResult):
+    """`SimulationResult` with the keys the dashboard reads, plus `summary`."""
+
+    KEYS = ("tokens_stats", "agents_stats", "all_trades", "summary", "depth")
+
+    # largest slippage on the depth curve
+    DEPTH_MAX_IMPACT = 0.10
+
+    def __init__(self, chain, amm):
+        super().__init__(chain)
+        self.amm = amm
+
+    @cached_property
+    def depth(self) -> pd.DataFrame:
+        # LST pool depth at the end of the run, both sides in one NumPy call each
+        frames = []
+        for side, direction in (("buy", "eth_to_token"), ("sell", "token_to_eth")):
+            slippage, amounts_in, amounts_out = self.amm.depth_curve(self.DEPTH_MAX_IMPACT, direction)
+            frames.append(pd.DataFrame({
+                "side": side,
+                "slippage": slippage,
+                # ETH value of the trade: paid when buying, received when selling
+                "eth": amounts_in if side == "buy" else amounts_out,
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    @cached_property
+    def summary(self) -> dict:
+        # Streamed during mining, so it needs neither the tokens nor the
+        # psms table (and matches summarize() on them when both are full).
+        return self.metrics.summary()
 
 
 def run_simulation(
@@ -13,12 +52,23 @@ def run_simulation(
     cfg: dict,
 ):
     # 1. build chain ---------------------------------------------------
+    # cfg["stats_policy"] may be a StatsPolicy or its kwargs, e.g.
+    # {"tables": ["tokens", "psms"], "every": 10}
+    stats_policy = cfg.get("stats_policy")
+    if isinstance(stats_policy, dict):
+        stats_policy = StatsPolicy(**stats_policy)
+
     chain = Blockchain(
         num_blocks=cfg["blocks"],
         initial_eth_balance=cfg["initial_eth"],
         psm_expiry_after_block=cfg["blocks"],
         initial_eth_yield_per_block=cfg["eth_yield"],
         events_path=None,
+        stats_policy=stats_policy,
+        # nothing here prints or returns the action log
+        action_verbosity=cfg.get("action_verbosity", ACTIONS_OFF),
+        # cfg["block_step"] > 1: coarse screening run (see analysis.calibration_report)
+        block_step=cfg.get("block_step", 1),
     )
 
     token = cfg["token"]
@@ -41,24 +91,12 @@ def run_simulation(
         chain.add_agents(*make_agents(name, token, cap))
 
     # 3. scenario events ----------------------------------------------
-    events = SCENARIOS[scenario_name](depeg_pct, token)
-    for ev in events:
-        ev.setdefault("type", "action")
-    chain.event_manager.events.extend(events)
-    chain.event_manager.events.sort(key=lambda e: e["block"])
+    # target/method events, compiled into the event manager's timeline
+    chain.event_manager.add_events(SCENARIOS[scenario_name](depeg_pct, token))
 
     # 4. run chain -----------------------------------------------------
     chain.start_mining(print_stats=False)
 
     # 5. collect results ----------------------------------------------
-    return {
-        "tokens_stats": chain.stats["tokens"],
-        "agents_stats": chain.stats["agents"],
-        "all_trades":   chain.all_trades,
-        # -------- FIX: pass both tokens_df and psms_df ----------------
-        "summary":      summarize(
-            chain.stats["tokens"],
-            chain.stats.get("psms"),        # second arg added
-        ),
-    }
-# ───────────────────────────────────────────────────────────
+    # tables are built on first access; summary comes from chain.metrics
+    return RunResult(chain, amm)
@@ -9,10 +9,15 @@ All events target the AMM only; schema:
       "method": "set_price" | "inject_liquidity",
       ... }
 
+An event may cover every block of a range instead of a single block
+("start_block" / "end_block", optional "every" step).  The events are
+compiled and dispatched by `simulator.timeline`.
+
 Rules
 -----
 • Negative eth_delta / token_delta ≥ |1| = absolute units.
 • −1 < value < 0  → fraction of *current* reserves (e.g. −0.5 = −50 %).
+• A drain the pool cannot cover is skipped for that block.
 
 Colour markers (“color” key) are ignored by core logic but the UI can
 use them to paint chart annotations.
@@ -52,19 +57,19 @@ def minor_liquidity_shock(depeg: float, token: str):
 def moderate_depeg_pressure(depeg: float, token: str):
     events = []
 
-    # steady drain 300 blocks
-    for blk in range(1, 301):
-        events.append(
-            {
-                "block": blk,
-                "target": "amm",
-                "method": "inject_liquidity",
-                "token": token,
-                "eth_delta": -3_000,
-                "token_delta": -3_000,
-                "note": "steady drain",
-            }
-        )
+    # steady drain 300 blocks (one range event, see simulator.timeline)
+    events.append(
+        {
+            "start_block": 1,
+            "end_block": 300,
+            "target": "amm",
+            "method": "inject_liquidity",
+            "token": token,
+            "eth_delta": -3_000,
+            "token_delta": -3_000,
+            "note": "steady drain",
+        }
+    )
 
     # ↓ depeg hit
     events.append(
@@ -0,0 +1,28 @@
+"""
+Rebasing accrual indices for yield-bearing balances.
+
+A chain keeps one `AccrualIndex` per yield-bearing asset (each LST added
+with `Blockchain.add_token`, and ETH under `eth_yield_per_block`).  The
+wallets registered with the chain hold those assets as shares; a balance
+of `s` shares is worth `s * index.value`, the way rebasing LSTs work
+on-chain.  Paying a block of yield is then one multiply per asset instead
+of a deposit into every wallet, and the real balances are computed when
+they are read.
+"""
+
+ETH = "ETH"
+
+
+class AccrualIndex:
+    """Cumulative yield factor of one asset (1.0 when created)."""
+
+    def __init__(self):
+        self.value = 1.0
+
+    def accrue(self, rate: float, blocks: int = 1):
+        """
+        Grow by `rate` per block, compounded over `blocks`.  Only positive
+        rates accrue, as only positive yield was ever paid out.
+        """
+        if rate > 0:
+            self.value *= 1 + rate if blocks == 1 else (1 + rate) ** blocks
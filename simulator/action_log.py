@@ -0,0 +1,181 @@
+"""
+Structured action log of a run.
+
+Actions are stored as tuples `(block, kind, actor, template, fields)` and
+only turned into text (`template.format(*fields)`) when somebody prints or
+exports them, so a quiet run never formats a string.  `kind` is a short
+category ("yield", "borrow", "event", "agent", ...), `actor` the wallet or
+agent name (or `None`), and `template` a constant format string shared by
+every action of the same sort.
+
+The verbosity decides what is captured:
+
+* `ACTIONS_OFF`: nothing; `record` returns immediately.
+* `ACTIONS_ON`: protocol, event and agent actions.
+* `ACTIONS_ALL`: also the per-block structure lines ("It's X's turn now
+  ..."), which is what `Blockchain.all_actions` always contained.
+
+The retention decides how many closed blocks stay in memory: all of them
+(`retain_blocks=None`), the last N in a ring buffer, or none (`0`).  With a
+`spill_path`, blocks that leave the ring buffer are appended to a gzip
+compressed JSON-lines file instead of being dropped, and `iter_blocks`
+reads any block range back from the file and the buffer.
+"""
+
+import gzip
+import json
+from collections import deque
+
+ACTIONS_OFF = 0
+ACTIONS_ON = 1
+ACTIONS_ALL = 2
+
+# Kinds printed as-is instead of as an indented "  - ..." item.
+MARKER_KINDS = ("marker", "turn")
+
+
+def format_action(action) -> str:
+    """Render one action tuple as the line the console shows."""
+    _, kind, _, template, fields = action
+    text = template.format(*fields) if fields else template
+    if kind in MARKER_KINDS:
+        return text
+    return f"  - {text}"
+
+
+def _to_json(block):
+    """A closed block as JSON-safe data; objects are kept as their text."""
+    block_number, actions = block
+    return [
+        block_number,
+        [
+            [
+                kind,
+                None if actor is None else str(actor),
+                template,
+                [field if isinstance(field, (int, float, str)) else str(field) for field in fields],
+            ]
+            for _, kind, actor, template, fields in actions
+        ],
+    ]
+
+
+def _from_json(line: str):
+    block_number, actions = json.loads(line)
+    return block_number, [
+        (block_number, kind, actor, template, tuple(fields))
+        for kind, actor, template, fields in actions
+    ]
+
+
+class ActionLog:
+    """
+    Per-block lists of action tuples.
+
+    :param verbosity: `ACTIONS_OFF`, `ACTIONS_ON` or `ACTIONS_ALL`.
+    :param retain_blocks: Closed blocks kept in memory (`None`: all of them).
+    :param spill_path: gzip file that receives the blocks dropped from
+                       memory (`None`: drop them).
+    """
+
+    def __init__(self, verbosity: int = ACTIONS_ALL, retain_blocks: int | None = None,
+                 spill_path: str | None = None):
+        if verbosity not in (ACTIONS_OFF, ACTIONS_ON, ACTIONS_ALL):
+            raise ValueError(f"Unknown action log verbosity: {verbosity}")
+        if retain_blocks is not None and retain_blocks < 0:
+            raise ValueError("retain_blocks must not be negative")
+        self.verbosity = verbosity
+        self.retain_blocks = retain_blocks
+        self.spill_path = spill_path
+        self._spill = None
+        self._spilled = False
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self.verbosity > ACTIONS_OFF
+
+    def reset(self):
+        """Forget every block (the spill file is rewritten on the next spill)."""
+        self.close()
+        self._spilled = False
+        self.block_number = 0
+        self.current = []
+        # (block_number, actions) of the closed blocks still in memory
+        self.blocks = deque(maxlen=self.retain_blocks)
+
+    def close(self):
+        """Finish the spill file (it stays readable through `iter_blocks`)."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def record(self, kind: str, actor, template: str, *fields):
+        """Capture an action of the current block (formatted later)."""
+        if self.verbosity:
+            self.current.append((self.block_number, kind, actor, template, fields))
+
+    def marker(self, template: str, *fields, kind: str = "marker"):
+        """Capture a structure line; only kept at `ACTIONS_ALL`."""
+        if self.verbosity == ACTIONS_ALL:
+            self.current.append((self.block_number, kind, None, template, fields))
+
+    def begin_block(self, block_number: int):
+        self.block_number = block_number
+
+    def end_block(self) -> list:
+        """Close the current block and return its actions."""
+        actions = self.current
+        if self.verbosity:
+            block = (self.block_number, actions)
+            blocks = self.blocks
+            if blocks.maxlen is not None and len(blocks) == blocks.maxlen:
+                # the ring buffer is full (or retains nothing): the oldest
+                # block leaves memory now
+                if self.spill_path is not None:
+                    self._spill_block(blocks[0] if blocks.maxlen else block)
+            blocks.append(block)
+            self.current = []
+        return actions
+
+    def _spill_block(self, block):
+        if self._spill is None:
+            # the first spill of a run truncates the file, later ones append
+            mode = "at" if self._spilled else "wt"
+            self._spill = gzip.open(self.spill_path, mode, encoding="utf-8")
+            self._spilled = True
+        self._spill.write(json.dumps(_to_json(block)) + "\n")
+
+    def formatted(self, actions=None) -> list[str]:
+        """Lines of the current block (or of `actions`)."""
+        return [format_action(action) for action in (self.current if actions is None else actions)]
+
+    def iter_blocks(self, start: int | None = None, end: int | None = None):
+        """
+        Yield `(block_number, actions)` for the closed blocks in
+        `start`..`end` (inclusive), reading spilled blocks back from disk.
+        """
+        def wanted(block_number):
+            return (start is None or block_number >= start) and (end is None or block_number <= end)
+
+        if self._spilled:
+            # a flushed gzip stream has no end-of-stream marker yet; close it
+            # (the next spill appends a new gzip member)
+            self.close()
+            with gzip.open(self.spill_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    block = _from_json(line)
+                    if end is not None and block[0] > end:
+                        return
+                    if wanted(block[0]):
+                        yield block
+        for block in list(self.blocks):
+            if end is not None and block[0] > end:
+                return
+            if wanted(block[0]):
+                yield block
+
+    def iter_actions(self, start: int | None = None, end: int | None = None):
+        """Every captured action tuple of `start`..`end`, block by block."""
+        for _, actions in self.iter_blocks(start, end):
+            yield from actions
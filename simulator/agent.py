@@ -7,15 +7,100 @@ class Agent:
         self.name = name
         self.blockchain = None
         self.wallet = Wallet(self.name)
+        # (block, amm, below, above, watched versions) set by idle_until,
+        # None while active
+        self._wake = None
+        # the Market of the agent's token (`token_symbol` / `lst_symbol`),
+        # linked in on_after_genesis
+        self.market = None
 
     def on_after_genesis(self, blockchain):
         self.blockchain = blockchain
+        symbol = getattr(self, "token_symbol", None) or getattr(self, "lst_symbol", None)
+        self.market = blockchain.markets.get(symbol)
 
     def on_block_mined(self, block_number: int):
         pass
 
-    def log_action(self, action):
-        self.blockchain.add_action( action)
+    def scaled_intent(self, amount: float, cap: float | None = None) -> float:
+        """
+        A per-block trade `amount` scaled to the blocks of the current step
+        of a coarse run (`Blockchain(block_step=k)`) and limited to `cap`.
+        Stepping block by block, `amount` is returned unchanged.
+        """
+        blocks = self.blockchain.blocks_in_step
+        if blocks == 1:
+            return amount
+        amount *= blocks
+        return amount if cap is None else min(amount, cap)
+
+    # ------------------------------------------------------------------
+    # Idling
+    # ------------------------------------------------------------------
+    def idle_until(self, block: int | None = None, token: str | None = None,
+                   below: float | None = None, above: float | None = None, watch=()):
+        """
+        Declare that `on_block_mined` would do nothing until `block` is
+        reached, the price of `token` (an LST, CT or DS) reaches `below` /
+        `above`, or the state of one of the AMMs in `watch` changes,
+        whichever comes first.  The chain does not call the agent meanwhile
+        and may fast-forward over blocks on which every agent is idle, so an
+        agent must only idle when skipping those calls changes nothing.
+        Every agent wakes up on a block on which an event fires.
+        """
+        if block is None and token is None and not watch:
+            raise ValueError("idle_until needs a block, a token price level or AMMs to watch")
+        if token is not None and below is None and above is None:
+            raise ValueError("idle_until needs a below and/or above price level for the token")
+        amm = None if token is None else self._pool(token)
+        self._wake = (block, amm, below, above, tuple((pool, pool.version) for pool in watch))
+
+    def wake(self):
+        """Clear the idle state; the agent runs on the current block."""
+        self._wake = None
+
+    def _pool(self, token: str):
+        """The AMM quoting `token`: an LST, or the CT / DS of the agent's market."""
+        if self.market is not None:
+            for name, amm in self.market.pools():
+                if name == token:
+                    return amm
+        return self.blockchain.get_amm(token)
+
+    def _woken(self) -> bool:
+        _, amm, below, above, watched = self._wake
+        for pool, version in watched:
+            if pool.version != version:
+                return True
+        if amm is None:
+            return False
+        price = amm.price_of_one_token_in_eth()
+        return (below is not None and price <= below) or (above is not None and price >= above)
+
+    def wake_block(self, block_number: int) -> int | None:
+        """
+        The first block from `block_number` on the agent must run on, as far
+        as is known now: `block_number` if it is not idle (or a price level
+        or watched AMM woke it up), else its wake-up block (`None`: only a
+        price move wakes it up).
+        """
+        if self._wake is None or self._woken():
+            return block_number
+        block = self._wake[0]
+        return None if block is None else max(block, block_number)
+
+    def is_idle(self, block_number: int) -> bool:
+        """True while idle on `block_number`; waking up clears the idle state."""
+        if self._wake is None:
+            return False
+        if self.wake_block(block_number) != block_number:
+            return True
+        self._wake = None
+        return False
+
+    def log_action(self, action, *fields):
+        """Log an action; `action` may be a `str.format` template for `fields`."""
+        self.blockchain.add_action(action, *fields, kind="agent", actor=self.name)
     
     def log_trade(self, trade):
         self.blockchain.add_trade(trade)
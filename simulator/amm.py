@@ -1,29 +1,87 @@
 from abc import ABC, abstractmethod
-from collections import defaultdict
 
-from simulator.wallet import Wallet
+import numpy as np
+
+from simulator.fees import FeeLedger
+from simulator.journal import save_attr, save_item
+from simulator.wallet import TokenHandle, Wallet
 
 
 # Base AMM class (abstract)
 class AMM(ABC):
     def __init__(self, token_symbol: str, reserve_eth: float, reserve_token: float, fee: float = 0.003):
         self.name = token_symbol  # Token symbol tied to the AMM (e.g., LST, any other token)
+        self.token_handle = TokenHandle(token_symbol)  # its token ID, for the wallet calls
+        # grows on every change of the reserves or the fee (see "Versioned state")
+        self.version = 0
+        self._price_version = -1
+        self._price = None
         self.reserve_eth = reserve_eth
         self.reserve_token = reserve_token
         self.total_lpt_supply = 0  # Total supply of Liquidity Pool Tokens (LPTs)
         self.fee = fee  # Swap fee (default: 0.3%)
         self.lpt_holders = {}  # Track how many LPTs each wallet holds
-        self.fee_accumulated_eth = defaultdict(float)
-        self.fee_accumulated_token = defaultdict(float)
+        # fees collected per block, as running totals (see `simulator.fees`)
+        self.fee_accumulated_eth = FeeLedger()
+        self.fee_accumulated_token = FeeLedger()
+        # fees per LPT collected so far, and per LP the growth it last
+        # settled at and the fees `(eth, token)` it had earned by then
+        self.fee_growth_eth = 0.0
+        self.fee_growth_token = 0.0
+        self.lp_fee_checkpoints = {}
+        self.lp_fees_settled = {}
+
+    # ------------------------------------------------------------------
+    # Versioned state
+    # ------------------------------------------------------------------
+    # Every write to these attributes (swaps, liquidity changes, events,
+    # transaction rollbacks) bumps `version`; values derived from them are
+    # memoized against it and so are never stale.
+    @property
+    def reserve_eth(self) -> float:
+        return self._reserve_eth
+
+    @reserve_eth.setter
+    def reserve_eth(self, value: float):
+        self._reserve_eth = value
+        self.version += 1
+
+    @property
+    def reserve_token(self) -> float:
+        return self._reserve_token
+
+    @reserve_token.setter
+    def reserve_token(self, value: float):
+        self._reserve_token = value
+        self.version += 1
+
+    @property
+    def fee(self) -> float:
+        return self._fee
+
+    @fee.setter
+    def fee(self, value: float):
+        self._fee = value
+        self.version += 1
+
+    def price_of_one_token_in_eth(self) -> float:
+        """Calculate the price of 1 token in ETH (memoized until the state changes)."""
+        if self._price_version != self.version:
+            self._price = self._spot_price()
+            self._price_version = self.version
+        return self._price
 
     def add_liquidity(self, wallet: Wallet, amount_eth: float, amount_token: float):
         """Add liquidity to the pool and mint LPTs."""
         wallet.withdraw_eth(amount_eth)
-        wallet.withdraw_token(self.name, amount_token)
+        wallet.withdraw_token(self.token_handle, amount_token)
 
         # Calculate the amount of LPT tokens to mint
         lpt_to_mint = self._calculate_lpt_mint(amount_eth, amount_token)
         wallet.deposit_lpt(self.name, lpt_to_mint)
+        self._settle_lp_fees(wallet)
+        self._save_reserves()
+        save_item(self.lpt_holders, wallet)
         self.total_lpt_supply += lpt_to_mint
         self.lpt_holders[wallet] = self.lpt_holders.get(wallet, 0) + lpt_to_mint
 
@@ -39,13 +97,16 @@ class AMM(ABC):
         share_eth = (lpt_amount / self.total_lpt_supply) * self.reserve_eth
         share_token = (lpt_amount / self.total_lpt_supply) * self.reserve_token
 
+        self._settle_lp_fees(wallet)
+        self._save_reserves()
         self.reserve_eth -= share_eth
         self.reserve_token -= share_token
         self.total_lpt_supply -= lpt_amount
 
         wallet.deposit_eth(share_eth)
-        wallet.deposit_token(self.name, share_token)
+        wallet.deposit_token(self.token_handle, share_token)
         wallet.withdraw_lpt(self.name, lpt_amount)
+        save_item(self.lpt_holders, wallet)
         self.lpt_holders[wallet] -= lpt_amount
         return share_token, share_eth
 
@@ -58,11 +119,15 @@ class AMM(ABC):
         amount_token = self._calculate_swap_out_amount(fee_deducted_eth, self.reserve_eth, self.reserve_token)
 
         wallet.withdraw_eth(amount_eth)  # Withdraw full amount (including the fee)
-        wallet.deposit_token(self.name, amount_token)
+        wallet.deposit_token(self.token_handle, amount_token)
 
+        self._save_reserves()
         self.reserve_eth += amount_eth
         self.reserve_token -= amount_token
-        self.fee_accumulated_eth[Blockchain.current_block] += amount_eth * self.fee
+        fee_eth = amount_eth * self.fee
+        self.fee_accumulated_eth.add(Blockchain.current_block, fee_eth)
+        if self.total_lpt_supply:
+            self.fee_growth_eth += fee_eth / self.total_lpt_supply
         return amount_token
 
     def swap_token_for_eth(self, wallet: Wallet, amount_token: float) -> float:
@@ -73,21 +138,55 @@ class AMM(ABC):
         fee_deducted_token = amount_token * (1 - self.fee)
         amount_eth = self._calculate_swap_out_amount(fee_deducted_token, self.reserve_token, self.reserve_eth)
 
-        wallet.withdraw_token(self.name, amount_token)  # Withdraw full amount (including the fee)
+        wallet.withdraw_token(self.token_handle, amount_token)  # Withdraw full amount (including the fee)
         wallet.deposit_eth(amount_eth)
 
+        self._save_reserves()
         self.reserve_token += amount_token
         self.reserve_eth -= amount_eth
-        self.fee_accumulated_token[Blockchain.current_block] += amount_token * self.fee
+        fee_token = amount_token * self.fee
+        self.fee_accumulated_token.add(Blockchain.current_block, fee_token)
+        if self.total_lpt_supply:
+            self.fee_growth_token += fee_token / self.total_lpt_supply
         return amount_eth
 
+    def _save_reserves(self):
+        # journal the pool state a swap or liquidity change is about to modify
+        save_attr(self, "reserve_eth")
+        save_attr(self, "reserve_token")
+        save_attr(self, "total_lpt_supply")
+        save_attr(self, "fee_growth_eth")
+        save_attr(self, "fee_growth_token")
+
+    # ------------------------------------------------------------------
+    # Fees
+    # ------------------------------------------------------------------
+    def _settle_lp_fees(self, wallet: Wallet):
+        # bank the fees earned on the current LPT holding before it changes
+        save_item(self.lp_fees_settled, wallet)
+        save_item(self.lp_fee_checkpoints, wallet)
+        self.lp_fees_settled[wallet] = self.lp_fees(wallet)
+        self.lp_fee_checkpoints[wallet] = (self.fee_growth_eth, self.fee_growth_token)
+
+    def lp_fees(self, wallet: Wallet) -> tuple[float, float]:
+        """The fees `(eth, token)` earned by `wallet`'s LPTs since it first added liquidity."""
+        settled_eth, settled_token = self.lp_fees_settled.get(wallet, (0.0, 0.0))
+        checkpoint = self.lp_fee_checkpoints.get(wallet)
+        if checkpoint is None:
+            return settled_eth, settled_token
+        lpt = self.lpt_holders.get(wallet, 0)
+        return (
+            settled_eth + lpt * (self.fee_growth_eth - checkpoint[0]),
+            settled_token + lpt * (self.fee_growth_token - checkpoint[1]),
+        )
+
     def get_fee_accumulated_eth_between_blocks(self, start_block: int, end_block: int) -> float:
         """Get the total fee accumulated in ETH between two blocks."""
-        return sum(self.fee_accumulated_eth[block] for block in range(start_block, end_block + 1))
+        return self.fee_accumulated_eth.between(start_block, end_block)
 
     def get_fee_accumulated_token_between_blocks(self, start_block: int, end_block: int) -> float:
         """Get the total fee accumulated in tokens between two blocks."""
-        return sum(self.fee_accumulated_token[block] for block in range(start_block, end_block + 1))
+        return self.fee_accumulated_token.between(start_block, end_block)
 
     def get_total_fee_value_between_blocks_in_eth(self, start_block: int, end_block: int) -> float:
         """Get the total fee value (in ETH) accumulated between two blocks."""
@@ -97,8 +196,8 @@ class AMM(ABC):
         return eth_fee + token_fee_in_eth
 
     @abstractmethod
-    def price_of_one_token_in_eth(self) -> float:
-        """Calculate the price of 1 token in ETH."""
+    def _spot_price(self) -> float:
+        """The price of 1 token in ETH, computed from the current state."""
         pass
 
     @abstractmethod
@@ -170,6 +269,164 @@ class AMM(ABC):
         amount_out = self._calculate_swap_out_amount(amount_in_with_fee, reserve_in, reserve_out)
         return amount_out
 
+    # ------------------------------------------------------------------
+    # Batch quotes
+    # ------------------------------------------------------------------
+    def _reserves_in_out(self, swap_direction: str) -> tuple[float, float]:
+        if swap_direction == 'eth_to_token':
+            return self.reserve_eth, self.reserve_token
+        if swap_direction == 'token_to_eth':
+            return self.reserve_token, self.reserve_eth
+        raise ValueError("swap_direction must be 'eth_to_token' or 'token_to_eth'")
+
+    def quote_many(self, amounts_in, swap_direction: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Quote a swap of every amount in `amounts_in` against the current
+        reserves, in one NumPy pass.
+
+        :param amounts_in: Array of input amounts.
+        :param swap_direction: 'eth_to_token' or 'token_to_eth'
+        :return: `(amounts_out, effective_prices, slippage)`: the output of
+                 each swap (as `get_expected_output_amount`), output received
+                 per unit of input, and the slippage (as `calculate_slippage`).
+                 Zero amounts have NaN price and slippage.
+        """
+        reserve_in, reserve_out = self._reserves_in_out(swap_direction)
+        amounts_in = np.asarray(amounts_in, dtype=float)
+        amounts_in_with_fee = amounts_in * (1 - self.fee)
+        amounts_out = self._calculate_swap_out_amount(amounts_in_with_fee, reserve_in, reserve_out)
+        amounts_out_expected = amounts_in_with_fee * (reserve_out / reserve_in)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            effective_prices = amounts_out / amounts_in
+            slippage = (amounts_out_expected - amounts_out) / amounts_out_expected
+        return amounts_out, effective_prices, slippage
+
+    def depth_curve(self, max_impact: float, swap_direction: str = 'eth_to_token',
+                    points: int = 50) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The depth of the pool: how much can be swapped for a slippage of up
+        to `max_impact`.
+
+        :param max_impact: The largest slippage on the curve, as a fraction (< 1).
+        :param swap_direction: 'eth_to_token' or 'token_to_eth'
+        :param points: Number of slippage levels, evenly spaced above 0.
+        :return: `(slippage, amounts_in, amounts_out)`: the slippage levels
+                 and the input (fee included) swapped and output received at
+                 each.  Levels below the slippage of the smallest possible
+                 swap (and every level of a drained pool) have zero amounts.
+        """
+        if not 0 < max_impact < 1:
+            raise ValueError("max_impact must be between 0 and 1")
+        reserve_in, reserve_out = self._reserves_in_out(swap_direction)
+        slippage = np.linspace(0.0, max_impact, points + 1)[1:]
+        if reserve_in <= 0 or reserve_out <= 0:
+            # a drained pool has no depth
+            return slippage, np.zeros_like(slippage), np.zeros_like(slippage)
+        amounts_in_with_fee = self._input_for_slippage(slippage, reserve_in, reserve_out)
+        amounts_out = self._calculate_swap_out_amount(amounts_in_with_fee, reserve_in, reserve_out)
+        return slippage, amounts_in_with_fee / (1 - self.fee), amounts_out
+
+    def _input_for_slippage(self, slippage: np.ndarray, reserve_in: float, reserve_out: float) -> np.ndarray:
+        """
+        The fee-deducted input of a swap with each slippage in `slippage`.
+        Bisection on every level at once; the AMMs below override it with
+        the inverse of their formula.
+        """
+        price_before = reserve_out / reserve_in
+
+        def slippage_of(amounts):
+            return 1 - self._calculate_swap_out_amount(amounts, reserve_in, reserve_out) / (amounts * price_before)
+
+        low = np.zeros_like(slippage)
+        high = np.full_like(slippage, reserve_in)
+        # widen the bracket until it holds every level
+        while True:
+            short = slippage_of(high) < slippage
+            if not short.any():
+                break
+            high[short] *= 2
+        for _ in range(100):
+            middle = (low + high) / 2
+            below = slippage_of(middle) < slippage
+            low = np.where(below, middle, low)
+            high = np.where(below, high, middle)
+        return high
+
+
+    # ------------------------------------------------------------------
+    # Trade sizing
+    # ------------------------------------------------------------------
+    def get_input_amount(self, amount_out: float, swap_direction: str) -> float:
+        """
+        The input (fee included) a swap needs to deliver `amount_out`; the
+        inverse of `get_expected_output_amount`.
+
+        :param amount_out: The amount of output asset wanted.
+        :param swap_direction: 'eth_to_token' or 'token_to_eth'
+        :return: The input amount (inf if the pool cannot deliver `amount_out`).
+        """
+        reserve_in, reserve_out = self._reserves_in_out(swap_direction)
+        return self._calculate_swap_in_amount(amount_out, reserve_in, reserve_out) / (1 - self.fee)
+
+    def optimal_amount_in(self, output_value: float, swap_direction: str, max_amount_in: float) -> float:
+        """
+        The input `x` (fee included) that maximizes `output_value * out(x) - x`,
+        the profit of a swap whose output is worth `output_value` units of
+        input each (e.g. the ETH a redemption pays per token bought).
+
+        The profit is concave in `x`, so the optimum is where the marginal
+        output is worth one unit of input.  The base class bisects on the
+        marginal output (quoted with `quote_many`); UniswapV2AMM solves it in
+        closed form.
+
+        :param output_value: The value of one unit of output, in input units.
+        :param swap_direction: 'eth_to_token' or 'token_to_eth'
+        :param max_amount_in: The largest input allowed (e.g. the balance at hand).
+        :return: The optimal input, between 0 and `max_amount_in`.
+        """
+        if output_value <= 0 or max_amount_in <= 0:
+            return 0.0
+
+        def marginal_value(amount_in):
+            step = max(amount_in, 1.0) * 1e-6
+            amounts_out, _, _ = self.quote_many(np.array([amount_in, amount_in + step]), swap_direction)
+            return output_value * (amounts_out[1] - amounts_out[0]) / step
+
+        if marginal_value(max_amount_in) >= 1:
+            return max_amount_in
+        if marginal_value(0.0) <= 1:
+            return 0.0
+        low, high = 0.0, max_amount_in
+        for _ in range(60):
+            middle = (low + high) / 2
+            if marginal_value(middle) > 1:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def _calculate_swap_in_amount(self, amount_out: float, reserve_in: float, reserve_out: float) -> float:
+        """
+        The fee-deducted input that `_calculate_swap_out_amount` turns into
+        `amount_out`.  Bisection; the AMMs below override it with the inverse
+        of their formula.
+        """
+        if amount_out <= 0:
+            return 0.0
+        high = reserve_in
+        while self._calculate_swap_out_amount(high, reserve_in, reserve_out) < amount_out:
+            if high > reserve_in * 1e12:
+                return float('inf')
+            high *= 2
+        low = 0.0
+        for _ in range(100):
+            middle = (low + high) / 2
+            if self._calculate_swap_out_amount(middle, reserve_in, reserve_out) < amount_out:
+                low = middle
+            else:
+                high = middle
+        return high
+
 
 # UniswapV2 style AMM (constant product formula)
 class UniswapV2AMM(AMM):
@@ -182,36 +439,104 @@ class UniswapV2AMM(AMM):
         denominator = reserve_in + amount_in
         return numerator / denominator
 
-    def price_of_one_token_in_eth(self) -> float:
+    def _input_for_slippage(self, slippage, reserve_in: float, reserve_out: float):
+        """x * y = k gives a slippage of `x / (reserve_in + x)`."""
+        return slippage * reserve_in / (1 - slippage)
+
+    def _calculate_swap_in_amount(self, amount_out: float, reserve_in: float, reserve_out: float) -> float:
+        """Inverse of the constant product formula."""
+        if amount_out >= reserve_out:
+            return float('inf')
+        return amount_out * reserve_in / (reserve_out - amount_out)
+
+    def optimal_amount_in(self, output_value: float, swap_direction: str, max_amount_in: float) -> float:
+        """
+        Closed form of `AMM.optimal_amount_in`: the marginal output of
+        `x * y = k` is `(1 - fee) * reserve_in * reserve_out / (reserve_in + (1 - fee) * x) ** 2`.
+        """
+        if output_value <= 0 or max_amount_in <= 0:
+            return 0.0
+        reserve_in, reserve_out = self._reserves_in_out(swap_direction)
+        amount_in_with_fee = (output_value * (1 - self.fee) * reserve_in * reserve_out) ** 0.5 - reserve_in
+        return min(max(amount_in_with_fee / (1 - self.fee), 0.0), max_amount_in)
+
+    def _spot_price(self) -> float:
         """Calculate the price of 1 token in ETH (UniswapV2 logic)."""
-        if self.reserve_token == 0:
+        if self._reserve_token == 0:
             return float('inf')
-        return self.reserve_eth / self.reserve_token
+        return self._reserve_eth / self._reserve_token
 
 
 # Yield Space AMM
 class YieldSpaceAMM(AMM):
     def __init__(self, token_symbol: str, reserve_eth: float, reserve_token: float, discount_rate: float,
                  fee: float = 0.003):
+        # `(reserve_in, reserve_out) -> adjusted reserves` of the current version
+        self._adjusted_version = -1
+        self._adjusted = {}
         super().__init__(token_symbol, reserve_eth, reserve_token, fee)
         self.discount_rate = discount_rate  # Discount rate for time decay or yield factor
 
+    @property
+    def discount_rate(self) -> float:
+        return self._discount_rate
+
+    @discount_rate.setter
+    def discount_rate(self, value: float):
+        self._discount_rate = value
+        self.version += 1
+
+    def _adjusted_reserves(self, reserve_in: float, reserve_out: float) -> tuple[float, float]:
+        """
+        `(reserve_in ** (1 - discount_rate), reserve_out ** (1 + discount_rate))`,
+        memoized until the state changes (quotes and swaps mostly ask for the
+        current reserves, in one of the two directions).
+        """
+        adjusted = self._adjusted
+        if self._adjusted_version != self.version:
+            adjusted.clear()
+            self._adjusted_version = self.version
+        key = (reserve_in, reserve_out)
+        pair = adjusted.get(key)
+        if pair is None:
+            if len(adjusted) >= 4:
+                adjusted.clear()
+            discount_rate = self._discount_rate
+            pair = adjusted[key] = (reserve_in ** (1 - discount_rate), reserve_out ** (1 + discount_rate))
+        return pair
+
     def _calculate_swap_out_amount(self, amount_in: float, reserve_in: float, reserve_out: float) -> float:
         """Yield Space formula adjusted for discount rate."""
         # Adjusted reserves
-        adjusted_reserve_in = reserve_in ** (1 - self.discount_rate)
-        adjusted_reserve_out = reserve_out ** (1 + self.discount_rate)
+        adjusted_reserve_in, adjusted_reserve_out = self._adjusted_reserves(reserve_in, reserve_out)
         amount_out = adjusted_reserve_out - ((adjusted_reserve_in * adjusted_reserve_out) / (adjusted_reserve_in + amount_in))
         return amount_out
 
-    def price_of_one_token_in_eth(self) -> float:
+    def _input_for_slippage(self, slippage, reserve_in: float, reserve_out: float):
+        """
+        The slippage of `x` is `1 - adjusted_out / ((adjusted_in + x) * price_before)`;
+        levels below the slippage of `x -> 0` cannot be reached (zero input).
+        """
+        adjusted_reserve_in, adjusted_reserve_out = self._adjusted_reserves(reserve_in, reserve_out)
+        price_before = reserve_out / reserve_in
+        amounts = adjusted_reserve_out / ((1 - slippage) * price_before) - adjusted_reserve_in
+        return np.maximum(amounts, 0.0)
+
+    def _calculate_swap_in_amount(self, amount_out: float, reserve_in: float, reserve_out: float) -> float:
+        """Inverse of the Yield Space formula."""
+        adjusted_reserve_in, adjusted_reserve_out = self._adjusted_reserves(reserve_in, reserve_out)
+        if amount_out >= adjusted_reserve_out:
+            return float('inf')
+        return adjusted_reserve_in * adjusted_reserve_out / (adjusted_reserve_out - amount_out) - adjusted_reserve_in
+
+    def _spot_price(self) -> float:
         """
         The price of one token in ETH with the YieldSpace formula.
         """
-        if self.reserve_eth == 0 or self.reserve_token == 0:
+        if self._reserve_eth == 0 or self._reserve_token == 0:
             raise ValueError("Reserves must be greater than zero to calculate price")
 
-        base_price = self.reserve_eth / self.reserve_token
+        base_price = self._reserve_eth / self._reserve_token
         adjusted_price = base_price * (1 - self.discount_rate)
 
         if adjusted_price <= 0:
@@ -241,8 +566,7 @@ class YieldSpaceAMM(AMM):
         amount_out_expected = amount_in * (1 - self.fee) * price_before
 
         # Adjusted reserves
-        adjusted_reserve_in = reserve_in ** (1 - self.discount_rate)
-        adjusted_reserve_out = reserve_out ** (1 + self.discount_rate)
+        adjusted_reserve_in, adjusted_reserve_out = self._adjusted_reserves(reserve_in, reserve_out)
         amount_in_with_fee = amount_in * (1 - self.fee)
         amount_out_actual = adjusted_reserve_out - ((adjusted_reserve_in * adjusted_reserve_out) / (adjusted_reserve_in + amount_in_with_fee))
 
@@ -3,14 +3,21 @@ import copy
 import random
 from typing import Optional
 
-import pandas as pd
-from colorama import Fore, Style, init
+from colorama import init
 
+from simulator.accrual import ETH, AccrualIndex
+from simulator.action_log import ACTIONS_ALL, ActionLog
 from simulator.amm import AMM, YieldSpaceAMM, UniswapV2AMM
+from simulator.console import ConsoleRenderer
 from simulator.event_manager import EventManager
+from simulator.journal import Transaction, save_attr, save_item
+from simulator.market import Market, MarketEntry
+from simulator.metrics import MetricsTracker
 from simulator.psm import PegStabilityModule
+from simulator.stats import StatsPolicy, StatsRecorder, StatsSink
 from simulator.vault import Vault
-from simulator.wallet import Wallet
+from simulator.wallet import Wallet, WalletRegistry
+from simulator.wallet_history import WalletDeltaTracker, WalletHistory
 
 init(autoreset=True)
 
@@ -19,7 +26,7 @@ class Blockchain:
     """
     Core chain state-machine.
     `events_path` is optional – pass None to start with an empty
-    EventManager.
+    EventManager; `.jsonl` / `.npz` event files are streamed.
     """
 
     current_block = 0
@@ -31,11 +38,26 @@ class Blockchain:
         psm_expiry_after_block: int,
         initial_eth_yield_per_block: float = 0.0,
         events_path: Optional[str] = "events.json",
+        stats_policy: Optional[StatsPolicy] = None,
+        stats_sink: Optional[StatsSink] = None,
+        metrics: Optional[MetricsTracker] = None,
+        action_verbosity: int = ACTIONS_ALL,
+        action_retention: Optional[int] = None,
+        action_spill_path: Optional[str] = None,
+        console: Optional[ConsoleRenderer] = None,
+        fast_forward: bool = True,
+        block_step: int = 1,
     ):
+        # yield-bearing asset -> AccrualIndex; every wallet that receives
+        # yield on this chain holds those assets as shares of them
+        self.wallets = WalletRegistry({ETH: AccrualIndex()})
+        self.accrual = self.wallets.indices
+
         if events_path is None:
             self.event_manager = EventManager([])
         else:
-            self.event_manager = EventManager.from_json(events_path)
+            self.event_manager = EventManager.from_file(events_path)
+        self.wallets.register(self.event_manager.wallet)
 
         self.num_blocks = num_blocks
         self.initial_eth_balance = initial_eth_balance
@@ -46,15 +68,29 @@ class Blockchain:
         )
         self.psm_expiry_at_block = psm_expiry_after_block
 
+        # LST -> Market; `tokens` is the older {token: {"amm": ...}} view
+        self.markets = {}
         self.tokens = {}
+        # token name -> TokenHandle of every token added (LST, CT, DS)
+        self.token_handles = {}
         self.agents = []
         self.initial_eth_balance_overrides = {}
 
-        self.actions: list[str] = []
-        self.all_actions: list[list[str]] = []
-        self.all_trades: list[dict] = []
-
-        self.genesis_wallet = Wallet()
+        # which actions are captured, how many blocks of them stay in memory
+        # and where older blocks go (see `simulator.action_log`)
+        self.action_log = ActionLog(action_verbosity, action_retention, action_spill_path)
+        # renders the per-block output of `start_mining(print_stats=True)`
+        self.console = console or ConsoleRenderer()
+        # skip quiet stretches of blocks (see `start_mining`)
+        self.fast_forward = fast_forward
+        self.fast_forwarded_blocks = 0
+        if block_step < 1:
+            raise ValueError("block_step must be a positive number of blocks")
+        self.block_step = block_step
+        # blocks covered by the step being mined (< block_step for the last one)
+        self.blocks_in_step = 1
+
+        self.genesis_wallet = self.wallets.register(Wallet())
         self.genesis_wallet.set_initial_balances(1000)
 
         self.borrowed_eth = {}
@@ -65,43 +101,14 @@ class Blockchain:
         Blockchain.current_block = 0
         self.current_block = 0
 
-        self.stats = {
-            "agents": pd.DataFrame(
-                columns=[
-                    "block",
-                    "agent",
-                    "wallet_face_value",
-                    "wallet_eth_balance",
-                    "wallet_token_balances",
-                    "wallet_lpt_balances",
-                ]
-            ),
-            "tokens": pd.DataFrame(columns=["block", "token", "price"]),
-            "vaults": pd.DataFrame(
-                columns=[
-                    "block",
-                    "token",
-                    "lp_token_price_eth",
-                    "eth_balance",
-                    "ds_balance_eth",
-                ]
-            ),
-            "psms": pd.DataFrame(columns=["block", "token", "eth_reserve"]),
-            "amms": pd.DataFrame(
-                columns=[
-                    "block",
-                    "token",
-                    "total_lpt_supply",
-                    "total_eth_reserve",
-                    "total_token_reserve",
-                ]
-            ),
-            "borrowed_eth": pd.DataFrame(columns=["block", "wallet", "amount"]),
-            "borrowed_tokens": pd.DataFrame(
-                columns=["block", "wallet", "token", "amount"]
-            ),
-        }
-
+        # Sized for real once the agents and tokens are known (start_mining).
+        # The policy selects which tables are recorded and how often, the
+        # sink is where rows and trades go; `metrics` is updated on every
+        # block whatever the policy.
+        self.stats_policy = stats_policy or StatsPolicy()
+        self.stats_sink = stats_sink or StatsRecorder()
+        self._wallet_deltas = WalletDeltaTracker()
+        self.metrics = metrics or MetricsTracker()
 
     # (everything below this point is unchanged – keep your existing
     #  _append_stats, add_token, borrow/repay, mining loop, etc.)
@@ -110,167 +117,121 @@ class Blockchain:
     # ------------------------------------------------------------------
     # Helpers – stats aggregation
     # ------------------------------------------------------------------
+    @property
+    def stats(self) -> dict:
+        """The recorded stats tables as DataFrames, built on first access."""
+        return self.stats_sink.to_frames()
+
+    @property
+    def all_trades(self) -> list[dict]:
+        """
+        The trades as a list of dicts, kept by the sink between reads (use
+        `trade_ledger` for filtered queries).
+        """
+        return self.stats_sink.trades()
+
+    @property
+    def trade_ledger(self):
+        """The trades as an indexed `simulator.trade_ledger.TradeLedger`."""
+        return self.stats_sink.trade_ledger()
+
+    def wallet_history(self) -> WalletHistory:
+        """Balance matrices / time series rebuilt from the wallet deltas."""
+        return WalletHistory(self.stats["wallet_deltas"], self.stats["accrual"])
+
     def _append_stats(self, block_number):
-        def is_valid_dataframe(df):
-            return not df.empty and not df.isna().all(axis=None)
+        record = self.stats_sink.append
+        wanted = self.stats_policy.tables
 
         # -------- agents --------
-        agent_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "agent": str(agent),
-                    "wallet_face_value": agent.get_wallet_face_value(),
-                    "wallet_eth_balance": copy.deepcopy(agent.wallet.eth_balance),
-                    "wallet_token_balances": copy.deepcopy(
-                        agent.wallet.token_balances
+        if "agents" in wanted:
+            for agent in self.agents:
+                name = str(agent)
+                record(
+                    "agents",
+                    (
+                        block_number,
+                        name,
+                        agent.get_wallet_face_value(),
+                        agent.wallet.eth_balance,
                     ),
-                    "wallet_lpt_balances": copy.deepcopy(agent.wallet.lpt_balances),
-                }
-                for agent in self.agents
-            ]
-        )
-        if is_valid_dataframe(agent_stats):
-            if is_valid_dataframe(self.stats["agents"]):
-                self.stats["agents"] = pd.concat(
-                    [self.stats["agents"], agent_stats], ignore_index=True
                 )
-            else:
-                self.stats["agents"] = agent_stats.copy()
+                self._wallet_deltas.record(block_number, name, agent.wallet, record)
+
+        # -------- accrual indices (the wallet deltas hold shares of them) --------
+        if "accrual" in wanted:
+            for asset, index in self.accrual.items():
+                record("accrual", (block_number, asset, index.value))
 
         # -------- tokens --------
-        token_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "token": token,
-                    "price": lst_info["amm"].price_of_one_token_in_eth(),
-                }
-                for token, lst_info in self.tokens.items()
-                if "amm" in lst_info
-            ]
-        )
-        if is_valid_dataframe(token_stats):
-            if is_valid_dataframe(self.stats["tokens"]):
-                self.stats["tokens"] = pd.concat(
-                    [self.stats["tokens"], token_stats], ignore_index=True
-                )
-            else:
-                self.stats["tokens"] = token_stats.copy()
+        if "tokens" in wanted:
+            for token, lst_info in self.tokens.items():
+                if "amm" in lst_info:
+                    record(
+                        "tokens",
+                        (block_number, token, lst_info["amm"].price_of_one_token_in_eth()),
+                    )
 
         # -------- vaults --------
-        vault_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "token": token,
-                    "lp_token_price_eth": vault.get_lp_token_price(),
-                    "eth_balance": vault.wallet.eth_balance,
-                    "ds_balance_eth": vault.ds_eth_amm.price_of_one_token_in_eth()
-                    * vault.wallet.token_balance(f"DS_{token}"),
-                }
-                for token, lst_info in self.tokens.items()
-                if "vault" in lst_info
-                for vault in [lst_info["vault"]]
-            ]
-        )
-        if is_valid_dataframe(vault_stats):
-            if is_valid_dataframe(self.stats["vaults"]):
-                self.stats["vaults"] = pd.concat(
-                    [self.stats["vaults"], vault_stats], ignore_index=True
+        if "vaults" in wanted:
+            for token, market in self.markets.items():
+                vault = market.vault
+                record(
+                    "vaults",
+                    (
+                        block_number,
+                        token,
+                        vault.get_lp_token_price(),
+                        vault.wallet.eth_balance,
+                        vault.ds_eth_amm.price_of_one_token_in_eth()
+                        * vault.wallet.token_balance(market.ds),
+                    ),
                 )
-            else:
-                self.stats["vaults"] = vault_stats.copy()
 
         # -------- psms --------
-        psm_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "token": token,
-                    "eth_reserve": lst_info["psm"].eth_reserve,
-                }
-                for token, lst_info in self.tokens.items()
-                if "psm" in lst_info
-            ]
-        )
-        if is_valid_dataframe(psm_stats):
-            if is_valid_dataframe(self.stats["psms"]):
-                self.stats["psms"] = pd.concat(
-                    [self.stats["psms"], psm_stats], ignore_index=True
-                )
-            else:
-                self.stats["psms"] = psm_stats.copy()
+        if "psms" in wanted:
+            for token, market in self.markets.items():
+                record("psms", (block_number, token, market.psm.eth_reserve))
 
         # -------- amms --------
-        amm_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "token": token,
-                    "total_lpt_supply": lst_info["amm"].total_lpt_supply,
-                    "total_eth_reserve": lst_info["amm"].reserve_eth,
-                    "total_token_reserve": lst_info["amm"].reserve_token,
-                }
-                for token, lst_info in self.tokens.items()
-                if "amm" in lst_info
-            ]
-        )
-        if is_valid_dataframe(amm_stats):
-            if is_valid_dataframe(self.stats["amms"]):
-                self.stats["amms"] = pd.concat(
-                    [self.stats["amms"], amm_stats], ignore_index=True
-                )
-            else:
-                self.stats["amms"] = amm_stats.copy()
+        if "amms" in wanted:
+            for token, lst_info in self.tokens.items():
+                if "amm" in lst_info:
+                    amm = lst_info["amm"]
+                    record(
+                        "amms",
+                        (
+                            block_number,
+                            token,
+                            amm.total_lpt_supply,
+                            amm.reserve_eth,
+                            amm.reserve_token,
+                        ),
+                    )
 
         # -------- borrowed ETH --------
-        borrowed_eth_stats = pd.DataFrame(
-            [
-                {"block": block_number, "wallet": str(wallet), "amount": amount}
-                for wallet, amount in self.borrowed_eth.items()
-            ]
-        )
-        if is_valid_dataframe(borrowed_eth_stats):
-            if is_valid_dataframe(self.stats["borrowed_eth"]):
-                self.stats["borrowed_eth"] = pd.concat(
-                    [self.stats["borrowed_eth"], borrowed_eth_stats], ignore_index=True
-                )
-            else:
-                self.stats["borrowed_eth"] = borrowed_eth_stats.copy()
+        if "borrowed_eth" in wanted:
+            for wallet, amount in self.borrowed_eth.items():
+                record("borrowed_eth", (block_number, str(wallet), amount))
 
         # -------- borrowed tokens --------
-        borrowed_token_stats = pd.DataFrame(
-            [
-                {
-                    "block": block_number,
-                    "wallet": str(wallet),
-                    "token": token,
-                    "amount": amount,
-                }
-                for wallet, token_amounts in self.borrowed_token.items()
-                for token, amount in token_amounts.items()
-            ]
-        )
-        if is_valid_dataframe(borrowed_token_stats):
-            if is_valid_dataframe(self.stats["borrowed_tokens"]):
-                self.stats["borrowed_tokens"] = pd.concat(
-                    [self.stats["borrowed_tokens"], borrowed_token_stats],
-                    ignore_index=True,
-                )
-            else:
-                self.stats["borrowed_tokens"] = borrowed_token_stats.copy()
+        if "borrowed_tokens" in wanted:
+            for wallet, token_amounts in self.borrowed_token.items():
+                for token, amount in token_amounts.items():
+                    record("borrowed_tokens", (block_number, str(wallet), token, amount))
 
     # ------------------------------------------------------------------
     # Public interface – token / agent management
     # ------------------------------------------------------------------
     def add_agent(self, agent, eth_balance: float):
         self.agents.append(agent)
+        self.wallets.register(agent.wallet)
         self.initial_eth_balance_overrides[agent] = eth_balance
 
     def add_agents(self, *agents):
         for agent in agents:
             self.agents.append(agent)
+            self.wallets.register(agent.wallet)
 
     def add_token(
         self,
@@ -280,6 +241,13 @@ class Blockchain:
         risk: float = 0.1,
         initial_yield_per_block: float = 0.00001,
     ):
+        """
+        Add an LST with its PSM, vault and CT / DS pools, linked into a
+        `Market` (`self.markets`); `self.tokens` is the older dict view of
+        the same objects.  The IDs of the LST, CT and DS are interned
+        (wallets keep token balances in arrays indexed by them) and their
+        handles go into `self.token_handles`.
+        """
         psm = PegStabilityModule(
             token_symbol=token,
             expiry_block=self.psm_expiry_at_block,
@@ -313,14 +281,22 @@ class Blockchain:
             ct_eth_amm=ct_amm,
             ds_eth_amm=ds_amm,
         )
-
-        self.tokens[token] = {
-            "initial_agent_balance": initial_agent_balance,
-            "amm": amm,
-            "psm": psm,
-            "vault": vault,
-            "yield_per_block": initial_yield_per_block,
-        }
+        self.wallets.register(vault.wallet)
+        self.accrual[token] = AccrualIndex()
+        for handle in (psm.lst_handle, psm.ct_handle, psm.ds_handle):
+            self.token_handles[handle.name] = handle
+
+        market = self.markets[token] = Market(
+            symbol=token,
+            initial_agent_balance=initial_agent_balance,
+            lst_amm=amm,
+            ct_amm=ct_amm,
+            ds_amm=ds_amm,
+            psm=psm,
+            vault=vault,
+            yield_per_block=initial_yield_per_block,
+        )
+        self.tokens[token] = MarketEntry(market)
         self.tokens[f"CT_{token}"] = {
             "initial_agent_balance": 0,
             "amm": ct_amm,
@@ -330,20 +306,52 @@ class Blockchain:
             "amm": ds_amm,
         }
 
+    def get_market(self, token: str) -> Market:
+        return self.markets[token]
+
     def get_vault(self, token: str):
-        return self.tokens[token].get("vault")
+        market = self.markets.get(token)
+        return market.vault if market is not None else self.tokens[token].get("vault")
 
     def get_psm(self, token: str):
-        return self.tokens[token].get("psm")
+        market = self.markets.get(token)
+        return market.psm if market is not None else self.tokens[token].get("psm")
 
     def get_amm(self, token: str):
-        return self.tokens[token]["amm"]
-
-    def add_action(self, action: str):
-        self.actions.append(f"  - {action}")
+        market = self.markets.get(token)
+        return market.lst_amm if market is not None else self.tokens[token]["amm"]
+
+    @property
+    def actions(self) -> list[str]:
+        """The current block's actions, formatted."""
+        return self.action_log.formatted()
+
+    @property
+    def all_actions(self) -> list[list[str]]:
+        """The actions of the blocks kept in memory, formatted on access."""
+        return [self.action_log.formatted(actions) for _, actions in self.action_log.blocks]
+
+    def iter_actions(self, start: Optional[int] = None, end: Optional[int] = None):
+        """
+        Yield `(block_number, lines)` for blocks `start`..`end` (inclusive),
+        including blocks spilled to disk by the action log.
+        """
+        for block_number, actions in self.action_log.iter_blocks(start, end):
+            yield block_number, self.action_log.formatted(actions)
+
+    def add_action(self, action: str, *fields, kind: str = "message", actor=None):
+        """
+        Log an action of the current block.
+
+        :param action: The message, or a `str.format` template for `fields`;
+                       it is only formatted when the actions are printed.
+        :param kind: Category of the action (e.g. "yield", "borrow").
+        :param actor: The wallet or agent that acted, if any.
+        """
+        self.action_log.record(kind, actor, action, *fields)
 
     def add_trade(self, trade: dict):
-        self.all_trades.append(trade)
+        self.stats_sink.add_trade(trade)
 
     # ------------------------------------------------------------------
     # Borrowing / repayment
@@ -351,10 +359,12 @@ class Blockchain:
     def borrow_eth(self, wallet, amount_eth: float):
         if amount_eth <= 0:
             raise ValueError("Borrow amount must be positive")
+        save_attr(self, "total_borrowed_eth")
+        save_item(self.borrowed_eth, wallet)
         self.total_borrowed_eth += amount_eth
         self.borrowed_eth[wallet] = self.borrowed_eth.get(wallet, 0.0) + amount_eth
         wallet.deposit_eth(amount_eth)
-        self.add_action(f"borrowed {amount_eth:.4f} ETH")
+        self.add_action("borrowed {:.4f} ETH", amount_eth, kind="borrow", actor=wallet)
 
     def repay_eth(self, wallet, amount_eth: float):
         if wallet not in self.borrowed_eth or self.borrowed_eth[wallet] == 0:
@@ -363,10 +373,12 @@ class Blockchain:
             raise ValueError(
                 f"Cannot repay more than borrowed. Borrowed: {self.borrowed_eth[wallet]:.4f} ETH"
             )
+        save_attr(self, "total_borrowed_eth")
+        save_item(self.borrowed_eth, wallet)
         self.total_borrowed_eth -= amount_eth
         self.borrowed_eth[wallet] -= amount_eth
         wallet.withdraw_eth(amount_eth)
-        self.add_action(f"repaid {amount_eth:.4f} ETH")
+        self.add_action("repaid {:.4f} ETH", amount_eth, kind="repay", actor=wallet)
 
     def borrow_token(self, wallet: Wallet, token: str, amount_token: float):
         if amount_token <= 0:
@@ -374,14 +386,17 @@ class Blockchain:
         if token not in self.tokens:
             raise ValueError(f"Token {token} does not exist")
 
+        save_item(self.borrowed_token, wallet)
+        save_item(self.total_borrowed_token, token)
         self.borrowed_token.setdefault(wallet, {})
+        save_item(self.borrowed_token[wallet], token)
         self.borrowed_token[wallet][token] = (
             self.borrowed_token[wallet].get(token, 0.0) + amount_token
         )
         self.total_borrowed_token[token] = self.total_borrowed_token.get(token, 0.0) + amount_token
 
         wallet.deposit_token(token, amount_token)
-        self.add_action(f"borrowed {amount_token:.4f} {token}")
+        self.add_action("borrowed {:.4f} {}", amount_token, token, kind="borrow", actor=wallet)
 
     def repay_token(self, wallet: Wallet, token: str, amount_token: float):
         if amount_token <= 0:
@@ -393,13 +408,34 @@ class Blockchain:
                 f"Cannot repay more than borrowed. Borrowed: {self.borrowed_token[wallet][token]:.4f} {token}"
             )
 
+        save_item(self.borrowed_token[wallet], token)
+        save_item(self.total_borrowed_token, token)
         self.borrowed_token[wallet][token] -= amount_token
         self.total_borrowed_token[token] -= amount_token
         if self.borrowed_token[wallet][token] == 0:
             del self.borrowed_token[wallet][token]
 
         wallet.withdraw_token(token, amount_token)
-        self.add_action(f"repaid {amount_token:.4f} {token}")
+        self.add_action("repaid {:.4f} {}", amount_token, token, kind="repay", actor=wallet)
+
+    # ------------------------------------------------------------------
+    # Transactions
+    # ------------------------------------------------------------------
+    def transaction(self) -> Transaction:
+        """
+        A `Transaction` (see `simulator.journal`) that journals the changes
+        made inside it to wallets, AMMs, PSMs, vaults and the borrow
+        ledgers, and drops the block's actions logged meanwhile on rollback.
+        """
+        return Transaction(self.action_log)
+
+    def dry_run(self, func, *args, **kwargs):
+        """Call `func(*args, **kwargs)`, undo everything it changed and return its result."""
+        with self.transaction() as txn:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                txn.rollback()
 
     # ------------------------------------------------------------------
     # Integrity checks
@@ -420,61 +456,153 @@ class Blockchain:
     # ------------------------------------------------------------------
     # Stats + logging at each block
     # ------------------------------------------------------------------
-    def collect_stats(self, block_number: int, print_stats: bool = True):
-        self._append_stats(block_number)
-        self.all_actions.append(self.actions.copy())
+    def collect_stats(self, block_number: int, print_stats: bool = True, event_fired: bool = False,
+                      first_block: Optional[int] = None):
+        """
+        :param first_block: First block of the coarse step ending at
+                            `block_number`; the step is recorded if any of
+                            its blocks would be, and counts as that many
+                            blocks in the metrics.
+        """
+        policy = self.stats_policy
+        if policy.should_record(block_number, self.num_blocks, event_fired) or (
+            first_block is not None
+            and policy.next_record_block(first_block, self.num_blocks) <= block_number
+        ):
+            self._append_stats(block_number)
+        if first_block is None:
+            self.metrics.update(block_number, self.tokens)
+        else:
+            self.metrics.update_many(first_block, block_number, self.tokens)
+        actions = self.action_log.end_block()
 
         if print_stats:
-            print(Style.BRIGHT + Fore.CYAN + "-" * 100)
-            if block_number == 0:
-                print(Fore.YELLOW + "*** AND SO IT BEGINS ... ***")
-            else:
-                print(Fore.YELLOW + f"*** Block number {block_number} mined! ***")
-
-            for action in self.actions:
-                print(Fore.BLUE + action)
-
-            for agent in self.agents:
-                print(
-                    Fore.GREEN
-                    + f"Agent: {agent} | Wallet face value: {agent.get_wallet_face_value():.4f} ETH"
-                )
-
-            for lst_info in self.tokens.values():
-                amm = lst_info["amm"]
-                print(
-                    Fore.MAGENTA
-                    + f"LST: {amm.name} | Price: {amm.price_of_one_token_in_eth():.4f} ETH"
-                )
-
-            print(Style.BRIGHT + Fore.CYAN + "-" * 100)
-            print()
-
-        self.actions.clear()
+            self.console.render(block_number, self, actions)
 
     # ------------------------------------------------------------------
     # Yield distribution
     # ------------------------------------------------------------------
-    def _distribute_yield(self):
-        for wallet in Wallet.all_wallets():
+    def _distribute_yield(self, blocks: int = 1):
+        """
+        Pay `blocks` blocks of yield (compounded per block): one multiply of
+        the accrual index per yield-bearing asset.  The registered wallets
+        hold those assets as shares, so their balances grow with the index.
+
+        :param blocks: Blocks of yield to pay at once.
+        """
+        if self.action_log.enabled:
+            self._record_yield(blocks)
+        for token, lst_info in self.tokens.items():
+            if "yield_per_block" in lst_info:
+                index = self.accrual.get(token)
+                if index is None:
+                    index = self.accrual[token] = AccrualIndex()
+                index.accrue(lst_info["yield_per_block"], blocks)
+        self.accrual[ETH].accrue(self.eth_yield_per_block, blocks)
+
+    def _record_yield(self, blocks: int):
+        """Log what every wallet earns this block (only with the action log on)."""
+        record = self.action_log.record
+        eth_yield = self.eth_yield_per_block
+        if blocks > 1:
+            eth_yield = (1 + eth_yield) ** blocks - 1
+        for wallet in self.wallets:
             for token, lst_info in self.tokens.items():
                 yield_per_block = lst_info.get("yield_per_block", 0.0)
-                balance = wallet.token_balance(token)
-                accrued_yield = balance * yield_per_block
+                if blocks > 1:
+                    yield_per_block = (1 + yield_per_block) ** blocks - 1
+                accrued_yield = wallet.token_balance(token) * yield_per_block
                 if accrued_yield > 0:
-                    wallet.deposit_token(token, accrued_yield)
-                    self.add_action(f"{wallet} received {accrued_yield:.4f} {token} as yield")
+                    record("yield", wallet, "{} received {:.4f} {} as yield",
+                           wallet, accrued_yield, token)
 
-            if self.eth_yield_per_block > 0:
-                accrued_eth_yield = wallet.eth_balance * self.eth_yield_per_block
+            if eth_yield > 0:
+                accrued_eth_yield = wallet.eth_balance * eth_yield
                 if accrued_eth_yield > 0:
-                    wallet.deposit_eth(accrued_eth_yield)
-                    self.add_action(f"{wallet} received {accrued_eth_yield:.4f} ETH as yield")
+                    record("yield", wallet, "{} received {:.4f} ETH as yield",
+                           wallet, accrued_eth_yield)
 
     # ------------------------------------------------------------------
     # Mining loop
     # ------------------------------------------------------------------
+    def _quiet_until(self, block_number: int) -> int:
+        """
+        The last block of the quiet stretch starting at `block_number`
+        (`block_number - 1` if that block is not quiet).  The final block
+        is never skipped.
+        """
+        last = min(
+            self.num_blocks,
+            self.stats_policy.next_record_block(block_number, self.num_blocks),
+        ) - 1
+        for agent in self.agents:
+            wake = agent.wake_block(block_number)
+            if wake is not None:
+                last = min(last, wake - 1)
+                if last < block_number:
+                    return last
+        next_event = self.event_manager.next_event_block(block_number)
+        if next_event is not None:
+            last = min(last, next_event - 1)
+        return last
+
+    def _skip_blocks(self, first: int, last: int):
+        """Advance over the quiet blocks `first`..`last` without stepping them."""
+        count = last - first + 1
+        # block by block, so the indices match stepping bit for bit
+        for _ in range(count):
+            self._distribute_yield()
+        # the agent order (and the random state) as if every block was mined
+        for _ in range(count):
+            random.shuffle(self.agents)
+        self.metrics.update_many(first, last, self.tokens)
+        self.current_block = last
+        Blockchain.current_block = last
+        self.fast_forwarded_blocks += count
+
     def start_mining(self, print_stats: bool = True):
+        """
+        Mine `num_blocks` blocks.
+
+        With `fast_forward`, stretches of blocks on which no event is due, no
+        stats are recorded and every agent is idle (see `Agent.idle_until`)
+        are jumped over, replaying only the yield; the results are the same
+        as stepping through them.  It needs the action log off and
+        `print_stats=False`.
+
+        Fast-forward only skips anything when the stats are recorded
+        sparsely (`StatsPolicy(every=N)` with N > 1, or `every=None`; the
+        default policy records every block) and every agent idles:
+
+        * the redemption / repurchase arbitrage agents while there is no
+          spread on the LST and DS pools,
+        * CTLongTermAgent while the CT price keeps its premium under the
+          threshold,
+        * DSLongTermAgent only while it has nothing to buy (no LST yield, no
+          ETH or no buying pressure) and the LST is on peg,
+        * CTShortTermAgent only during its cool-down (it tracks the ARP of
+          every block).
+
+        The bundled agent mixes (`main.DEFAULT_AGENT_NAMES` and the
+        dashboard profiles) always have an agent trading or tracking every
+        block, so they never fast-forward; arbitrage and CT long-term
+        agents on a zero-yield LST with sparse stats do, between events.
+
+        With `block_step=k` the chain advances k blocks at a time for cheap
+        screening runs: the yield of the k blocks is compounded at once,
+        every event inside the step fires, and each agent takes one turn at
+        the end of the step with its per-block intents scaled by k
+        (`Agent.scaled_intent`).  `analysis.calibration_report` measures the
+        error against block-by-block runs.
+        """
+        self._wallet_deltas.reset()
+        self.metrics.reset()
+        self.action_log.reset()
+        self.console.reset()
+        self.stats_sink.start(
+            self.num_blocks, len(self.agents), len(self.tokens), self.stats_policy
+        )
+
         # distribute genesis balances
         for agent in self.agents:
             if agent in self.initial_eth_balance_overrides:
@@ -483,30 +611,65 @@ class Blockchain:
                 agent.wallet.deposit_eth(self.initial_eth_balance)
             for token, lst_info in self.tokens.items():
                 agent.wallet.deposit_token(token, lst_info["initial_agent_balance"])
+            agent.wake()
             agent.on_after_genesis(self)
 
         self.collect_stats(0, print_stats)
 
-        for block_number in range(1, self.num_blocks + 1):
+        self.fast_forwarded_blocks = 0
+        fast_forward = (
+            self.fast_forward and self.block_step == 1
+            and not print_stats and not self.action_log.enabled
+        )
+        block_number = 0
+        while block_number < self.num_blocks:
+            first_block = block_number + 1
+            if fast_forward:
+                last = self._quiet_until(first_block)
+                if last >= first_block:
+                    self._skip_blocks(first_block, last)
+                    block_number = last
+                    continue
+
+            # a coarse step covers first_block..block_number
+            block_number = min(block_number + self.block_step, self.num_blocks)
+            self.blocks_in_step = block_number - first_block + 1
             self.current_block = block_number
             Blockchain.current_block = block_number
-
-            self.actions.append("Protocol actions ...")
-            self._distribute_yield()
-            self.event_manager.on_block(block_number, self)
-
-            self.actions.append("")
+            log = self.action_log
+            log.begin_block(block_number)
+
+            log.marker("Protocol actions ...")
+            self._distribute_yield(self.blocks_in_step)
+            fired = 0
+            for event_block in range(first_block, block_number + 1):
+                fired += self.event_manager.on_block(event_block, self)
+            event_fired = fired > 0
+            if event_fired:
+                # events change what idle agents were waiting on
+                for agent in self.agents:
+                    agent.wake()
+
+            log.marker("")
 
             random.shuffle(self.agents)
             for agent in self.agents:
-                self.actions.append(f"It's {agent}'s turn now ...")
-                agent.on_block_mined(block_number)
-                self.actions.append("")
+                log.marker("It's {}'s turn now ...", agent, kind="turn")
+                if not agent.is_idle(block_number):
+                    agent.on_block_mined(block_number)
+                log.marker("")
 
-            self.actions.append("All agents took action.")
+            log.marker("All agents took action.")
             self._check_borrowings_repaid(block_number)
 
-            self.collect_stats(block_number, print_stats)
+            self.collect_stats(
+                block_number, print_stats, event_fired,
+                first_block if first_block < block_number else None,
+            )
+
+        self.blocks_in_step = 1
+        self.stats_sink.close()
+        self.action_log.close()
 
         if print_stats:
             print("Mining completed!")
@@ -0,0 +1,57 @@
+"""
+Growable typed column storage shared by the stats recorder and the trade
+ledger.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnTable:
+    """
+    One stats table stored as a set of typed NumPy columns.
+
+    The buffers are preallocated to `capacity` rows and doubled if a run
+    writes more rows than expected (e.g. the borrow tables, whose row count
+    depends on agent behaviour).
+    """
+
+    def __init__(self, columns, capacity: int):
+        self.names = [name for name, _ in columns]
+        self.dtypes = [dtype for _, dtype in columns]
+        capacity = max(int(capacity), 1)
+        self.columns = [np.empty(capacity, dtype=dtype) for dtype in self.dtypes]
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns[0])
+
+    def append(self, row):
+        """Write one row (a tuple in schema order) into the buffers."""
+        if self.size == self.capacity:
+            self._grow(self.capacity * 2)
+        index = self.size
+        for column, value in zip(self.columns, row):
+            column[index] = value
+        self.size += 1
+
+    def _grow(self, capacity: int):
+        grown = []
+        for column in self.columns:
+            new_column = np.empty(capacity, dtype=column.dtype)
+            new_column[: self.size] = column[: self.size]
+            grown.append(new_column)
+        self.columns = grown
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of the filled part of a single column."""
+        return self.columns[self.names.index(name)][: self.size]
+
+    def to_frame(self) -> pd.DataFrame:
+        # Rows are never rewritten once appended, so the frame can share the
+        # filled part of the buffers instead of copying them.
+        return pd.DataFrame(
+            {name: column[: self.size] for name, column in zip(self.names, self.columns)},
+            copy=False,
+        )
@@ -0,0 +1,87 @@
+"""
+Coloured console output of the mining loop.
+
+`ConsoleRenderer` prints what `Blockchain.collect_stats` used to print on
+every block: the block's actions, every agent's wallet face value and
+every AMM price.  With `every=N` it prints only every N-th block (plus the
+first and the last), and with `rolling=True` it prints a one-line summary
+of the blocks it skipped, so long interactive runs are not bound by
+terminal I/O.
+"""
+
+from collections import Counter
+
+from colorama import Fore, Style
+
+from simulator.action_log import MARKER_KINDS, format_action
+
+
+class ConsoleRenderer:
+    """
+    :param every: Print the full state every N blocks.
+    :param rolling: Print a summary line for the skipped blocks.
+    """
+
+    def __init__(self, every: int = 1, rolling: bool = False):
+        if every < 1:
+            raise ValueError("every must be a positive number of blocks")
+        self.every = every
+        self.rolling = rolling
+        self._skipped_kinds = Counter()
+        self.reset()
+
+    def reset(self):
+        self._skipped = 0
+        self._skipped_kinds.clear()
+
+    def render(self, block_number: int, blockchain, actions: list):
+        last_block = block_number == blockchain.num_blocks
+        if block_number % self.every and not last_block:
+            if self.rolling:
+                self._skipped += 1
+                self._skipped_kinds.update(
+                    action[1] for action in actions if action[1] not in MARKER_KINDS
+                )
+            return
+
+        print(Style.BRIGHT + Fore.CYAN + "-" * 100)
+        if self._skipped:
+            self._print_rolling_summary(block_number, blockchain)
+        if block_number == 0:
+            print(Fore.YELLOW + "*** AND SO IT BEGINS ... ***")
+        else:
+            print(Fore.YELLOW + f"*** Block number {block_number} mined! ***")
+
+        for action in actions:
+            print(Fore.BLUE + format_action(action))
+
+        for agent in blockchain.agents:
+            print(
+                Fore.GREEN
+                + f"Agent: {agent} | Wallet face value: {agent.get_wallet_face_value():.4f} ETH"
+            )
+
+        for lst_info in blockchain.tokens.values():
+            amm = lst_info["amm"]
+            print(
+                Fore.MAGENTA
+                + f"LST: {amm.name} | Price: {amm.price_of_one_token_in_eth():.4f} ETH"
+            )
+
+        print(Style.BRIGHT + Fore.CYAN + "-" * 100)
+        print()
+
+    def _print_rolling_summary(self, block_number: int, blockchain):
+        first = block_number - self._skipped
+        counts = ", ".join(f"{kind}: {count}" for kind, count in self._skipped_kinds.most_common())
+        print(
+            Fore.YELLOW
+            + f"*** Blocks {first}-{block_number - 1}: "
+            + f"{sum(self._skipped_kinds.values())} actions ({counts or 'none'}) ***"
+        )
+        for token, metrics in blockchain.metrics.prices.items():
+            print(
+                Fore.MAGENTA
+                + f"LST: {token} | Price so far: min {metrics.min:.4f} / max {metrics.max:.4f} ETH"
+            )
+        self.reset()
@@ -1,19 +1,163 @@
 import json
 import math
+import warnings
+from bisect import bisect_left
 
+from simulator.event_stream import DEFAULT_LOOKAHEAD, EventStream
+from simulator.timeline import EVENT_HANDLERS, Timeline, event_key, register_handler
 from simulator.wallet import Wallet
 
+# `type` of the original event schema -> (target, method) of its handler
+LEGACY_EVENT_TYPES = {
+    'depeg': ('amm', 'depeg'),
+    'repeg': ('amm', 'repeg'),
+    'yield_adjustment': ('token', 'yield_adjustment'),
+    'eth_yield_adjustment': ('chain', 'eth_yield_adjustment'),
+}
+
+
+class EventSchedule(list):
+    """
+    The event list, bucketed by block as events are added.
+
+    It is a plain list of event dicts (so code that extends, sorts or
+    iterates `EventManager.events` keeps working), plus a `{block: [events]}`
+    index that makes `at_block` a dict lookup instead of a scan over every
+    event.  Within a block, events keep their list order.
+
+    Only `type` schema events are kept in the list; `target` / `method`
+    events added to it (e.g. by the old `events.extend(scenario_events)`)
+    are compiled into `timeline` instead.
+
+    :param events: Event dicts.
+    :param timeline: The `Timeline` that takes the `target` / `method`
+                     events; without one they are refused.
+    """
+
+    def __init__(self, events=(), timeline=None):
+        self.timeline = timeline
+        super().__init__(events)
+        self._rebuild()
+
+    def _route(self, events) -> list:
+        """The `type` schema events of `events`; the others go to the timeline."""
+        kept = []
+        for event in events:
+            if 'target' not in event:
+                kept.append(event)
+            elif self.timeline is not None:
+                self.timeline.add(event)
+            else:
+                raise ValueError(f"Event {event} uses the target/method schema and there is no timeline")
+        return kept
+
+    def _rebuild(self):
+        if any('target' in event for event in self):
+            list.__setitem__(self, slice(None), self._route(self))
+        self._by_block = {}
+        self._blocks = None
+        for event in self:
+            self._by_block.setdefault(event['block'], []).append(event)
+
+    def __reduce_ex__(self, protocol):
+        # copy/pickle rebuild the index from the events
+        return type(self), (list(self), self.timeline)
+
+    def at_block(self, block_number: int) -> list:
+        """The events scheduled for `block_number`, in list order."""
+        return self._by_block.get(block_number, [])
+
+    def next_block(self, block_number: int) -> int | None:
+        """The first block from `block_number` on with an event, or None."""
+        if self._blocks is None:
+            self._blocks = sorted(self._by_block)
+        index = bisect_left(self._blocks, block_number)
+        return self._blocks[index] if index < len(self._blocks) else None
+
+    def append(self, event):
+        if not self._route([event]):
+            return
+        super().append(event)
+        self._by_block.setdefault(event['block'], []).append(event)
+        self._blocks = None
+
+    def extend(self, events):
+        events = self._route(events)
+        super().extend(events)
+        for event in events:
+            self._by_block.setdefault(event['block'], []).append(event)
+        self._blocks = None
+
+    def __iadd__(self, events):
+        self.extend(events)
+        return self
+
+    def sort(self, *args, **kwargs):
+        # A stable sort by block leaves every bucket as it is; any other
+        # order may change the order within a block.
+        super().sort(*args, **kwargs)
+        self._rebuild()
+
+    # Rarely used mutations: apply, then re-index.
+    def _reindexing(name):
+        method = getattr(list, name)
+
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._rebuild()
+            return result
+
+        wrapper.__name__ = name
+        return wrapper
+
+    insert = _reindexing('insert')
+    remove = _reindexing('remove')
+    pop = _reindexing('pop')
+    clear = _reindexing('clear')
+    reverse = _reindexing('reverse')
+    __setitem__ = _reindexing('__setitem__')
+    __delitem__ = _reindexing('__delitem__')
+    del _reindexing
+
 
 class EventManager:
-    def __init__(self, events):
+    def __init__(self, events, stream: EventStream = None):
         """
         Initialize the EventManager with events and a wallet.
 
-        :param events: A list of event dictionaries.
+        :param events: A list of event dictionaries, in the `type` schema
+                       (depeg, repeg, ...) or the `target` / `method`
+                       schema of `simulator.timeline`.
+        :param stream: Optional `EventStream` read lazily as blocks are
+                       mined, on top of `events`.
         """
-        self.events = events
+        self.timeline = Timeline()
+        self.events = []
+        self.add_events(events)
+        self.stream = stream
         self.wallet = Wallet()
 
+    @property
+    def events(self) -> EventSchedule:
+        return self._events
+
+    @events.setter
+    def events(self, events):
+        if isinstance(events, EventSchedule) and events.timeline is self.timeline:
+            self._events = events
+        else:
+            self._events = EventSchedule(events, self.timeline)
+
+    def add_events(self, events):
+        """
+        Schedule more events; only the new events are indexed, the existing
+        ones are not re-sorted.  `target` / `method` events are validated
+        and compiled into `self.timeline`.
+
+        :param events: An iterable of event dictionaries.
+        """
+        self._events.extend(events)
+
     @staticmethod
     def from_json(json_file: str):
         """
@@ -26,15 +170,41 @@ class EventManager:
             events = json.load(f)
         return EventManager(events)
 
+    @staticmethod
+    def from_file(path: str, lookahead: int = DEFAULT_LOOKAHEAD):
+        """
+        Load events from a `.json` file (all at once), or stream them from a
+        `.jsonl` / `.npz` file (see `simulator.event_stream`).
+
+        :param path: Path to the event file.
+        :param lookahead: Blocks of streamed events to read ahead.
+        :return: An EventManager instance.
+        """
+        if path.endswith(('.jsonl', '.npz')):
+            return EventManager([], stream=EventStream(path, lookahead))
+        return EventManager.from_json(path)
+
     def on_block(self, block_number: int, blockchain):
         """
         Handle events that occur at the current block.
 
         :param block_number: The current block number.
         :param blockchain: The blockchain instance to interact with.
+        :return: The number of events that acted on this block.
         """
-        # Filter events for the current block
-        current_events = [event for event in self.events if event['block'] == block_number]
+        # Copy, so events scheduled while handling this block wait for the next call
+        current_events = list(self._events.at_block(block_number))
+
+        fired = 0
+        if self.stream is not None:
+            for event in self.stream.take(block_number):
+                if 'target' not in event:
+                    current_events.append(event)
+                elif 'block' in event:
+                    fired += self._fire_target_event(event, block_number, blockchain)
+                else:
+                    # range events run from the timeline, starting this block
+                    self.timeline.add(event)
 
         for event in current_events:
             token = event['token']
@@ -42,20 +212,37 @@ class EventManager:
             if token not in blockchain.tokens:
                 continue
 
-            if event['type'] == 'depeg':
-                percentage = event['percentage']
-                self._depeg(block_number, token, percentage, blockchain)
-
-            elif event['type'] == 'repeg':
-                self._repeg(block_number, token, blockchain)
+            key = LEGACY_EVENT_TYPES.get(event.get('type'))
+            if key is None:
+                warnings.warn(f"Block {block_number}: ignoring event of unknown type {event.get('type')!r}")
+                continue
+            handler = EVENT_HANDLERS[key]
+            if handler.func(self, blockchain, block_number, token, **handler.validate(event)):
+                fired += 1
 
-            elif event['type'] == 'yield_adjustment':
-                percentage = event['percentage']
-                self._adjust_yield(block_number, token, percentage, blockchain)
+        return fired + self.timeline.on_block(block_number, self, blockchain)
 
-            elif event['type'] == 'eth_yield_adjustment':
-                percentage = event['percentage']
-                self._adjust_eth_yield(block_number, token, percentage, blockchain)
+    def next_event_block(self, block_number: int) -> int | None:
+        """
+        The first block from `block_number` on that has an event scheduled
+        (from the event list, the timeline or the stream), or None.
+        """
+        candidates = [
+            self._events.next_block(block_number),
+            self.timeline.next_block(block_number),
+            self.stream.next_block() if self.stream is not None else None,
+        ]
+        candidates = [block for block in candidates if block is not None]
+        return min(candidates) if candidates else None
+
+    def _fire_target_event(self, event: dict, block_number: int, blockchain) -> int:
+        handler = EVENT_HANDLERS.get(event_key(event))
+        if handler is None:
+            raise ValueError(f"No event handler registered for {event_key(event)}")
+        token = event.get('token')
+        if token is not None and token not in blockchain.tokens:
+            return 0
+        return int(bool(handler.func(self, blockchain, block_number, token, **handler.validate(event))))
 
     def _depeg(self, block_number: int, token: str, percentage: float, blockchain):
         """
@@ -67,6 +254,7 @@ class EventManager:
                            Positive percentage reduces the price.
                            Negative percentage increases the price.
         :param blockchain: The blockchain instance.
+        :return: Whether the price was moved.
         """
         # Step 1: Get current AMM and price
         amm = blockchain.get_amm(token)
@@ -94,19 +282,24 @@ class EventManager:
             # Need to swap delta_y tokens for ETH (price goes down)
             self.wallet.deposit_token(token, delta_y)
             eth_received = amm.swap_token_for_eth(self.wallet, delta_y)
-            action = f"Depegged {token} downwards by {percentage * 100:.2f}%"
+            direction = "downwards"
         elif delta_x > 0:
             # Need to swap delta_x ETH for tokens (price goes up)
             self.wallet.deposit_eth(delta_x)
             tokens_received = amm.swap_eth_for_token(self.wallet, delta_x)
-            action = f"Depegged {token} upwards by {percentage * 100:.2f}%"
+            direction = "upwards"
         else:
             # No change needed
-            return
+            return False
 
         # Step 7: Verify new price
         final_price = amm.price_of_one_token_in_eth()
-        blockchain.add_action(f"Block {block_number}: {action} from {current_price:.4f} ETH to {final_price:.4f} ETH.")
+        blockchain.add_action(
+            "Block {}: Depegged {} {} by {:.2f}% from {:.4f} ETH to {:.4f} ETH.",
+            block_number, token, direction, percentage * 100, current_price, final_price,
+            kind="event",
+        )
+        return True
 
     def _repeg(self, block_number: int, token: str, blockchain):
         """
@@ -115,6 +308,7 @@ class EventManager:
         :param block_number: The block number where the event occurs.
         :param token: The token affected by the repeg.
         :param blockchain: The blockchain instance.
+        :return: Whether the price was moved.
         """
         # Step 1: Get the current AMM and price
         amm = blockchain.get_amm(token)
@@ -122,7 +316,7 @@ class EventManager:
 
         # Step 2: Ensure the price isn't already at 1:1
         if abs(current_price - 1.0) < 1e-6:
-            return
+            return False
 
         # Step 3: Get current reserves
         x = amm.reserve_eth  # Current ETH reserve
@@ -143,23 +337,27 @@ class EventManager:
             # Need to add ETH to the pool (swap ETH for tokens)
             self.wallet.deposit_eth(delta_x)
             tokens_received = amm.swap_eth_for_token(self.wallet, delta_x)
-            action = f"Repegged {token} upwards by adding {delta_x:.4f} ETH"
+            action, amount, unit = "adding", delta_x, "ETH"
         elif delta_y < 0:
             # Need to remove tokens from the pool (swap tokens for ETH)
             delta_y_abs = abs(delta_y)
             self.wallet.deposit_token(token, delta_y_abs)
             eth_received = amm.swap_token_for_eth(self.wallet, delta_y_abs)
-            action = f"Repegged {token} upwards by removing {delta_y_abs:.4f} tokens"
+            action, amount, unit = "removing", delta_y_abs, "tokens"
         else:
             # No change needed
-            return
+            return False
 
         # Step 7: Verify new price
         final_price = amm.price_of_one_token_in_eth()
 
         # Log the successful repeg
         blockchain.add_action(
-            f"Block {block_number}: {action}. Price adjusted from {current_price:.4f} ETH to {final_price:.4f} ETH.")
+            "Block {}: Repegged {} upwards by {} {:.4f} {}. Price adjusted from {:.4f} ETH to {:.4f} ETH.",
+            block_number, token, action, amount, unit, current_price, final_price,
+            kind="event",
+        )
+        return True
 
     def _adjust_yield(self, block_number: int, token: str, percentage: float, blockchain):
         """
@@ -171,7 +369,7 @@ class EventManager:
         :param blockchain: The blockchain instance.
         """
         blockchain.tokens[token]['yield_per_block'] = percentage
-        blockchain.add_action(f"Adjusted yield for {token} to {percentage * 100:.2f}%.")
+        blockchain.add_action("Adjusted yield for {} to {:.2f}%.", token, percentage * 100, kind="event")
 
     def _adjust_eth_yield(self, block_number, token, percentage, blockchain):
         """
@@ -183,4 +381,30 @@ class EventManager:
         :param blockchain: The blockchain instance.
         """
         blockchain.eth_yield = percentage
-        blockchain.add_action(f"Adjusted ETH yield to {percentage * 100:.2f}%.")
+        blockchain.add_action("Adjusted ETH yield to {:.2f}%.", percentage * 100, kind="event")
+
+
+# ----------------------------------------------------------------------
+# Handlers of the `type` schema, dispatched through the same registry as
+# the timeline events.
+# ----------------------------------------------------------------------
+@register_handler('amm', 'depeg', required=('percentage',))
+def _depeg_handler(manager, blockchain, block_number, token, percentage):
+    return manager._depeg(block_number, token, percentage, blockchain)
+
+
+@register_handler('amm', 'repeg')
+def _repeg_handler(manager, blockchain, block_number, token):
+    return manager._repeg(block_number, token, blockchain)
+
+
+@register_handler('token', 'yield_adjustment', required=('percentage',))
+def _yield_adjustment_handler(manager, blockchain, block_number, token, percentage):
+    manager._adjust_yield(block_number, token, percentage, blockchain)
+    return True
+
+
+@register_handler('chain', 'eth_yield_adjustment', required=('percentage',))
+def _eth_yield_adjustment_handler(manager, blockchain, block_number, token, percentage):
+    manager._adjust_eth_yield(block_number, token, percentage, blockchain)
+    return True
@@ -0,0 +1,225 @@
+"""
+Streaming event sources for long replays.
+
+`EventManager.from_json` reads the whole event list before block 1.  For
+multi-year, per-minute replays the events can instead come from
+
+* JSON Lines (`.jsonl`): one event dict per line, in either schema, and
+* NumPy (`.npz`): the `type` schema as columns `block` (int64), `type` and
+  `token` (int16 codes into the `types` / `tokens` arrays) and `value`
+  (float64, the event's `percentage`, NaN if it has none),
+
+read forward lazily by `EventStream` as the chain advances: only the
+events of the next `lookahead` blocks are held in memory.  Both formats
+must be sorted by block (`start_block` for range events).
+
+`convert_events` (or `python -m simulator.event_stream SRC DST`) turns the
+existing `.json` event files into either format.
+"""
+
+import argparse
+import itertools
+import json
+import zipfile
+from collections import deque
+
+import numpy as np
+
+DEFAULT_LOOKAHEAD = 64
+NPZ_COLUMNS = ("block", "type", "token", "value")
+NPZ_CHUNK_ROWS = 4096
+
+
+def event_block(event: dict) -> int:
+    """The block an event is first due on (`block` or `start_block`)."""
+    try:
+        return int(event["block"] if "block" in event else event["start_block"])
+    except KeyError:
+        raise ValueError(f"Event {event} has no 'block' or 'start_block'") from None
+
+
+# ----------------------------------------------------------------------
+# Readers
+# ----------------------------------------------------------------------
+def iter_jsonl(path: str):
+    """Yield the event dicts of a JSON Lines file, one line at a time."""
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _npy_chunks(member, chunk_rows: int):
+    """Yield a `.npy` member of an open archive in arrays of `chunk_rows`."""
+    version = np.lib.format.read_magic(member)
+    if version == (1, 0):
+        shape, _, dtype = np.lib.format.read_array_header_1_0(member)
+    else:
+        shape, _, dtype = np.lib.format.read_array_header_2_0(member)
+    remaining = shape[0] if shape else 0
+    while remaining:
+        rows = min(chunk_rows, remaining)
+        yield np.frombuffer(member.read(rows * dtype.itemsize), dtype=dtype, count=rows)
+        remaining -= rows
+
+
+def iter_npz(path: str, chunk_rows: int = NPZ_CHUNK_ROWS):
+    """
+    Yield the event dicts of an `.npz` event file, reading every column
+    `chunk_rows` rows at a time.
+    """
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("types.npy") as f:
+            types = np.lib.format.read_array(f).tolist()
+        with archive.open("tokens.npy") as f:
+            tokens = np.lib.format.read_array(f).tolist()
+
+        members = [archive.open(f"{name}.npy") for name in NPZ_COLUMNS]
+        try:
+            chunks = zip(*(_npy_chunks(member, chunk_rows) for member in members))
+            for blocks, type_codes, token_codes, values in chunks:
+                for block, type_code, token_code, value in zip(
+                    blocks.tolist(), type_codes.tolist(), token_codes.tolist(), values.tolist()
+                ):
+                    event = {"type": types[type_code], "block": block, "token": tokens[token_code]}
+                    if value == value:  # not NaN
+                        event["percentage"] = value
+                    yield event
+        finally:
+            for member in members:
+                member.close()
+
+
+def iter_events(path: str):
+    """Yield the events of a `.json`, `.jsonl` or `.npz` file."""
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    if path.endswith(".npz"):
+        return iter_npz(path)
+    with open(path, "r") as f:
+        return iter(json.load(f))
+
+
+# ----------------------------------------------------------------------
+# Look-ahead window
+# ----------------------------------------------------------------------
+class EventStream:
+    """
+    Reads events from an iterator in block order, keeping only the events
+    of the next `lookahead` blocks in memory.
+
+    A stream read from a file path can be copied and pickled (e.g. by
+    `Blockchain.monte_carlo_simulation`): the copy reopens the file and
+    skips the events already taken.
+
+    :param source: Event file path, or an iterable of event dicts, sorted
+                   by block.
+    :param lookahead: Blocks past the current one to read ahead.
+    """
+
+    def __init__(self, source, lookahead: int = DEFAULT_LOOKAHEAD, skip: int = 0):
+        if lookahead < 0:
+            raise ValueError("lookahead must not be negative")
+        self.path = source if isinstance(source, str) else None
+        events = iter_events(source) if self.path is not None else iter(source)
+        self.source = itertools.islice(events, skip, None)
+        self.lookahead = lookahead
+        self.window = deque()  # (block, event), in block order
+        self._taken = skip
+        self._last_block = None
+        self._exhausted = False
+
+    def __reduce__(self):
+        if self.path is None:
+            raise TypeError("Only an EventStream read from a file path can be copied")
+        return type(self), (self.path, self.lookahead, self._taken)
+
+    def _fill(self, until_block: int):
+        window = self.window
+        while not self._exhausted and (not window or window[-1][0] <= until_block):
+            event = next(self.source, None)
+            if event is None:
+                self._exhausted = True
+                return
+            block = event_block(event)
+            if self._last_block is not None and block < self._last_block:
+                raise ValueError(
+                    f"Streamed events must be sorted by block: {block} after {self._last_block}"
+                )
+            self._last_block = block
+            window.append((block, event))
+
+    def take(self, block_number: int) -> list:
+        """
+        Remove and return the events due on or before `block_number`
+        (so skipped blocks are caught up), reading ahead as needed.
+        """
+        self._fill(block_number + self.lookahead)
+        window = self.window
+        due = []
+        while window and window[0][0] <= block_number:
+            due.append(window.popleft()[1])
+        self._taken += len(due)
+        return due
+
+    def next_block(self) -> int | None:
+        """The first block with a pending event, or None when drained."""
+        # with an empty window, _fill reads (at least) the next event
+        self._fill(-1)
+        return self.window[0][0] if self.window else None
+
+
+# ----------------------------------------------------------------------
+# Conversion
+# ----------------------------------------------------------------------
+def write_jsonl(events, path: str):
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def write_npz(events, path: str):
+    """Write `type` schema events as the columns described above."""
+    types, tokens = {}, {}
+    columns = {name: [] for name in NPZ_COLUMNS}
+    for event in events:
+        if "type" not in event or "block" not in event:
+            raise ValueError(f"Only single-block `type` events fit the .npz format: {event}")
+        columns["block"].append(int(event["block"]))
+        columns["type"].append(types.setdefault(event["type"], len(types)))
+        columns["token"].append(tokens.setdefault(event["token"], len(tokens)))
+        columns["value"].append(float(event.get("percentage", np.nan)))
+    np.savez_compressed(
+        path,
+        block=np.array(columns["block"], dtype=np.int64),
+        type=np.array(columns["type"], dtype=np.int16),
+        token=np.array(columns["token"], dtype=np.int16),
+        value=np.array(columns["value"], dtype=np.float64),
+        types=np.array(list(types), dtype=str),
+        tokens=np.array(list(tokens), dtype=str),
+    )
+
+
+def convert_events(source_path: str, target_path: str):
+    """
+    Convert an event file to `.jsonl` or `.npz` (by `target_path`'s
+    extension), sorted by block; events of the same block keep their order.
+    """
+    events = sorted(iter_events(source_path), key=event_block)
+    if target_path.endswith(".jsonl"):
+        write_jsonl(events, target_path)
+    elif target_path.endswith(".npz"):
+        write_npz(events, target_path)
+    else:
+        raise ValueError(f"Unknown event file format: {target_path}")
+    return len(events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert an event file to .jsonl or .npz.")
+    parser.add_argument("source", help="Event file (.json, .jsonl or .npz)")
+    parser.add_argument("target", help="Output file (.jsonl or .npz)")
+    args = parser.parse_args()
+    count = convert_events(args.source, args.target)
+    print(f"Wrote {count} events to {args.target}")
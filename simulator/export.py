@@ -0,0 +1,188 @@
+"""
+Columnar export of simulation results.
+
+`write_results` persists every table of a `main.main()` /
+`runner.run_simulation()` result to Parquet or Arrow IPC with an explicit
+schema, and `read_results` opens them again (Arrow IPC files are
+memory-mapped).  Nothing in the written files is a Python object:
+
+* the agents' balance dicts become one float64 column per token
+  (`bal_stETH`, `bal_CT_stETH`, ...) and per pool (`lpt_V_stETH`, ...);
+* a trade's `additional_info` dict is stored as JSON text;
+* non-table results (`final_block`, `summary`) go to `metadata.json`.
+
+Requires pyarrow.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from simulator.stats import STATS_SCHEMA
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BALANCE_COLUMNS = {"wallet_token_balances": "bal_", "wallet_lpt_balances": "lpt_"}
+METADATA_FILE = "metadata.json"
+
+TRADE_COLUMNS = {
+    "block": np.int64,
+    "agent": object,
+    "token": object,
+    "volume": np.float64,
+    "action": object,
+    "reason": object,
+    "additional_info": object,
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as err:
+        raise ImportError("Exporting results needs pyarrow: pip install pyarrow") from err
+    return pyarrow
+
+
+def flatten_agent_balances(agents: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace the `wallet_token_balances` / `wallet_lpt_balances` dict columns
+    of an agents frame by one float64 column per token (`bal_<token>`) and
+    per pool (`lpt_<pool>`).  Balances an agent never held are 0.0.
+    """
+    flat = agents.drop(columns=[name for name in BALANCE_COLUMNS if name in agents.columns])
+    parts = [flat]
+    for name, prefix in BALANCE_COLUMNS.items():
+        if name not in agents.columns:
+            continue
+        balances = pd.DataFrame.from_records(list(agents[name]), index=agents.index)
+        parts.append(balances.fillna(0.0).astype(np.float64).add_prefix(prefix))
+    return pd.concat(parts, axis=1)
+
+
+def _known_dtypes() -> dict:
+    known = dict(TRADE_COLUMNS)
+    for columns in STATS_SCHEMA.values():
+        known.update(dict(columns))
+    return known
+
+
+def _arrow_type(pa, name: str, series: pd.Series, known: dict):
+    if name.startswith(tuple(BALANCE_COLUMNS.values())):
+        return pa.float64()
+    dtype = known.get(name)
+    if dtype is None:
+        if pd.api.types.is_bool_dtype(series):
+            return pa.bool_()
+        if pd.api.types.is_integer_dtype(series):
+            dtype = np.int64
+        elif pd.api.types.is_float_dtype(series):
+            dtype = np.float64
+        else:
+            dtype = object
+    if dtype is np.int64:
+        return pa.int64()
+    if dtype is np.float64:
+        return pa.float64()
+    return pa.string()
+
+
+def _to_text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+def to_arrow_table(frame: pd.DataFrame):
+    """
+    Convert a result frame into a `pyarrow.Table` with an explicit schema:
+    int64 / float64 for numeric columns, string for everything else (dicts
+    and lists as JSON text).
+    """
+    pa = _pyarrow()
+    if any(name in frame.columns for name in BALANCE_COLUMNS):
+        frame = flatten_agent_balances(frame)
+
+    known = _known_dtypes()
+    fields = []
+    arrays = []
+    for name in frame.columns:
+        series = frame[name]
+        arrow_type = _arrow_type(pa, name, series, known)
+        if pa.types.is_string(arrow_type):
+            values = [_to_text(value) for value in series]
+        else:
+            values = series.to_numpy()
+        fields.append(pa.field(name, arrow_type))
+        arrays.append(pa.array(values, type=arrow_type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_results(results: dict, directory: str, fmt: str = "parquet") -> dict:
+    """
+    Write every table of a simulation result to `directory`.
+
+    :param results: The result returned by `main.main()` or
+                    `runner.run_simulation()` (or any dict of frames).
+    :param directory: Output directory (created if missing).
+    :param fmt: "parquet" or "arrow" (Arrow IPC / Feather v2).
+    :return: `{result key: file path}` for the tables written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {list(FORMATS)}, got '{fmt}'")
+    pa = _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+
+    paths = {}
+    metadata = {}
+    for key, value in results.items():
+        if isinstance(value, list):
+            value = pd.DataFrame(value)
+        if not isinstance(value, pd.DataFrame):
+            metadata[key] = value
+            continue
+
+        table = to_arrow_table(value)
+        path = os.path.join(directory, key + FORMATS[fmt])
+        if fmt == "parquet":
+            pa.parquet.write_table(table, path)
+        else:
+            with pa.OSFile(path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        paths[key] = path
+
+    with open(os.path.join(directory, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, default=str)
+    return paths
+
+
+def read_results(directory: str, as_arrow: bool = False) -> dict:
+    """
+    Open the tables written by `write_results`.
+
+    Arrow IPC files are memory-mapped, so with `as_arrow=True` the columns
+    are read without copying; otherwise each table is converted to pandas.
+    """
+    pa = _pyarrow()
+    results = {}
+    for file_name in sorted(os.listdir(directory)):
+        key, extension = os.path.splitext(file_name)
+        path = os.path.join(directory, file_name)
+        if extension == FORMATS["arrow"]:
+            table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        elif extension == FORMATS["parquet"]:
+            table = pa.parquet.read_table(path, memory_map=True)
+        else:
+            continue
+        results[key] = table if as_arrow else table.to_pandas()
+
+    metadata_path = os.path.join(directory, METADATA_FILE)
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            results.update(json.load(f))
+    return results
@@ -0,0 +1,104 @@
+"""
+Cumulative fee accounting of an AMM.
+
+`FeeLedger` keeps the fees an AMM collected in one asset as running totals
+per block, so the fees of any block range are one subtraction instead of a
+sum over the range.  Per-LP attribution uses a fee-growth-per-LP-share
+accumulator (as in Uniswap V3): the AMM adds `fee / total_lpt_supply` to
+its growth on every swap and remembers the growth each LP last settled at,
+so an LP's share of the fees is `lpt * (growth - checkpoint)` at any time.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from simulator.journal import save_append, save_attr, save_item
+
+
+class FeeLedger:
+    """
+    Fees of one asset, as running totals of the blocks that collected fees:
+    `totals[i]` is everything collected up to and including `blocks[i]`.
+    Booking a fee appends to (or adds to the last of) the two arrays, so it
+    journals a constant number of entries however many blocks passed since
+    the last fee, and the ledger grows with the blocks that collected fees,
+    not with the length of the chain.
+
+    Reading `ledger[block]` gives the fees of that block alone (0.0 for a
+    block with none).  Iterating yields the fees of each block from 0 to the
+    last booked one, so `sum(ledger)` is the total; `items()`, `keys()` and
+    `values()` cover the blocks that collected fees, like the dict the
+    ledger replaced.
+    """
+
+    def __init__(self):
+        self.blocks = array("q")
+        self.totals = array("d")
+
+    def add(self, block_number: int, amount: float):
+        """Book `amount` of fees on `block_number`."""
+        blocks, totals = self.blocks, self.totals
+        if not blocks or block_number > blocks[-1]:
+            total = totals[-1] if totals else 0.0
+            save_append(blocks)
+            blocks.append(block_number)
+            save_append(totals)
+            totals.append(total + amount)
+        elif block_number == blocks[-1]:
+            save_item(totals, len(totals) - 1)
+            totals[-1] += amount
+        else:
+            # an earlier block than the latest booked one (a chain mined
+            # again): rebuild the arrays, every later total grows too
+            index = bisect_left(blocks, block_number)
+            new_blocks, new_totals = blocks[:index], totals[:index]
+            if blocks[index] != block_number:
+                new_blocks.append(block_number)
+                new_totals.append((totals[index - 1] if index else 0.0) + amount)
+            new_blocks.extend(blocks[index:])
+            new_totals.extend(total + amount for total in totals[index:])
+            save_attr(self, "blocks")
+            save_attr(self, "totals")
+            self.blocks, self.totals = new_blocks, new_totals
+
+    def total_until(self, block_number: int) -> float:
+        """Fees of blocks 0..`block_number`."""
+        index = bisect_right(self.blocks, block_number)
+        return self.totals[index - 1] if index else 0.0
+
+    def between(self, start_block: int, end_block: int) -> float:
+        """Fees of blocks `start_block`..`end_block` (inclusive)."""
+        if end_block < start_block:
+            return 0.0
+        return self.total_until(end_block) - self.total_until(start_block - 1)
+
+    @property
+    def total(self) -> float:
+        return self.totals[-1] if self.totals else 0.0
+
+    def __getitem__(self, block_number: int) -> float:
+        return self.between(block_number, block_number)
+
+    def __len__(self) -> int:
+        return self.blocks[-1] + 1 if self.blocks else 0
+
+    def __iter__(self):
+        fees = dict(self.items())
+        for block in range(len(self)):
+            yield fees.get(block, 0.0)
+
+    def items(self):
+        """`(block, fees)` of every block that collected fees."""
+        previous = 0.0
+        items = []
+        for block, total in zip(self.blocks, self.totals):
+            if total != previous:
+                items.append((block, total - previous))
+            previous = total
+        return items
+
+    def keys(self):
+        return [block for block, _ in self.items()]
+
+    def values(self):
+        return [fee for _, fee in self.items()]
@@ -0,0 +1,112 @@
+"""
+Undo journal for speculative operations.
+
+While a `Transaction` is open, every change to the state of wallets, AMMs,
+PSMs, vaults and the chain's borrow ledgers is preceded by a call that
+saves the old value:
+
+* `save_attr(obj, name)` before `obj.name` is assigned,
+* `save_item(container, key)` before `container[key]` is assigned or
+  deleted (dicts, and the balance arrays of wallets),
+* `save_append(list)` before an append.
+
+`Transaction.rollback` restores the saved values in reverse order, so
+undoing a block of operations takes time proportional to the changes it
+made, not to the size of the chain (as a deep copy would)::
+
+    with blockchain.transaction() as txn:
+        vault.buy_ds(wallet, 1.0)
+        ...
+        txn.rollback()
+
+With no transaction open the calls return right away.  Transactions nest;
+committing an inner one hands its entries to the outer one.
+"""
+
+# Open transactions, innermost last
+_open = []
+
+_ATTR = 0
+_ITEM = 1
+_APPEND = 2
+_MISSING = object()
+
+
+def save_attr(obj, name: str):
+    """Journal `obj.name` before it changes."""
+    if _open:
+        _open[-1].entries.append((_ATTR, obj, name, getattr(obj, name)))
+
+
+def save_item(container, key):
+    """Journal `container[key]` (absent keys included) before it changes."""
+    if _open:
+        if isinstance(container, dict):
+            old = container[key] if key in container else _MISSING
+        else:
+            old = container[key]
+        _open[-1].entries.append((_ITEM, container, key, old))
+
+
+def save_append(items: list):
+    """Journal an append to `items`."""
+    if _open:
+        _open[-1].entries.append((_APPEND, items, None, None))
+
+
+def in_transaction() -> bool:
+    return bool(_open)
+
+
+class Transaction:
+    """
+    A journal of changes that can be rolled back.
+
+    Used as a context manager: the changes are kept when the block ends
+    normally and rolled back when it raises.
+
+    :param action_log: An `ActionLog` whose actions of the current block
+                       recorded during the transaction are dropped on
+                       rollback.
+    """
+
+    def __init__(self, action_log=None):
+        self.entries = []
+        self.action_log = action_log
+        self._actions_at_start = None
+
+    def __enter__(self):
+        _open.append(self)
+        if self.action_log is not None:
+            self._actions_at_start = len(self.action_log.current)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        _open.remove(self)
+        if exc_type is None and _open:
+            # an outer transaction can still undo what this one kept
+            _open[-1].entries.extend(self.entries)
+        self.entries = []
+        return False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def rollback(self):
+        """Undo every change journaled so far (the transaction stays open)."""
+        entries = self.entries
+        while entries:
+            kind, target, key, old = entries.pop()
+            if kind == _ATTR:
+                setattr(target, key, old)
+            elif kind == _ITEM:
+                if old is _MISSING:
+                    del target[key]
+                else:
+                    target[key] = old
+            else:
+                target.pop()
+        if self.action_log is not None and self._actions_at_start is not None:
+            del self.action_log.current[self._actions_at_start:]
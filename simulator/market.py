@@ -0,0 +1,113 @@
+"""
+Typed market records of a chain.
+
+`Blockchain.add_token` builds one `Market` per LST: its LST/ETH, CT/ETH and
+DS/ETH AMMs, PSM, vault, yield and token handles, linked once.  Agents get
+their market in `Agent.on_after_genesis` (`agent.market`), so a per-block
+lookup is an attribute load instead of `blockchain.tokens[...]` plus a
+formatted `f'CT_{...}'` key.
+
+`Blockchain.tokens` keeps its `{token: {"amm": ..., "psm": ..., ...}}`
+shape for compatibility: an LST's entry is a `MarketEntry`, a dict view
+that reads and writes the `Market`'s attributes.
+"""
+
+from collections.abc import MutableMapping
+
+
+class Market:
+    """
+    One LST and everything `add_token` created for it.
+
+    :param symbol: The LST symbol (e.g. "stETH").
+    :param initial_agent_balance: LST every agent receives at genesis.
+    :param lst_amm: The LST/ETH AMM.
+    :param ct_amm: The CT/ETH AMM.
+    :param ds_amm: The DS/ETH AMM.
+    :param psm: The Peg Stability Module.
+    :param vault: The vault.
+    :param yield_per_block: Yield of the LST per block.
+    """
+
+    __slots__ = (
+        "symbol", "initial_agent_balance", "lst_amm", "ct_amm", "ds_amm", "psm", "vault",
+        "yield_per_block", "lst", "ct", "ds",
+    )
+
+    def __init__(self, symbol: str, initial_agent_balance: float, lst_amm, ct_amm, ds_amm,
+                 psm, vault, yield_per_block: float):
+        self.symbol = symbol
+        self.initial_agent_balance = initial_agent_balance
+        self.lst_amm = lst_amm
+        self.ct_amm = ct_amm
+        self.ds_amm = ds_amm
+        self.psm = psm
+        self.vault = vault
+        self.yield_per_block = yield_per_block
+        # TokenHandles of the LST, its CT and its DS
+        self.lst = psm.lst_handle
+        self.ct = psm.ct_handle
+        self.ds = psm.ds_handle
+
+    def pools(self):
+        """`(token, amm)` of the LST, CT and DS pools, in that order."""
+        return (
+            (self.symbol, self.lst_amm),
+            (self.ct.name, self.ct_amm),
+            (self.ds.name, self.ds_amm),
+        )
+
+    def __repr__(self):
+        return f"Market({self.symbol!r})"
+
+
+# `Blockchain.tokens` entry key -> Market attribute
+ENTRY_FIELDS = {
+    "initial_agent_balance": "initial_agent_balance",
+    "amm": "lst_amm",
+    "psm": "psm",
+    "vault": "vault",
+    "yield_per_block": "yield_per_block",
+}
+
+
+class MarketEntry(MutableMapping):
+    """
+    The `Blockchain.tokens` entry of an LST: a dict view of its `Market`.
+    Keys outside `ENTRY_FIELDS` are kept on the entry itself.
+    """
+
+    def __init__(self, market: Market):
+        self.market = market
+        self._extra = {}
+
+    def __getitem__(self, key):
+        field = ENTRY_FIELDS.get(key)
+        if field is None:
+            return self._extra[key]
+        return getattr(self.market, field)
+
+    def __setitem__(self, key, value):
+        field = ENTRY_FIELDS.get(key)
+        if field is None:
+            self._extra[key] = value
+        else:
+            setattr(self.market, field, value)
+
+    def __delitem__(self, key):
+        if key in ENTRY_FIELDS:
+            raise ValueError(f"The market field {key!r} cannot be removed")
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in ENTRY_FIELDS or key in self._extra
+
+    def __iter__(self):
+        yield from ENTRY_FIELDS
+        yield from self._extra
+
+    def __len__(self):
+        return len(ENTRY_FIELDS) + len(self._extra)
+
+    def __repr__(self):
+        return repr(dict(self))
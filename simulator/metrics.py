@@ -0,0 +1,196 @@
+"""
+Streaming summary metrics, updated by `Blockchain.collect_stats` on every
+block.
+
+Each `SeriesMetrics` keeps O(1) state for one series (a token price or a
+PSM's ETH reserve): running min/max, the number of blocks under a
+threshold, the first block that breached it, peak-to-trough drawdown and
+time-to-recovery.  `MetricsTracker` holds one per token and PSM, so the
+numbers behind `analysis.summarize` are available even when the full stats
+tables are not recorded (see `StatsPolicy`).
+"""
+
+import math
+
+
+class SeriesMetrics:
+    """
+    Online metrics of a single series.
+
+    :param threshold: Values strictly below it count as a breach (`None`
+                      disables the breach metrics).
+    """
+
+    def __init__(self, threshold: float | None = None):
+        self.threshold = threshold
+
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.min = math.inf
+        self.max = -math.inf
+        self.min_block = None
+        self.max_block = None
+
+        # peak-to-trough drawdown
+        self.peak = -math.inf
+        self.max_drawdown = 0.0
+
+        # threshold breaches
+        self.blocks_below = 0
+        self.first_breach_block = None
+        self.breach_start = None
+        self.recovery_blocks = []
+
+    def update(self, block_number: int, value: float):
+        self.count += 1
+        if self.first is None:
+            self.first = value
+        self.last = value
+
+        if value < self.min:
+            self.min = value
+            self.min_block = block_number
+        if value > self.max:
+            self.max = value
+            self.max_block = block_number
+
+        if value > self.peak:
+            self.peak = value
+        elif self.peak > 0:
+            drawdown = (self.peak - value) / self.peak
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+
+        if self.threshold is None:
+            return
+        if value < self.threshold:
+            self.blocks_below += 1
+            if self.first_breach_block is None:
+                self.first_breach_block = block_number
+            if self.breach_start is None:
+                self.breach_start = block_number
+        elif self.breach_start is not None:
+            self.recovery_blocks.append(block_number - self.breach_start)
+            self.breach_start = None
+
+    def update_repeated(self, first_block: int, last_block: int, value: float):
+        """
+        Same as `update(block, value)` for every block of
+        `first_block`..`last_block` (inclusive): a repeated value only moves
+        the counters after the first block.
+        """
+        self.update(first_block, value)
+        repeats = last_block - first_block
+        self.count += repeats
+        if self.threshold is not None and value < self.threshold:
+            self.blocks_below += repeats
+
+    @property
+    def drawdown_from_start(self) -> float:
+        """Drop from the first value to the minimum, as a fraction of the first."""
+        if not self.first:
+            return 0.0
+        return (self.first - self.min) / self.first
+
+    @property
+    def max_time_to_recovery(self) -> int | None:
+        """Longest breach that ended back at or above the threshold, in blocks."""
+        return max(self.recovery_blocks) if self.recovery_blocks else None
+
+    @property
+    def recovered(self) -> bool:
+        """False while the series is still below the threshold."""
+        return self.breach_start is None
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "first": self.first,
+            "last": self.last,
+            "min": self.min,
+            "min_block": self.min_block,
+            "max": self.max,
+            "max_block": self.max_block,
+            "max_drawdown": self.max_drawdown,
+            "drawdown_from_start": self.drawdown_from_start,
+            "blocks_below": self.blocks_below,
+            "first_breach_block": self.first_breach_block,
+            "max_time_to_recovery": self.max_time_to_recovery,
+            "recovered": self.recovered,
+        }
+
+
+class MetricsTracker:
+    """
+    `SeriesMetrics` for every token price and PSM reserve of a chain.
+
+    :param peg: Price of a pegged token in ETH.
+    :param under_peg: Prices below `peg * under_peg` count as under the peg.
+    """
+
+    def __init__(self, peg: float = 1.0, under_peg: float = 0.99):
+        self.peg = peg
+        self.under_peg = under_peg
+        self.reset()
+
+    def reset(self):
+        self.prices = {}
+        self.psm_reserves = {}
+
+    def update(self, block_number: int, tokens: dict):
+        """Feed the current state of `Blockchain.tokens` for `block_number`."""
+        for token, lst_info in tokens.items():
+            if "amm" in lst_info:
+                metrics = self.prices.get(token)
+                if metrics is None:
+                    metrics = self.prices[token] = SeriesMetrics(self.peg * self.under_peg)
+                metrics.update(block_number, lst_info["amm"].price_of_one_token_in_eth())
+            if "psm" in lst_info:
+                metrics = self.psm_reserves.get(token)
+                if metrics is None:
+                    metrics = self.psm_reserves[token] = SeriesMetrics()
+                metrics.update(block_number, lst_info["psm"].eth_reserve)
+
+    def update_many(self, first_block: int, last_block: int, tokens: dict):
+        """
+        `update` for every block of `first_block`..`last_block`, with
+        `tokens` unchanged across them (a fast-forwarded quiet stretch).
+        """
+        for token, lst_info in tokens.items():
+            if "amm" in lst_info:
+                metrics = self.prices.get(token)
+                if metrics is None:
+                    metrics = self.prices[token] = SeriesMetrics(self.peg * self.under_peg)
+                metrics.update_repeated(
+                    first_block, last_block, lst_info["amm"].price_of_one_token_in_eth()
+                )
+            if "psm" in lst_info:
+                metrics = self.psm_reserves.get(token)
+                if metrics is None:
+                    metrics = self.psm_reserves[token] = SeriesMetrics()
+                metrics.update_repeated(first_block, last_block, lst_info["psm"].eth_reserve)
+
+    def summary(self) -> dict:
+        """
+        The metrics of `analysis.summarize`, computed from the accumulators:
+        the lowest price over all tokens, the number of (block, token) prices
+        under the peg and the drawdown of the first PSM's reserve from its
+        start to the lowest reserve of any PSM.
+        """
+        prices = list(self.prices.values())
+        min_price = min((m.min for m in prices), default=math.nan)
+
+        draw_pct = 0.0
+        reserves = list(self.psm_reserves.values())
+        if reserves:
+            start = reserves[0].first
+            min_reserve = min(m.min for m in reserves)
+            draw_pct = (start - min_reserve) / start if start else 0.0
+
+        return dict(
+            min_price=float(min_price),
+            min_pct=float(1 - min_price / self.peg),
+            blocks_under_peg=sum(m.blocks_below for m in prices),
+            psm_drawdown_pct=float(draw_pct),
+        )
@@ -1,4 +1,5 @@
-from simulator.wallet import Wallet
+from simulator.journal import save_attr
+from simulator.wallet import TokenHandle, Wallet
 
 
 class PegStabilityModule:
@@ -12,6 +13,10 @@ class PegStabilityModule:
         :param repurchase_fee: The fee applied on repurchase (e.g., 0.05 for 5%).
         """
         self.token_symbol = token_symbol
+        # the token IDs, resolved once for the wallet calls below
+        self.lst_handle = TokenHandle(token_symbol)
+        self.ct_handle = TokenHandle(f'CT_{token_symbol}')
+        self.ds_handle = TokenHandle(f'DS_{token_symbol}')
         self.expiry_block = expiry_block
         self.eth_reserve = 0.0
         self.token_reserve = 0.0
@@ -20,6 +25,13 @@ class PegStabilityModule:
         self.total_redemption_fee = 0.0
         self.total_repurchase_fee = 0.0
 
+    def _save_reserves(self):
+        # journal the reserves and fee totals an operation is about to modify
+        save_attr(self, "eth_reserve")
+        save_attr(self, "token_reserve")
+        save_attr(self, "total_redemption_fee")
+        save_attr(self, "total_repurchase_fee")
+
     def deposit_eth(self, wallet: Wallet, amount_eth: float):
         """Deposit ETH into the PSM and receive CT and DS tokens."""
         if amount_eth <= 0:
@@ -29,10 +41,11 @@ class PegStabilityModule:
         wallet.withdraw_eth(amount_eth)
 
         # Mint equivalent amount of CT and DS tokens
-        wallet.deposit_token(f'CT_{self.token_symbol}', amount_eth)
-        wallet.deposit_token(f'DS_{self.token_symbol}', amount_eth)
+        wallet.deposit_token(self.ct_handle, amount_eth)
+        wallet.deposit_token(self.ds_handle, amount_eth)
 
         # Increase PSM ETH reserve
+        self._save_reserves()
         self.eth_reserve += amount_eth
 
     def redeem_with_ct_and_ds(self, wallet: Wallet, amount_tokens: float, current_block: int) -> float:
@@ -51,13 +64,13 @@ class PegStabilityModule:
             raise ValueError("Redemption amount must be positive")
 
         # Check if the wallet has enough CT and DS tokens
-        if wallet.token_balance(f'CT_{self.token_symbol}') < amount_tokens or \
-           wallet.token_balance(f'DS_{self.token_symbol}') < amount_tokens:
+        if wallet.token_balance(self.ct_handle) < amount_tokens or \
+           wallet.token_balance(self.ds_handle) < amount_tokens:
             raise ValueError("Not enough CT or DS tokens in wallet to cover redemption")
 
         # Withdraw CT and DS tokens from the wallet
-        wallet.withdraw_token(f'CT_{self.token_symbol}', amount_tokens)
-        wallet.withdraw_token(f'DS_{self.token_symbol}', amount_tokens)
+        wallet.withdraw_token(self.ct_handle, amount_tokens)
+        wallet.withdraw_token(self.ds_handle, amount_tokens)
 
         # Calculate the fee
         fee_eth = amount_tokens * self.redemption_fee
@@ -72,6 +85,7 @@ class PegStabilityModule:
         wallet.deposit_eth(net_eth)
 
         # Update PSM reserves
+        self._save_reserves()
         self.eth_reserve -= net_eth
         self.token_reserve += amount_tokens  # Increase the PSM's token reserve by the full amount of tokens provided
 
@@ -95,13 +109,13 @@ class PegStabilityModule:
             raise ValueError("Redemption amount must be positive")
 
         # Check if the wallet has enough tokens and DS tokens
-        if wallet.token_balance(self.token_symbol) < amount_tokens or \
-           wallet.token_balance(f'DS_{self.token_symbol}') < amount_tokens:
+        if wallet.token_balance(self.lst_handle) < amount_tokens or \
+           wallet.token_balance(self.ds_handle) < amount_tokens:
             raise ValueError("Not enough tokens or DS tokens in wallet to cover redemption")
 
         # Withdraw tokens and DS tokens from the wallet
-        wallet.withdraw_token(self.token_symbol, amount_tokens)
-        wallet.withdraw_token(f'DS_{self.token_symbol}', amount_tokens)
+        wallet.withdraw_token(self.lst_handle, amount_tokens)
+        wallet.withdraw_token(self.ds_handle, amount_tokens)
 
         # Calculate the fee
         fee_eth = amount_tokens * self.redemption_fee
@@ -116,6 +130,7 @@ class PegStabilityModule:
         wallet.deposit_eth(net_eth)
 
         # Update PSM reserves
+        self._save_reserves()
         self.eth_reserve -= net_eth
         self.token_reserve += amount_tokens
 
@@ -139,11 +154,11 @@ class PegStabilityModule:
             raise ValueError("Redemption amount must be positive")
 
         # Check if the wallet has enough CT tokens
-        if wallet.token_balance(f'CT_{self.token_symbol}') < amount_tokens:
+        if wallet.token_balance(self.ct_handle) < amount_tokens:
             raise ValueError("Not enough CT tokens in wallet to cover redemption")
 
         # Withdraw CT tokens from the wallet
-        wallet.withdraw_token(f'CT_{self.token_symbol}', amount_tokens)
+        wallet.withdraw_token(self.ct_handle, amount_tokens)
 
         # Calculate the fee
         fee_eth = amount_tokens * self.redemption_fee
@@ -158,6 +173,7 @@ class PegStabilityModule:
         wallet.deposit_eth(net_eth)
 
         # Update PSM reserves
+        self._save_reserves()
         self.eth_reserve -= net_eth
         self.token_reserve += amount_tokens
 
@@ -194,14 +210,15 @@ class PegStabilityModule:
         wallet.withdraw_eth(amount_eth)
 
         # Increase PSM ETH reserve by amount_eth
+        self._save_reserves()
         self.eth_reserve += amount_eth
 
         # Decrease PSM token reserve by amount_tokens
         self.token_reserve -= amount_tokens
 
         # Transfer tokens to the wallet
-        wallet.deposit_token(self.token_symbol, amount_tokens)
-        wallet.deposit_token(f'DS_{self.token_symbol}', amount_tokens)
+        wallet.deposit_token(self.lst_handle, amount_tokens)
+        wallet.deposit_token(self.ds_handle, amount_tokens)
 
         self.total_repurchase_fee += fee_eth
 
@@ -0,0 +1,212 @@
+"""
+Multi-resolution ("pyramid") storage of the numeric stats series.
+
+Every value column of the `tokens`, `amms`, `psms` and `vaults` tables is
+kept per series (table, token, column) at several coarser resolutions: one
+bucket per 10, per 100 and per 1000 blocks by default.  Each bucket holds
+the min, max, mean and last value of the rows written into it.  The buckets
+are updated incrementally as rows are written, so after the run a chart can
+ask for any block range at a target number of points and read a handful of
+already aggregated buckets, however long the run was.  A range that fits in
+`points` at full resolution is read from the recorded table itself, which
+is the one-block level.
+
+The buckets live in NumPy arrays sized from the run length, about 1/9 of a
+float per recorded block and value column.
+"""
+
+import numpy as np
+
+PYRAMID_LEVELS = (10, 100, 1000)
+PYRAMID_TABLES = ("tokens", "amms", "psms", "vaults")
+
+
+def bucket(blocks: np.ndarray, values: np.ndarray, width: int, start: int, end: int) -> dict:
+    """
+    min/max/mean/last of `values` recorded on `blocks` (ascending) in buckets
+    of `width` blocks, for the buckets overlapping blocks `start`..`end`.
+    """
+    first = start - start % width
+    lo = np.searchsorted(blocks, first, side="left")
+    hi = np.searchsorted(blocks, end - end % width + width, side="left")
+    blocks = np.asarray(blocks[lo:hi], dtype=np.int64)
+    values = np.asarray(values[lo:hi], dtype=np.float64)
+    if not len(blocks):
+        empty = np.empty(0, dtype=np.float64)
+        return {"block": np.empty(0, dtype=np.int64), "min": empty, "max": empty,
+                "mean": empty, "last": empty}
+    starts = blocks - blocks % width
+    edges = np.flatnonzero(np.diff(starts)) + 1
+    heads = np.concatenate(([0], edges))
+    tails = np.concatenate((edges, [len(values)])) - 1
+    return {
+        "block": starts[heads],
+        "min": np.minimum.reduceat(values, heads),
+        "max": np.maximum.reduceat(values, heads),
+        "mean": np.add.reduceat(values, heads) / (tails - heads + 1),
+        "last": values[tails],
+    }
+
+
+class _Level:
+    """Buckets of one resolution, as parallel NumPy arrays (one entry per bucket)."""
+
+    def __init__(self, width: int, num_blocks: int):
+        self.width = width
+        self.size = 0
+        self._allocate(num_blocks // width + 2)
+
+    def _allocate(self, capacity: int):
+        old = self.size and (self.starts, self.mins, self.maxs, self.sums, self.counts, self.lasts)
+        self.starts = np.empty(capacity, dtype=np.int64)
+        self.mins = np.empty(capacity, dtype=np.float64)
+        self.maxs = np.empty(capacity, dtype=np.float64)
+        self.sums = np.empty(capacity, dtype=np.float64)
+        self.counts = np.empty(capacity, dtype=np.int64)
+        self.lasts = np.empty(capacity, dtype=np.float64)
+        if old:
+            for new, kept in zip(
+                (self.starts, self.mins, self.maxs, self.sums, self.counts, self.lasts), old
+            ):
+                new[:self.size] = kept[:self.size]
+
+    def add(self, block_number: int, value: float):
+        start = block_number - block_number % self.width
+        last = self.size - 1
+        if last >= 0 and self.starts[last] == start:
+            if value < self.mins[last]:
+                self.mins[last] = value
+            if value > self.maxs[last]:
+                self.maxs[last] = value
+            self.sums[last] += value
+            self.counts[last] += 1
+            self.lasts[last] = value
+            return
+        if self.size == len(self.starts):
+            self._allocate(2 * self.size)
+        last += 1
+        self.starts[last] = start
+        self.mins[last] = value
+        self.maxs[last] = value
+        self.sums[last] = value
+        self.counts[last] = 1
+        self.lasts[last] = value
+        self.size += 1
+
+    def slice(self, start: int, end: int) -> dict:
+        """Buckets overlapping blocks `start`..`end` (inclusive)."""
+        starts = self.starts[:self.size]
+        lo = max(int(np.searchsorted(starts, start, side="right")) - 1, 0)
+        hi = int(np.searchsorted(starts, end + 1, side="left"))
+        return {
+            "block": starts[lo:hi].copy(),
+            "min": self.mins[lo:hi].copy(),
+            "max": self.maxs[lo:hi].copy(),
+            "mean": self.sums[lo:hi] / self.counts[lo:hi],
+            "last": self.lasts[lo:hi].copy(),
+        }
+
+
+class SeriesPyramid:
+    """
+    One series at every resolution in `levels`.
+
+    :param levels: Bucket widths in blocks, finest first.
+    :param num_blocks: Length of the run, used to size the levels.
+    """
+
+    def __init__(self, levels=PYRAMID_LEVELS, num_blocks: int = 0):
+        self.levels = [_Level(width, num_blocks) for width in levels]
+        self.first = None
+        self.last = None
+
+    def add(self, block_number: int, value: float):
+        if self.first is None:
+            self.first = block_number
+        self.last = block_number
+        for level in self.levels:
+            level.add(block_number, value)
+
+    def query(self, start: int | None = None, end: int | None = None,
+              points: int | None = None, raw=None) -> dict:
+        """
+        Aggregated values for blocks `start`..`end` (inclusive, default: the
+        whole run) from the finest level that needs at most `points` buckets
+        (default: full resolution).
+
+        :param raw: Callable returning the recorded `(blocks, values)` of the
+                    series, read when full resolution fits in `points`.
+        :return: `{"block", "min", "max", "mean", "last"}` NumPy arrays, one
+                 entry per bucket; "block" is the first block of the bucket.
+        """
+        if start is None:
+            start = self.first if self.first is not None else 0
+        if end is None:
+            end = self.last if self.last is not None else 0
+        if end < start:
+            raise ValueError("end must not be before start")
+        if points is not None and points < 1:
+            raise ValueError("points must be positive")
+
+        if points is None or end - start + 1 <= points:
+            if raw is None:
+                raise ValueError("Full resolution needs the recorded series")
+            blocks, values = raw()
+            return bucket(blocks, values, 1, start, end)
+        chosen = self.levels[-1]
+        for level in self.levels:
+            if (end - start) // level.width + 1 <= points:
+                chosen = level
+                break
+        return chosen.slice(start, end)
+
+
+class StatsPyramid:
+    """
+    `SeriesPyramid`s for every value column of the pyramid tables, fed with
+    the rows written by the stats sink.
+
+    :param value_columns: `{table: [value column names]}`; rows of other
+                          tables are ignored.
+    :param levels: Bucket widths in blocks.
+    :param num_blocks: Length of the run, used to size the levels.
+    :param raw: `raw(table, token, column)` returns the recorded `(blocks,
+                values)` of a series (the full-resolution level).
+    """
+
+    def __init__(self, value_columns: dict, levels=PYRAMID_LEVELS, num_blocks: int = 0, raw=None):
+        levels = tuple(sorted(levels))
+        if not levels or levels[0] < 1:
+            raise ValueError("pyramid levels must be positive block counts")
+        self.levels = levels
+        self.num_blocks = num_blocks
+        self.series = {}
+        self._value_columns = value_columns
+        self._raw = raw
+
+    def add(self, table: str, row):
+        """Add a stats row (block, token, *values) of a pyramid table."""
+        names = self._value_columns.get(table)
+        if names is None:
+            return
+        block_number, token = row[0], row[1]
+        series = self.series
+        for name, value in zip(names, row[2:]):
+            key = (table, token, name)
+            pyramid = series.get(key)
+            if pyramid is None:
+                pyramid = series[key] = SeriesPyramid(self.levels, self.num_blocks)
+            pyramid.add(block_number, value)
+
+    def query(self, table: str, token: str, column: str, start: int | None = None,
+              end: int | None = None, points: int | None = None) -> dict:
+        """
+        Downsampled series, e.g. `query("tokens", "stETH", "price", points=500)`.
+        See `SeriesPyramid.query`.
+        """
+        try:
+            pyramid = self.series[(table, token, column)]
+        except KeyError:
+            raise ValueError(f"No recorded series {table}/{token}/{column}") from None
+        raw = None if self._raw is None else (lambda: self._raw(table, token, column))
+        return pyramid.query(start, end, points, raw)
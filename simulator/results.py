@@ -0,0 +1,161 @@
+"""
+Lazy view over the results of a finished run.
+
+`SimulationResult` keeps a reference to the chain's stats sink and only
+builds a DataFrame when a table is first asked for, so callers that need a
+single table (or just a price path) never pay for the agents or trades
+frames.  It still behaves like the dict `main.main()` used to return:
+`result["tokens_stats"]`, `result.keys()` and `dict(result)` all work.
+
+The array getters (`column`, `price_series`, ...) read the recorded NumPy
+buffers directly and do not touch pandas; with the in-memory
+`StatsRecorder`, `column` returns a view of the buffer without copying.
+"""
+
+from collections.abc import Mapping
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from simulator.pyramid import bucket
+
+
+class SimulationResult(Mapping):
+    """
+    Results of one `Blockchain` run.
+
+    :param chain: The chain, after `start_mining` has returned.
+    """
+
+    # Keys exposed through the mapping interface, in the order of the dict
+    # `main.main()` returned before.
+    KEYS = (
+        "agents_stats",
+        "tokens_stats",
+        "vaults_stats",
+        "amms_stats",
+        "borrowed_eth_stats",
+        "borrowed_tokens_stats",
+        "all_trades",
+        "final_block",
+    )
+
+    def __init__(self, chain):
+        self.sink = chain.stats_sink
+        self.metrics = chain.metrics
+        self.final_block = chain.num_blocks
+
+    # ------------------------------------------------------------------
+    # Tables (built on first access)
+    # ------------------------------------------------------------------
+    @cached_property
+    def agents_stats(self) -> pd.DataFrame:
+        return self.sink.frame("agents")
+
+    @cached_property
+    def tokens_stats(self) -> pd.DataFrame:
+        return self.sink.frame("tokens")
+
+    @cached_property
+    def vaults_stats(self) -> pd.DataFrame:
+        return self.sink.frame("vaults")
+
+    @cached_property
+    def amms_stats(self) -> pd.DataFrame:
+        return self.sink.frame("amms")
+
+    @cached_property
+    def psms_stats(self) -> pd.DataFrame:
+        return self.sink.frame("psms")
+
+    @cached_property
+    def borrowed_eth_stats(self) -> pd.DataFrame:
+        return self.sink.frame("borrowed_eth")
+
+    @cached_property
+    def borrowed_tokens_stats(self) -> pd.DataFrame:
+        return self.sink.frame("borrowed_tokens")
+
+    @cached_property
+    def wallet_deltas(self) -> pd.DataFrame:
+        return self.sink.frame("wallet_deltas")
+
+    @cached_property
+    def accrual(self) -> pd.DataFrame:
+        return self.sink.frame("accrual")
+
+    @cached_property
+    def all_trades(self) -> pd.DataFrame:
+        return self.sink.trade_frame()
+
+    @cached_property
+    def trade_ledger(self):
+        """The trades as an indexed `simulator.trade_ledger.TradeLedger`."""
+        return self.sink.trade_ledger()
+
+    # ------------------------------------------------------------------
+    # Array getters (no pandas)
+    # ------------------------------------------------------------------
+    def column(self, table: str, name: str) -> np.ndarray:
+        """One column of a stats table, e.g. `column("tokens", "price")`."""
+        return self.sink.column(table, name)
+
+    def _token_column(self, table: str, token: str, name: str) -> np.ndarray:
+        return self.sink.series(table, token, name)[1]
+
+    def blocks(self, table: str, token: str) -> np.ndarray:
+        """Blocks on which `table` was recorded for `token`."""
+        return self._token_column(table, token, "block")
+
+    def price_series(self, token: str) -> np.ndarray:
+        """Recorded prices of `token`, one per recorded block."""
+        return self._token_column("tokens", token, "price")
+
+    def reserve_series(self, token: str) -> tuple[np.ndarray, np.ndarray]:
+        """`(eth_reserve, token_reserve)` of the token's AMM per recorded block."""
+        return (
+            self._token_column("amms", token, "total_eth_reserve"),
+            self._token_column("amms", token, "total_token_reserve"),
+        )
+
+    def psm_reserve_series(self, token: str) -> np.ndarray:
+        """ETH reserve of the token's PSM per recorded block."""
+        return self._token_column("psms", token, "eth_reserve")
+
+    def downsample(self, table: str, token: str, column: str, start: int | None = None,
+                   end: int | None = None, points: int | None = None) -> dict:
+        """
+        min/max/mean/last of a tokens/amms/psms/vaults series over blocks
+        `start`..`end`, from the finest pyramid level that fits in `points`
+        buckets, e.g. `downsample("tokens", "stETH", "price", points=500)`.
+        Without a pyramid (e.g. a `ChunkedFileSink` run) the buckets are
+        computed from the recorded table.
+        """
+        if self.sink.pyramid is not None:
+            return self.sink.pyramid.query(table, token, column, start, end, points)
+        blocks, values = self.sink.series(table, token, column)
+        if not len(blocks):
+            raise ValueError(f"No recorded series {table}/{token}/{column}")
+        start = int(blocks[0]) if start is None else start
+        end = int(blocks[-1]) if end is None else end
+        if end < start:
+            raise ValueError("end must not be before start")
+        if points is not None and points < 1:
+            raise ValueError("points must be positive")
+        width = 1 if points is None else -(-(end - start + 1) // points)
+        return bucket(blocks, values, width, start, end)
+
+    # ------------------------------------------------------------------
+    # Mapping interface
+    # ------------------------------------------------------------------
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
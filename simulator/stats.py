@@ -0,0 +1,367 @@
+"""
+Columnar recorder for the per-block stats tables.
+
+Rows are written in place into typed NumPy column buffers that are sized
+up-front from the run length, the agent count and the token count.  The
+pandas DataFrames exposed as `Blockchain.stats` are only built once, when
+somebody asks for them (typically after `start_mining` returns).
+
+A `StatsPolicy` decides which tables are recorded and on which blocks, and
+a `StatsSink` decides where the rows (and trades) go: `StatsRecorder`
+keeps them in memory, `simulator.stats_sink.ChunkedFileSink` streams them
+to disk.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from simulator.columns import ColumnTable
+from simulator.pyramid import PYRAMID_LEVELS, PYRAMID_TABLES, StatsPyramid
+from simulator.trade_ledger import TradeLedger
+from simulator.wallet_history import attach_balance_dicts
+
+
+# Column layout of every stats table, in the order rows are written.
+STATS_SCHEMA = {
+    "agents": [
+        ("block", np.int64),
+        ("agent", object),
+        ("wallet_face_value", np.float64),
+        ("wallet_eth_balance", np.float64),
+    ],
+    # Written only when a balance changes, with ETH and tokens as shares of
+    # their accrual index; the agents frame's wallet_token_balances /
+    # wallet_lpt_balances dicts are rebuilt from it and "accrual".
+    "wallet_deltas": [
+        ("block", np.int64),
+        ("agent", object),
+        ("kind", object),
+        ("asset", object),
+        ("shares", np.float64),
+    ],
+    "accrual": [
+        ("block", np.int64),
+        ("asset", object),
+        ("value", np.float64),
+    ],
+    "tokens": [
+        ("block", np.int64),
+        ("token", object),
+        ("price", np.float64),
+    ],
+    "vaults": [
+        ("block", np.int64),
+        ("token", object),
+        ("lp_token_price_eth", np.float64),
+        ("eth_balance", np.float64),
+        ("ds_balance_eth", np.float64),
+    ],
+    "psms": [
+        ("block", np.int64),
+        ("token", object),
+        ("eth_reserve", np.float64),
+    ],
+    "amms": [
+        ("block", np.int64),
+        ("token", object),
+        ("total_lpt_supply", np.float64),
+        ("total_eth_reserve", np.float64),
+        ("total_token_reserve", np.float64),
+    ],
+    "borrowed_eth": [
+        ("block", np.int64),
+        ("wallet", object),
+        ("amount", np.float64),
+    ],
+    "borrowed_tokens": [
+        ("block", np.int64),
+        ("wallet", object),
+        ("token", object),
+        ("amount", np.float64),
+    ],
+}
+
+
+# Number of identifying columns that follow "block" in each table; the
+# remaining columns are the values compared by `StatsPolicy(on_change=True)`.
+STATS_KEY_COLUMNS = {
+    "agents": 1,
+    "wallet_deltas": 3,
+    "accrual": 1,
+    "tokens": 1,
+    "vaults": 1,
+    "psms": 1,
+    "amms": 1,
+    "borrowed_eth": 1,
+    "borrowed_tokens": 2,
+}
+
+
+class StatsPolicy:
+    """
+    Which stats tables `Blockchain.collect_stats` records, and when.
+
+    Block 0 and the final block are always recorded so every table has the
+    start and end state of the run.
+
+    :param tables: Names of the tables to record (default: all of them).
+                   "agents" implies "wallet_deltas" and "accrual".
+    :param every: Record every N-th block. `None` disables the fixed
+                  cadence, leaving only event blocks (and the first/last).
+    :param on_events: Also record blocks on which an event fired.
+    :param on_change: Only write a row when its values differ from the last
+                      row written for the same agent/token/wallet.
+    :param pyramid_levels: Bucket widths (in blocks) of the multi-resolution
+                           copy kept of the tokens/amms/psms/vaults series
+                           (see `simulator.pyramid`). `None` disables it;
+                           "auto" uses the sink's `default_pyramid_levels`
+                           (on in memory, off for `ChunkedFileSink`).
+    """
+
+    def __init__(self, tables=None, every: int | None = 1, on_events: bool = False,
+                 on_change: bool = False, pyramid_levels="auto"):
+        tables = set(STATS_SCHEMA) if tables is None else set(tables)
+        if "agents" in tables:
+            tables.update(("wallet_deltas", "accrual"))
+        unknown = tables - set(STATS_SCHEMA)
+        if unknown:
+            raise ValueError(f"Unknown stats tables: {sorted(unknown)}")
+        if every is not None and every < 1:
+            raise ValueError("every must be a positive number of blocks")
+
+        self.tables = tables
+        self.every = every
+        self.on_events = on_events
+        self.on_change = on_change
+        self.pyramid_levels = pyramid_levels
+
+    def records(self, table: str) -> bool:
+        return table in self.tables
+
+    def should_record(self, block_number: int, num_blocks: int, event_fired: bool = False) -> bool:
+        if block_number == 0 or block_number == num_blocks:
+            return True
+        if self.every is not None and block_number % self.every == 0:
+            return True
+        return self.on_events and event_fired
+
+    def next_record_block(self, block_number: int, num_blocks: int) -> int:
+        """The first block from `block_number` on recorded on the fixed cadence."""
+        if block_number == 0:
+            return 0
+        if self.every is None:
+            return num_blocks
+        return min(num_blocks, -(-block_number // self.every) * self.every)
+
+    def expected_blocks(self, num_blocks: int) -> int:
+        """Number of blocks recorded on the fixed cadence (used for sizing)."""
+        if self.every is None:
+            return 2
+        return num_blocks // self.every + 2
+
+
+class LazyFrames(Mapping):
+    """
+    Read-only `{table: DataFrame}` mapping that builds each table on first
+    access through `load(table)`.
+    """
+
+    def __init__(self, load, tables: list[str]):
+        self._load = load
+        self._tables = tables
+        self._cache = {}
+
+    def __getitem__(self, table):
+        if table not in self._tables:
+            raise KeyError(table)
+        if table not in self._cache:
+            self._cache[table] = self._load(table)
+        return self._cache[table]
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self):
+        return len(self._tables)
+
+
+class StatsSink(ABC):
+    """
+    Destination for the rows written by `Blockchain.collect_stats` and the
+    trades logged through `Blockchain.add_trade`.
+    """
+
+    # pyramid kept when the policy leaves `pyramid_levels` on "auto"
+    default_pyramid_levels = PYRAMID_LEVELS
+
+    def __init__(self):
+        self.policy = StatsPolicy()
+        self._last_values = {}
+        self._frames = None
+        self.pyramid = None
+
+    def start(self, num_blocks: int, num_agents: int, num_tokens: int,
+              policy: StatsPolicy | None = None):
+        """
+        Called by `Blockchain.start_mining` before block 0 is recorded.
+
+        :param num_blocks: Number of blocks the chain will mine (block 0 is
+                           recorded as well).
+        :param num_agents: Number of agents taking part in the run.
+        :param num_tokens: Number of entries in `Blockchain.tokens`.
+        :param policy: The `StatsPolicy` in effect (default: record everything).
+        """
+        self.policy = policy or StatsPolicy()
+        self._last_values = {}
+        self.pyramid = None
+        levels = self.policy.pyramid_levels
+        if levels == "auto":
+            levels = self.default_pyramid_levels
+        if levels:
+            self.pyramid = StatsPyramid(
+                {
+                    table: [name for name, _ in STATS_SCHEMA[table][1 + STATS_KEY_COLUMNS[table]:]]
+                    for table in PYRAMID_TABLES
+                },
+                levels,
+                num_blocks,
+                self.series,
+            )
+
+    def append(self, table: str, row):
+        """
+        Write a row, unless the policy only wants changes and the row's
+        values match the last row written for the same key.  Rows of the
+        pyramid tables always update the pyramid, so its means are over
+        every recorded block.
+        """
+        if self.pyramid is not None:
+            self.pyramid.add(table, row)
+        if self.policy.on_change:
+            split = 1 + STATS_KEY_COLUMNS[table]
+            key = (table, *row[1:split])
+            values = row[split:]
+            if self._last_values.get(key) == values:
+                return
+            self._last_values[key] = values
+        self._write(table, row)
+        self._frames = None
+
+    def close(self):
+        """Called once mining is done; flush anything still buffered."""
+        pass
+
+    @abstractmethod
+    def _write(self, table: str, row):
+        pass
+
+    @abstractmethod
+    def add_trade(self, trade: dict):
+        pass
+
+    @abstractmethod
+    def trades(self) -> list:
+        """All trades logged so far, as a list of dicts."""
+        pass
+
+    def trade_ledger(self) -> TradeLedger:
+        """The trades as an indexed `TradeLedger`."""
+        ledger = TradeLedger()
+        for trade in self.trades():
+            ledger.append(trade)
+        return ledger
+
+    def trade_frame(self) -> pd.DataFrame:
+        """The trades as a DataFrame."""
+        return pd.DataFrame(self.trades())
+
+    @abstractmethod
+    def frame(self, table: str) -> pd.DataFrame:
+        """Build the DataFrame of a single table."""
+        pass
+
+    def to_frames(self) -> LazyFrames:
+        """A mapping of table name to DataFrame, each built on first access."""
+        if self._frames is None:
+            self._frames = LazyFrames(self.frame, list(STATS_SCHEMA))
+        return self._frames
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        """A single column of a table as a NumPy array."""
+        return self.frame(table)[name].to_numpy()
+
+    def series(self, table: str, token: str, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """`(blocks, values)` of one token's column of a per-token table."""
+        mask = self.column(table, "token") == token
+        return self.column(table, "block")[mask], self.column(table, name)[mask]
+
+
+class StatsRecorder(StatsSink):
+    """
+    In-memory sink: one `ColumnTable` per stats table, with the DataFrames
+    built on demand.  This is the default sink of `Blockchain`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._allocate(0, 0, 0)
+
+    def start(self, num_blocks: int, num_agents: int, num_tokens: int,
+              policy: StatsPolicy | None = None):
+        super().start(num_blocks, num_agents, num_tokens, policy)
+        self._allocate(num_blocks, num_agents, num_tokens)
+
+    def _allocate(self, num_blocks: int, num_agents: int, num_tokens: int):
+        rows = self.policy.expected_blocks(num_blocks)
+        capacities = {
+            "agents": rows * num_agents,
+            # every agent's balances once, then only changes; grows if needed
+            "wallet_deltas": rows + num_agents * num_tokens,
+            # ETH and each token's index
+            "accrual": rows * (num_tokens + 1),
+            "tokens": rows * num_tokens,
+            "vaults": rows * num_tokens,
+            "psms": rows * num_tokens,
+            "amms": rows * num_tokens,
+            # borrow rows depend on agent behaviour; start small and grow
+            "borrowed_eth": rows,
+            "borrowed_tokens": rows,
+        }
+        self.tables = {
+            name: ColumnTable(
+                columns, capacities[name] if self.policy.records(name) else 0
+            )
+            for name, columns in STATS_SCHEMA.items()
+        }
+        self._ledger = TradeLedger()
+        self._frames = None
+
+    def _write(self, table: str, row):
+        self.tables[table].append(row)
+
+    def add_trade(self, trade: dict):
+        self._ledger.append(trade)
+
+    def trades(self) -> list:
+        return self._ledger.records()
+
+    def trade_ledger(self) -> TradeLedger:
+        return self._ledger
+
+    def trade_frame(self) -> pd.DataFrame:
+        return self._ledger.to_frame()
+
+    def frame(self, table: str) -> pd.DataFrame:
+        frame = self.tables[table].to_frame()
+        if table == "agents":
+            frame = attach_balance_dicts(
+                frame, self.tables["wallet_deltas"].to_frame(), self.tables["accrual"].to_frame()
+            )
+        return frame
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        """A view of the recorded buffer, without building a DataFrame."""
+        return self.tables[table].column(name)
@@ -0,0 +1,264 @@
+"""
+Streaming on-disk stats sink for long runs.
+
+`ChunkedFileSink` buffers stats rows and trades into fixed-size chunks and
+hands every full chunk to a background writer thread, so peak memory stays
+at a few chunks per table regardless of the run length.  After the run the
+results are reopened lazily with `ChunkedStatsStore`, either chunk by chunk
+or as one DataFrame per table.
+
+Layout on disk::
+
+    <directory>/<table>/00000.csv            (fmt="csv")
+    <directory>/<table>/00000.parquet        (fmt="parquet", needs pyarrow)
+    <directory>/<table>/00000/<column>.npy   (fmt="npy")
+
+Trades are stored like a table named "trades".  A trade's
+`additional_info` dict is stored as JSON text in CSV and Parquet chunks and
+decoded again when read back.
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from simulator.stats import STATS_SCHEMA, ColumnTable, LazyFrames, StatsSink
+from simulator.trade_ledger import TradeLedger
+from simulator.wallet_history import attach_balance_dicts
+
+FORMATS = ("csv", "parquet", "npy")
+TRADES_TABLE = "trades"
+JSON_COLUMNS = ("additional_info",)
+
+
+def _check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got '{fmt}'")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as err:
+            raise ImportError("Parquet chunks need pyarrow: pip install pyarrow") from err
+
+
+def _write_chunk(path: str, frame: pd.DataFrame, fmt: str):
+    if fmt == "npy":
+        os.makedirs(path, exist_ok=True)
+        for name in frame.columns:
+            values = frame[name].to_numpy()
+            np.save(os.path.join(path, f"{name}.npy"), values, allow_pickle=values.dtype == object)
+        with open(os.path.join(path, "columns.json"), "w") as f:
+            json.dump(list(frame.columns), f)
+        return
+
+    frame = frame.copy()
+    for name in JSON_COLUMNS:
+        if name in frame.columns:
+            frame[name] = [json.dumps(value, default=str) for value in frame[name]]
+    if fmt == "csv":
+        frame.to_csv(f"{path}.csv", index=False)
+    else:
+        frame.to_parquet(f"{path}.parquet", index=False)
+
+
+def _read_chunk(path: str, fmt: str) -> pd.DataFrame:
+    if fmt == "npy":
+        with open(os.path.join(path, "columns.json")) as f:
+            names = json.load(f)
+        return pd.DataFrame(
+            {name: np.load(os.path.join(path, f"{name}.npy"), allow_pickle=True) for name in names}
+        )
+
+    frame = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+    for name in JSON_COLUMNS:
+        if name in frame.columns:
+            frame[name] = [
+                json.loads(value) if isinstance(value, str) else value for value in frame[name]
+            ]
+    return frame
+
+
+class ChunkedFileSink(StatsSink):
+    """
+    Stats sink that streams fixed-size chunks to disk from a writer thread.
+    Each run overwrites the table directories of a previous run in
+    `directory`.
+
+    :param directory: Output directory (created if missing).
+    :param fmt: "csv", "parquet" or "npy".
+    :param chunk_rows: Rows per chunk and table.
+    :param max_pending_chunks: Chunks allowed to wait for the writer. The
+                               mining loop only waits if the disk falls this
+                               far behind, which keeps memory bounded.
+    """
+
+    # keep memory flat on long runs; `downsample` buckets the files instead
+    default_pyramid_levels = None
+
+    def __init__(self, directory: str, fmt: str = "csv", chunk_rows: int = 10_000,
+                 max_pending_chunks: int = 8):
+        super().__init__()
+        _check_format(fmt)
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be positive")
+
+        self.directory = directory
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.max_pending_chunks = max_pending_chunks
+
+        self._buffers = {}
+        self._trade_buffer = TradeLedger()
+        self._trades = None  # `trades()`, read back from the chunks until a trade is added
+        self._chunk_counts = {}
+        self._queue = None
+        self._writer = None
+        self._error = None
+
+    # ------------------------------------------------------------------
+    # Sink interface
+    # ------------------------------------------------------------------
+    def start(self, num_blocks, num_agents, num_tokens, policy=None):
+        super().start(num_blocks, num_agents, num_tokens, policy)
+        os.makedirs(self.directory, exist_ok=True)
+        # a run starts from empty tables, like the action log's spill file
+        for table in (*STATS_SCHEMA, TRADES_TABLE):
+            table_dir = os.path.join(self.directory, table)
+            if os.path.isdir(table_dir):
+                shutil.rmtree(table_dir)
+        self._buffers = {
+            name: ColumnTable(columns, self.chunk_rows) for name, columns in STATS_SCHEMA.items()
+        }
+        self._trade_buffer = TradeLedger(self.chunk_rows)
+        self._trades = None
+        self._chunk_counts = {name: 0 for name in (*STATS_SCHEMA, TRADES_TABLE)}
+
+        self._queue = queue.Queue(maxsize=self.max_pending_chunks)
+        self._writer = threading.Thread(target=self._write_loop, name="stats-writer", daemon=True)
+        self._writer.start()
+
+    def _write(self, table, row):
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if buffer.size == self.chunk_rows:
+            self._submit(table, buffer.to_frame())
+            self._buffers[table] = ColumnTable(STATS_SCHEMA[table], self.chunk_rows)
+
+    def add_trade(self, trade):
+        self._trades = None
+        self._trade_buffer.append(trade)
+        if len(self._trade_buffer) == self.chunk_rows:
+            self._submit(TRADES_TABLE, self._trade_buffer.to_frame())
+            self._trade_buffer = TradeLedger(self.chunk_rows)
+
+    def close(self):
+        """Flush the partially filled chunks and wait for the writer."""
+        if self._writer is None:
+            return
+        for table, buffer in self._buffers.items():
+            if buffer.size:
+                self._submit(table, buffer.to_frame())
+        if len(self._trade_buffer):
+            self._submit(TRADES_TABLE, self._trade_buffer.to_frame())
+        self._buffers = {}
+        self._trade_buffer = TradeLedger()
+
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+        self._trades = None
+        self._raise_writer_error()
+
+    def trades(self) -> list:
+        if self._trades is None:
+            self._trades = self.trade_frame().to_dict("records")
+        return self._trades
+
+    def trade_frame(self) -> pd.DataFrame:
+        return self.store().frame(TRADES_TABLE)
+
+    def frame(self, table: str) -> pd.DataFrame:
+        return self.store().frame(table)
+
+    def store(self) -> "ChunkedStatsStore":
+        """Reader over the chunks written so far."""
+        return ChunkedStatsStore(self.directory, self.fmt)
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _submit(self, table: str, frame: pd.DataFrame):
+        self._raise_writer_error()
+        index = self._chunk_counts[table]
+        self._chunk_counts[table] += 1
+        self._queue.put((table, index, frame))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # drain the queue so the mining loop never blocks
+            table, index, frame = item
+            try:
+                table_dir = os.path.join(self.directory, table)
+                os.makedirs(table_dir, exist_ok=True)
+                _write_chunk(os.path.join(table_dir, f"{index:05d}"), frame, self.fmt)
+            except Exception as err:  # re-raised on the mining thread
+                self._error = err
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"Stats writer failed: {self._error}") from self._error
+
+
+class ChunkedStatsStore:
+    """
+    Lazy reader for a directory written by `ChunkedFileSink`.
+
+    :param directory: The sink's output directory.
+    :param fmt: The format the chunks were written in.
+    """
+
+    def __init__(self, directory: str, fmt: str = "csv"):
+        _check_format(fmt)
+        self.directory = directory
+        self.fmt = fmt
+
+    def chunk_paths(self, table: str) -> list[str]:
+        table_dir = os.path.join(self.directory, table)
+        if not os.path.isdir(table_dir):
+            return []
+        names = sorted(os.listdir(table_dir))
+        if self.fmt == "npy":
+            names = [name for name in names if os.path.isdir(os.path.join(table_dir, name))]
+        else:
+            names = [name for name in names if name.endswith(f".{self.fmt}")]
+        return [os.path.join(table_dir, name) for name in names]
+
+    def iter_chunks(self, table: str):
+        """Yield one DataFrame per chunk, reading each only when needed."""
+        for path in self.chunk_paths(table):
+            yield _read_chunk(path, self.fmt)
+
+    def frame(self, table: str) -> pd.DataFrame:
+        """Read every chunk of a table into one DataFrame."""
+        chunks = list(self.iter_chunks(table))
+        if chunks:
+            frame = pd.concat(chunks, ignore_index=True)
+        else:
+            columns = [name for name, _ in STATS_SCHEMA.get(table, [])]
+            frame = pd.DataFrame(columns=columns)
+        if table == "agents":
+            frame = attach_balance_dicts(frame, self.frame("wallet_deltas"), self.frame("accrual"))
+        return frame
+
+    def frames(self) -> LazyFrames:
+        """All stats tables as a mapping that reads each table on first access."""
+        return LazyFrames(self.frame, list(STATS_SCHEMA))
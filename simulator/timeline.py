@@ -0,0 +1,246 @@
+"""
+Compiled event timelines and the event handler registry.
+
+Scenario events use a `target` / `method` schema::
+
+    {"block": 120, "target": "amm", "method": "set_price",
+     "token": "stETH", "new_price": 0.9}
+
+and may cover a range of blocks instead of a single one::
+
+    {"start_block": 1, "end_block": 300, "every": 1,
+     "target": "amm", "method": "inject_liquidity",
+     "token": "stETH", "eth_delta": -3_000, "token_delta": -3_000}
+
+`Timeline` validates every event once, when it is added, against the
+handler registered for its `(target, method)` and stores it in columns
+(first block, last block, step, handler, token, arguments).  On each block
+it looks up the events due in a dict (single-block events) and a vector
+test over the range events, then calls the handlers directly.
+
+Keys other than the handler's parameters ("note", "color", ...) are kept
+on the event dict for the UI and ignored here.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+# (target, method) -> EventHandler
+EVENT_HANDLERS = {}
+
+
+class EventHandler:
+    """
+    A registered event handler and the parameters it takes.
+
+    :param func: `func(manager, blockchain, block_number, token, **args)`,
+                 returning whether the event acted (False when there was
+                 nothing to do, e.g. a drain the pool cannot cover).
+    :param required: Names of the arguments every event must provide.
+    :param optional: `{name: default}` of the optional arguments.
+    """
+
+    def __init__(self, func, required=(), optional=None):
+        self.func = func
+        self.required = tuple(required)
+        self.optional = dict(optional or {})
+
+    def validate(self, event: dict) -> dict:
+        """The handler arguments of `event`, as floats, with defaults filled in."""
+        missing = [name for name in self.required if name not in event]
+        if missing:
+            raise ValueError(f"Event {event} is missing {missing}")
+        args = {}
+        for name in self.required:
+            args[name] = float(event[name])
+        for name, default in self.optional.items():
+            value = event.get(name, default)
+            args[name] = None if value is None else float(value)
+        return args
+
+
+def register_handler(target: str, method: str, required=(), optional=None):
+    """Decorator registering `func` as the handler of `(target, method)`."""
+    def decorator(func):
+        EVENT_HANDLERS[(target, method)] = EventHandler(func, required, optional)
+        return func
+    return decorator
+
+
+def event_key(event: dict) -> tuple:
+    try:
+        return event["target"], event["method"]
+    except KeyError:
+        raise ValueError(f"Event {event} has no target/method") from None
+
+
+class Timeline:
+    """
+    Columnar schedule of `target` / `method` events.
+
+    :param events: Event dicts to compile right away.
+    """
+
+    def __init__(self, events=()):
+        self.handlers = []   # EventHandler per event
+        self.tokens = []
+        self.args = []
+        self.events = []     # the source dicts, for reference
+        self._singles = {}   # block -> [event index]
+        self._single_blocks = None
+        self._range_ids = []
+        self._range_starts = []
+        self._range_ends = []
+        self._range_steps = []
+        self._range_arrays = None
+        self.extend(events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def add(self, event: dict):
+        """Validate and schedule one event."""
+        key = event_key(event)
+        handler = EVENT_HANDLERS.get(key)
+        if handler is None:
+            raise ValueError(f"No event handler registered for {key}")
+        args = handler.validate(event)
+
+        if "block" in event:
+            start = end = int(event["block"])
+        elif "start_block" in event and "end_block" in event:
+            start, end = int(event["start_block"]), int(event["end_block"])
+            if end < start:
+                raise ValueError(f"Event {event} ends before it starts")
+        else:
+            raise ValueError(f"Event {event} needs 'block' or 'start_block'/'end_block'")
+        step = int(event.get("every", 1))
+        if step < 1:
+            raise ValueError(f"Event {event} has a non-positive 'every'")
+
+        index = len(self.events)
+        self.events.append(event)
+        self.handlers.append(handler)
+        self.tokens.append(event.get("token"))
+        self.args.append(args)
+
+        if start == end:
+            self._singles.setdefault(start, []).append(index)
+            self._single_blocks = None
+        else:
+            self._range_ids.append(index)
+            self._range_starts.append(start)
+            self._range_ends.append(end)
+            self._range_steps.append(step)
+            self._range_arrays = None
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+
+    def _ranges(self):
+        if self._range_arrays is None:
+            self._range_arrays = (
+                np.array(self._range_ids, dtype=np.int64),
+                np.array(self._range_starts, dtype=np.int64),
+                np.array(self._range_ends, dtype=np.int64),
+                np.array(self._range_steps, dtype=np.int64),
+            )
+        return self._range_arrays
+
+    def at_block(self, block_number: int) -> list[int]:
+        """Indices of the events due on `block_number`, in the order added."""
+        due = self._singles.get(block_number, [])
+        if not self._range_ids:
+            return due
+
+        ids, starts, ends, steps = self._ranges()
+        active = (starts <= block_number) & (ends >= block_number)
+        active &= (block_number - starts) % steps == 0
+        if not active.any():
+            return due
+        return sorted(due + ids[active].tolist())
+
+    def next_block(self, block_number: int) -> int | None:
+        """The first block from `block_number` on with an event due, or None."""
+        if self._single_blocks is None:
+            self._single_blocks = sorted(self._singles)
+        index = bisect_left(self._single_blocks, block_number)
+        following = self._single_blocks[index] if index < len(self._single_blocks) else None
+
+        if self._range_ids:
+            _, starts, ends, steps = self._ranges()
+            # first multiple of the step at or after block_number, per range
+            first = np.maximum(starts, block_number)
+            first = starts + -((starts - first) // steps) * steps
+            due = first[first <= ends]
+            if len(due) and (following is None or due.min() < following):
+                following = int(due.min())
+        return following
+
+    def on_block(self, block_number: int, manager, blockchain) -> int:
+        """Run the events due on `block_number`; returns how many acted."""
+        fired = 0
+        for index in self.at_block(block_number):
+            token = self.tokens[index]
+            if token is not None and token not in blockchain.tokens:
+                continue
+            if self.handlers[index].func(manager, blockchain, block_number, token, **self.args[index]):
+                fired += 1
+        return fired
+
+
+# ----------------------------------------------------------------------
+# AMM handlers
+# ----------------------------------------------------------------------
+@register_handler("amm", "set_price", required=("new_price",))
+def _set_price(manager, blockchain, block_number, token, new_price):
+    """Swap against the token's AMM until one token costs `new_price` ETH."""
+    amm = blockchain.get_amm(token)
+    if amm.reserve_eth <= 0 or amm.reserve_token <= 0:
+        # no price to move from
+        blockchain.add_action(
+            "Block {}: {} pool has no reserves, price not set to {:.4f} ETH.",
+            block_number, token, new_price, kind="event",
+        )
+        return False
+    current_price = amm.price_of_one_token_in_eth()
+    return manager._depeg(block_number, token, 1 - new_price / current_price, blockchain)
+
+
+def _reserve_delta(reserve: float, delta: float) -> float:
+    # -1 < delta < 0 is a fraction of the current reserve, anything else is
+    # an absolute amount
+    if -1 < delta < 0:
+        return delta * reserve
+    return delta
+
+
+@register_handler("amm", "inject_liquidity", optional={"eth_delta": 0.0, "token_delta": 0.0})
+def _inject_liquidity(manager, blockchain, block_number, token, eth_delta, token_delta):
+    """
+    Add (or drain) reserves of the token's AMM from outside the pool's LPs.
+
+    A drain the pool cannot cover (it would leave a reserve at or below
+    zero) is skipped for that block, so a range drain stops once the pool
+    has run dry instead of emptying it.
+    """
+    amm = blockchain.get_amm(token)
+    eth_delta = _reserve_delta(amm.reserve_eth, eth_delta)
+    token_delta = _reserve_delta(amm.reserve_token, token_delta)
+    if amm.reserve_eth + eth_delta <= 0 or amm.reserve_token + token_delta <= 0:
+        blockchain.add_action(
+            "Block {}: {} pool cannot cover a {:+.4f} ETH / {:+.4f} {} liquidity change, skipped.",
+            block_number, token, eth_delta, token_delta, token,
+            kind="event",
+        )
+        return False
+    amm.reserve_eth += eth_delta
+    amm.reserve_token += token_delta
+    blockchain.add_action(
+        "Block {}: {} liquidity changed by {:+.4f} ETH / {:+.4f} {}. Price now {:.4f} ETH.",
+        block_number, token, eth_delta, token_delta, token, amm.price_of_one_token_in_eth(),
+        kind="event",
+    )
+    return True
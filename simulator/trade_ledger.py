@@ -0,0 +1,232 @@
+"""
+Columnar, indexed ledger of the trades agents log through
+`Agent.log_trade` / `Blockchain.add_trade`.
+
+A trade is stored as one row of typed columns: `block` (int64), interned
+`agent` / `token` / `action` / `reason` codes (int32) and `volume`
+(float64).  The trade's `additional_info` dict is snapshotted when the
+trade is logged: its containers are copied, so later changes to an agent's
+state (e.g. a growing history list) do not leak into past trades.
+
+The ledger keeps a per-agent index of row numbers and relies on trades
+arriving in block order for block ranges, so queries such as "all DS sells
+of agent X between blocks a and b" touch only the matching rows::
+
+    ledger.query(agent="DS Short Term", token="DS", action="sell", start=a, end=b)
+"""
+
+import numpy as np
+import pandas as pd
+
+from simulator.columns import ColumnTable
+
+TRADE_FIELDS = ("block", "agent", "token", "volume", "action", "reason", "additional_info")
+_CODED = ("agent", "token", "action", "reason")
+
+
+def _snapshot(info):
+    """Copy `info` and the containers it holds (one level deep)."""
+    if isinstance(info, dict):
+        return {
+            key: list(value) if isinstance(value, list)
+            else dict(value) if isinstance(value, dict)
+            else value
+            for key, value in info.items()
+        }
+    if isinstance(info, list):
+        return list(info)
+    return info
+
+
+class Interner:
+    """Two-way mapping between values and small integer codes."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value) -> int:
+        """The code of `value`, or -1 if it never occurred."""
+        return self.codes.get(value, -1)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values[codes]
+
+
+class TradeLedger:
+    """
+    Typed, columnar trade store.
+
+    :param capacity: Initial number of rows (grows as needed).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.table = ColumnTable(
+            [
+                ("block", np.int64),
+                ("agent", np.int32),
+                ("token", np.int32),
+                ("volume", np.float64),
+                ("action", np.int32),
+                ("reason", np.int32),
+            ],
+            capacity,
+        )
+        self.interners = {name: Interner() for name in _CODED}
+        self.info = []
+        # row -> dict of keys outside TRADE_FIELDS, for the few trades that have them
+        self.extras = {}
+        self._by_agent = {}
+        self._agent_rows = {}
+        self._last_block = None
+        self._in_block_order = True
+        # `records()` of the rows materialized so far, and their extra keys
+        self._records = []
+        self._record_extras = set()
+
+    def __len__(self) -> int:
+        return self.table.size
+
+    def append(self, trade: dict):
+        """Add a trade dict in the `Agent.log_trade` format."""
+        row = self.table.size
+        block = trade.get("block", -1)
+        agent, token, action, reason = (
+            self.interners[name].code(trade.get(name)) for name in _CODED
+        )
+        volume = trade.get("volume")
+        self.table.append(
+            (block, agent, token, np.nan if volume is None else volume, action, reason)
+        )
+        self.info.append(_snapshot(trade.get("additional_info")))
+
+        extra = {key: value for key, value in trade.items() if key not in TRADE_FIELDS}
+        if extra:
+            self.extras[row] = extra
+
+        self._by_agent.setdefault(agent, []).append(row)
+        self._agent_rows.pop(agent, None)
+        if self._last_block is not None and block < self._last_block:
+            self._in_block_order = False
+        self._last_block = block
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _block_rows(self, start, end) -> tuple[int, int]:
+        blocks = self.table.column("block")
+        lo = 0 if start is None else int(np.searchsorted(blocks, start, side="left"))
+        hi = len(blocks) if end is None else int(np.searchsorted(blocks, end, side="right"))
+        return lo, hi
+
+    def _rows_of_agent(self, agent_code: int) -> np.ndarray:
+        rows = self._agent_rows.get(agent_code)
+        if rows is None:
+            rows = self._agent_rows[agent_code] = np.array(
+                self._by_agent.get(agent_code, []), dtype=np.int64
+            )
+        return rows
+
+    def rows(self, agent=None, token=None, action=None, reason=None,
+             start: int | None = None, end: int | None = None) -> np.ndarray:
+        """
+        Row numbers of the trades matching every given filter, in order.
+
+        :param start: First block (inclusive).
+        :param end: Last block (inclusive).
+        """
+        if agent is not None:
+            code = self.interners["agent"].lookup(agent)
+            rows = self._rows_of_agent(code)
+        else:
+            rows = None
+
+        if start is not None or end is not None:
+            if self._in_block_order:
+                lo, hi = self._block_rows(start, end)
+                if rows is None:
+                    rows = np.arange(lo, hi)
+                else:
+                    rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+            else:
+                blocks = self.table.column("block")
+                mask = np.ones(len(blocks), dtype=bool)
+                if start is not None:
+                    mask &= blocks >= start
+                if end is not None:
+                    mask &= blocks <= end
+                in_range = np.flatnonzero(mask)
+                rows = in_range if rows is None else np.intersect1d(rows, in_range)
+        if rows is None:
+            rows = np.arange(len(self))
+
+        for name, value in (("token", token), ("action", action), ("reason", reason)):
+            if value is not None and len(rows):
+                code = self.interners[name].lookup(value)
+                rows = rows[self.table.column(name)[rows] == code]
+        return rows
+
+    def query(self, **filters) -> pd.DataFrame:
+        """The matching trades as a DataFrame (see `rows` for the filters)."""
+        return self.to_frame(self.rows(**filters))
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def column(self, name: str, rows=None) -> np.ndarray:
+        """A decoded column (agent/token/action/reason as their values)."""
+        values = self.table.column(name) if rows is None else self.table.column(name)[rows]
+        if name in self.interners:
+            return self.interners[name].decode(values)
+        return values
+
+    def to_frame(self, rows=None) -> pd.DataFrame:
+        if rows is None:
+            rows = np.arange(len(self))
+        frame = pd.DataFrame({
+            "block": self.table.column("block")[rows],
+            "agent": self.column("agent", rows),
+            "token": self.column("token", rows),
+            "volume": self.table.column("volume")[rows],
+            "action": self.column("action", rows),
+            "reason": self.column("reason", rows),
+            "additional_info": [self.info[row] for row in rows],
+        })
+        if self.extras:
+            for row_position, row in enumerate(rows):
+                for key, value in self.extras.get(int(row), {}).items():
+                    if key not in frame.columns:
+                        frame[key] = None
+                    frame.at[row_position, key] = value
+        return frame
+
+    def records(self) -> list[dict]:
+        """
+        The trades as the list of dicts agents logged (with snapshotted
+        info).  The list is kept and only the rows appended since the last
+        call are converted, so reading it once per block stays linear; do
+        not modify it.
+        """
+        records = self._records
+        if len(records) < len(self):
+            start = len(records)
+            records.extend(self.to_frame(np.arange(start, len(self))).to_dict("records"))
+            # every record carries every extra key, as in `to_frame()`
+            extra_keys = {key for extra in self.extras.values() for key in extra}
+            if extra_keys != self._record_extras:
+                start = 0
+                self._record_extras = extra_keys
+            if extra_keys:
+                for record in records[start:]:
+                    for key in extra_keys:
+                        record.setdefault(key, None)
+        return records
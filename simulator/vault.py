@@ -1,6 +1,7 @@
 from exceptiongroup import catch
 
-from simulator.wallet import Wallet
+from simulator.journal import save_attr, save_item
+from simulator.wallet import TokenHandle, Wallet
 
 
 class Vault:
@@ -19,6 +20,7 @@ class Vault:
         """
         self.blockchain = blockchain
         self.token_symbol = token_symbol  # Token (LST) associated with the vault
+        self.ds_handle = TokenHandle(f'DS_{token_symbol}')  # DS token ID, resolved once
         self.psm = psm  # Peg Stability Module for CT/DS tokens
         self.lst_eth_amm = lst_eth_amm  # AMM for LST/ETH
         self.ct_eth_amm = ct_eth_amm  # AMM for CT/ETH
@@ -102,6 +104,8 @@ class Vault:
         wallet.deposit_eth(total_eth_to_return)
 
         # Step 8: Burn the LP tokens being withdrawn
+        save_attr(self, "lp_token_supply")
+        save_item(self.lp_holders, wallet)
         self.lp_token_supply -= amount_lp
         self.lp_holders[wallet] -= amount_lp
         wallet.withdraw_lpt('V_' + self.token_symbol, amount_lp)
@@ -175,9 +179,11 @@ class Vault:
             lp_tokens_to_mint = (amount_eth / total_vault_value) * self.lp_token_supply
 
         # Step 3: Update the LP token supply
+        save_attr(self, "lp_token_supply")
         self.lp_token_supply += lp_tokens_to_mint
 
         # Step 4: Track the LP tokens in the wallet
+        save_item(self.lp_holders, wallet)
         self.lp_holders[wallet] = self.lp_holders.get(wallet, 0) + lp_tokens_to_mint
         wallet.deposit_lpt(f'V_' + self.token_symbol, lp_tokens_to_mint)
 
@@ -195,7 +201,7 @@ class Vault:
 
         # Convert DS tokens to their ETH equivalent using the DS/ETH AMM
         ds_value_in_eth = self.ds_eth_amm.price_of_one_token_in_eth() * self.wallet.token_balance(
-            f'DS_{self.token_symbol}')
+            self.ds_handle)
 
         # Calculate the value of the CT/ETH LP tokens
         # Assuming the value of LP tokens is proportional to the total reserves in the CT/ETH AMM
@@ -226,92 +232,54 @@ class Vault:
 
         return lp_token_price
 
-    def calculate_sell_ds_outcome(self, amount_ds):
-        # Get current prices and fees
-        ct_eth_price = self.ct_eth_amm.price_of_one_token_in_eth()
-        ds_price = self.ds_eth_amm.price_of_one_token_in_eth()
-        ct_fee = self.ct_eth_amm.fee
-        ds_fee = self.ds_eth_amm.fee
-
-        # Limit amount_ds based on available CT and ETH in AMMs
-        ct_available = self.ct_eth_amm.reserve_token
-        eth_available = self.ds_eth_amm.reserve_eth
-        max_ds_sellable = min(amount_ds, ct_available, eth_available / ds_price)
-        if amount_ds > max_ds_sellable:
-            amount_ds = max_ds_sellable
-
-        # ETH from PSM redemption (assuming 1:1 ratio)
-        eth_from_psm = amount_ds  # 1 DS + 1 CT redeem for 1 ETH
-
-        # ETH needed to repay CT loan
-        eth_needed_for_repayment = amount_ds * ct_eth_price
-
-        # Calculate slippage and adjusted ETH to swap for CT
-        ct_slippage = self.ct_eth_amm.calculate_slippage(eth_needed_for_repayment, 'eth_to_token')
-        eth_to_swap_for_ct = eth_needed_for_repayment / ((1 - ct_fee) * (1 - ct_slippage))
-
-        # Remaining ETH for investor
-        remaining_eth = eth_from_psm - eth_to_swap_for_ct
-        if remaining_eth < 0:
-            remaining_eth = 0  # Investor receives nothing
+    # ------------------------------------------------------------------
+    # Quotes: exact dry runs of buy_ds / sell_ds
+    # ------------------------------------------------------------------
+    def _dry_run(self, trade, amount: float, eth: float = 0.0, ds: float = 0.0) -> float:
+        # an investor wallet holding just what the trade needs
+        investor = Wallet(owner='Dry run')
+        investor.deposit_eth(eth)
+        investor.deposit_token(self.ds_handle, ds)
+        try:
+            return self.blockchain.dry_run(trade, investor, amount)
+        except ValueError:
+            return 0.0
 
-        return remaining_eth
+    def calculate_sell_ds_outcome(self, amount_ds):
+        """
+        The ETH `sell_ds(amount_ds)` would pay out (0.0 if the sale would
+        fail), found by running the sale and rolling it back.
+        """
+        return self._dry_run(self._sell_ds, amount_ds, ds=amount_ds)
 
     def calculate_buy_ds_outcome(self, amount_eth):
-        # Get current prices and fees
-        ct_eth_price = self.ct_eth_amm.price_of_one_token_in_eth()
-        ds_price = self.ds_eth_amm.price_of_one_token_in_eth()
-        ct_fee = self.ct_eth_amm.fee
-        ds_fee = self.ds_eth_amm.fee
-
-        # Calculate DS tokens to give investor
-        ds_to_give_investor = amount_eth / ds_price
-
-        # Borrow ETH to acquire CT
-        eth_to_borrow = ds_to_give_investor * ct_eth_price
-
-        # Total ETH to deposit into PSM
-        total_eth = amount_eth + eth_to_borrow
-
-        # Receive CT and DS from PSM
-        ct_received = total_eth
-        ds_received = total_eth
-
-        # Estimate ETH from selling CT
-        ct_slippage = self.ct_eth_amm.calculate_slippage(ct_received, 'token_to_eth')
-        expected_eth_from_ct = ct_received * ct_eth_price * (1 - ct_fee) * (1 - ct_slippage)
-
-        # Calculate shortfall in ETH for loan repayment
-        eth_needed_for_repayment = eth_to_borrow
-        shortfall_eth = eth_needed_for_repayment - expected_eth_from_ct
-
-        # Sell DS to cover shortfall if necessary
-        if shortfall_eth > 0:
-            ds_slippage = self.ds_eth_amm.calculate_slippage(shortfall_eth / ds_price, 'token_to_eth')
-            ds_to_sell = shortfall_eth / (ds_price * (1 - ds_fee) * (1 - ds_slippage))
-            remaining_ds = ds_received - ds_to_sell
-        else:
-            remaining_ds = ds_received
-
-        # Ensure remaining_ds is not negative
-        if remaining_ds < 0:
-            remaining_ds = 0
-
-        return remaining_ds
+        """
+        The DS `buy_ds(amount_eth)` would deliver (0.0 if the purchase would
+        fail), found by running the purchase and rolling it back.
+        """
+        return self._dry_run(self._buy_ds, amount_eth, eth=amount_eth)
 
     def buy_ds(self, wallet, amount_eth: float):
         """
         Buy DS tokens via the vault by borrowing ETH, acquiring CT/DS via the PSM,
         selling CT for ETH, and returning the remainder DS tokens to the investor.
 
+        The purchase runs in a transaction: if a step fails (e.g. there is
+        not enough liquidity to deliver any DS) everything is rolled back and
+        the ValueError raised.
+
         :param wallet: The wallet of the investor buying DS.
         :param amount_eth: The amount of ETH being used to buy DS.
+        :return: The DS tokens delivered to the investor.
         """
-
-        if self.calculate_buy_ds_outcome(amount_eth) <= 0:
+        if amount_eth <= 0:
             self._log(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
-            raise ValueError("Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
+            raise ValueError(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
+
+        with self.blockchain.transaction():
+            return self._buy_ds(wallet, amount_eth)
 
+    def _buy_ds(self, wallet, amount_eth: float) -> float:
         # Step 0: Calculate the CT/ETH price and DS price
         ct_eth_price = self.ct_eth_amm.price_of_one_token_in_eth()
         ds_price = self.ds_eth_amm.price_of_one_token_in_eth()
@@ -336,6 +304,10 @@ class Vault:
 
         # Step 4: Borrow ETH from the blockchain to match the ETH required for CT
         eth_to_borrow = (amount_eth / ds_price) * ct_eth_price  # e.g., borrow 9 ETH
+        if not eth_to_borrow > 0:
+            # a drained DS pool or worthless CT: nothing to borrow against
+            self._log(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
+            raise ValueError(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
         self.blockchain.borrow_eth(self.wallet, eth_to_borrow)
         self._log(f"Vault borrowed {eth_to_borrow:.4f} ETH from the blockchain.")
 
@@ -363,8 +335,8 @@ class Vault:
         ds_to_sell = (eth_needed_for_repayment / ds_price) / (1 - ds_amm_fee)   # Adjust for premium fee, 1.05 is to be on the safe side
         self._log(f"Need to sell {ds_to_sell:.4f} DS (with fee premium) to repay the loan.")
 
-        if ds_to_sell > self.wallet.token_balances[f'DS_{self.token_symbol}']:
-            ds_to_sell = self.wallet.token_balances[f'DS_{self.token_symbol}']
+        if ds_to_sell > self.wallet.token_balance(self.ds_handle):
+            ds_to_sell = self.wallet.token_balance(self.ds_handle)
         # Step 9: Sell DS to repay the borrowed ETH
         eth_from_ds = self.ds_eth_amm.swap_token_for_eth(self.wallet, ds_to_sell)
 
@@ -388,27 +360,39 @@ class Vault:
         # Step 11: Give the investor the remaining DS tokens
         remaining_ds = ds_received - ds_to_sell
 
-        if remaining_ds > self.wallet.token_balances[f'DS_{self.token_symbol}']:
-            remaining_ds = self.wallet.token_balances[f'DS_{self.token_symbol}']
+        if remaining_ds > self.wallet.token_balance(self.ds_handle):
+            remaining_ds = self.wallet.token_balance(self.ds_handle)
 
-        assert remaining_ds > 0, f"Remaining DS should be positive, but got {remaining_ds}"
+        if remaining_ds <= 0:
+            self._log(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
+            raise ValueError(f"Not enough liquidity to buy DS with {amount_eth:.4f} ETH.")
 
-        self.wallet.withdraw_token(f'DS_{self.token_symbol}', remaining_ds)
-        wallet.deposit_token(f'DS_{self.token_symbol}', remaining_ds)
+        self.wallet.withdraw_token(self.ds_handle, remaining_ds)
+        wallet.deposit_token(self.ds_handle, remaining_ds)
         self._log(f"Investor received {remaining_ds:.4f} DS tokens as their final share.")
+        return remaining_ds
 
     def sell_ds(self, wallet, amount_ds: float):
         """
         Sell DS tokens via the vault by borrowing CT, redeeming both CT and DS for ETH via the PSM,
         and returning the equivalent ETH (minus fees) to the investor.
 
+        The sale runs in a transaction: if a step fails (e.g. the PSM cannot
+        redeem, or nothing would be left for the investor) everything is
+        rolled back, the CT loan included, and the ValueError raised.
+
+        This is a protocol change from the original sale, which kept the
+        seller's DS when the PSM redemption failed but left the CT loan
+        outstanding, so the end-of-block borrowing check aborted the run.
+
         :param wallet: The wallet of the investor selling DS.
         :param amount_ds: The amount of DS being sold.
+        :return: The ETH paid out to the investor.
         """
-        if self.calculate_sell_ds_outcome(amount_ds) <= 0:
-            self._log(f"Not enough liquidity to sell DS for {amount_ds:.4f} DS.")
-            raise ValueError(f"Not enough liquidity to sell DS for {amount_ds:.4f} DS.")
+        with self.blockchain.transaction():
+            return self._sell_ds(wallet, amount_ds)
 
+    def _sell_ds(self, wallet, amount_ds: float) -> float:
         # Step 0: Calculate the CT/ETH price and DS/ETH price
         ct_eth_price = self.ct_eth_amm.price_of_one_token_in_eth()  # e.g., 0.9 ETH
         ds_price = self.ds_eth_amm.price_of_one_token_in_eth()  # e.g., 0.8 ETH
@@ -423,8 +407,8 @@ class Vault:
             self._log(f"Cap Sale: Only {amount_ds:.4f} CT available for matching the sale.")
 
         # Step 2: Investor sends DS tokens to the vault
-        wallet.withdraw_token(f'DS_{self.token_symbol}', amount_ds)
-        self.wallet.deposit_token(f'DS_{self.token_symbol}', amount_ds)
+        wallet.withdraw_token(self.ds_handle, amount_ds)
+        self.wallet.deposit_token(self.ds_handle, amount_ds)
         self._log(f"Investor deposited {amount_ds:.4f} DS into the vault.")
 
         # Step 3: Borrow CT from the blockchain to match the amount of DS being sold
@@ -458,9 +442,12 @@ class Vault:
 
         # Step 8: Calculate the remaining ETH to return to the investor (after repaying the borrowed CT)
         self._log(f"Remaining ETH to return to the investor: {remaining_eth_to_return:.4f}")
+        if remaining_eth_to_return <= 0:
+            self._log(f"Not enough liquidity to sell DS for {amount_ds:.4f} DS.")
+            raise ValueError(f"Not enough liquidity to sell DS for {amount_ds:.4f} DS.")
 
         # Step 9: Pay out the remaining ETH to the investor
         self.wallet.withdraw_eth(remaining_eth_to_return)
-        if remaining_eth_to_return > 0:
-            wallet.deposit_eth(remaining_eth_to_return)
-        self._log(f"Investor received {remaining_eth_to_return:.4f} ETH after selling {amount_ds:.4f} DS.")
\ No newline at end of file
+        wallet.deposit_eth(remaining_eth_to_return)
+        self._log(f"Investor received {remaining_eth_to_return:.4f} ETH after selling {amount_ds:.4f} DS.")
+        return remaining_eth_to_return
\ No newline at end of file
@@ -1,23 +1,343 @@
-class Wallet:
+from array import array
+from collections.abc import MutableMapping
+
+from simulator.accrual import ETH
+from simulator.journal import save_append, save_attr, save_item
+
+# A withdrawal of a share-backed balance may exceed it by this relative
+# amount (the rounding of shares * index) and is then capped at the balance.
+SHARE_ROUNDING = 1e-12
+
+# Balance array entry of a token the wallet never held.
+NOT_HELD = float("nan")
+
+
+def _exceeds(amount: float, balance: float, index: float) -> bool:
+    if amount <= balance:
+        return False
+    return index == 1.0 or amount - balance > SHARE_ROUNDING * amount
+
+
+# ----------------------------------------------------------------------
+# Token IDs
+# ----------------------------------------------------------------------
+class TokenIds:
+    """
+    Interned token names.  Every token name gets a small integer ID, the
+    position of its balance in each wallet's balance array.
+
+    The table is shared by the whole process, so wallets funded before they
+    join a chain and deep copies of a chain agree on the IDs; a pickled
+    wallet or handle stores token names and re-interns them when loaded.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name: str) -> int:
+        token_id = self.ids.get(name)
+        if token_id is None:
+            token_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return token_id
+
+    def __len__(self):
+        return len(self.names)
+
+
+TOKEN_IDS = TokenIds()
+
+# ETH has an ID too, so its accrual index is found like a token's
+ETH_ID = TOKEN_IDS.intern(ETH)
+
+
+class TokenHandle:
+    """
+    A token name with its resolved ID.  Components that move the same
+    tokens on every call (PSM, Vault, AMMs) resolve a handle once and pass
+    it to the wallet methods in place of the name.
+    """
+
+    __slots__ = ("name", "id")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.id = TOKEN_IDS.intern(name)
+
+    def __reduce__(self):
+        return TokenHandle, (self.name,)
+
+    def __repr__(self):
+        return f"TokenHandle({self.name!r})"
+
+    def __str__(self):
+        return self.name
+
+
+def _token_id(token) -> int:
+    """The ID of a token name or `TokenHandle`."""
+    return token.id if token.__class__ is TokenHandle else TOKEN_IDS.intern(token)
+
+
+# ----------------------------------------------------------------------
+# Registry
+# ----------------------------------------------------------------------
+class AccrualIndices(MutableMapping):
+    """
+    `{asset: AccrualIndex}` of a chain, also kept in `by_id`, a list
+    indexed by token ID (None for assets that do not accrue), which is what
+    wallets read on every balance access.
+
+    :param indices: Initial `{asset: AccrualIndex}`.
+    """
+
+    def __init__(self, indices: dict = None):
+        self._by_name = {}
+        self.by_id = []
+        for asset, index in (indices or {}).items():
+            self[asset] = index
+
+    # copies and pickles store asset names, not IDs
+    def __getstate__(self):
+        return self._by_name
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def __getitem__(self, asset):
+        return self._by_name[asset]
+
+    def __setitem__(self, asset, index):
+        self._by_name[asset] = index
+        token_id = TOKEN_IDS.intern(asset)
+        by_id = self.by_id
+        if token_id >= len(by_id):
+            by_id.extend([None] * (token_id + 1 - len(by_id)))
+        by_id[token_id] = index
+
+    def __delitem__(self, asset):
+        del self._by_name[asset]
+        self.by_id[TOKEN_IDS.intern(asset)] = None
+
+    def __iter__(self):
+        return iter(self._by_name)
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __repr__(self):
+        return repr(self._by_name)
 
-    @classmethod
-    def all_wallets(cls):
-        return cls.wallets or []
 
-    @classmethod
-    def add_wallet(cls, wallet):
-        if not hasattr(cls, 'wallets'):
-            cls.wallets = []
+class WalletRegistry:
+    """
+    The wallets of one `Blockchain` (agents, vaults, the event manager and
+    the genesis wallet), in registration order.
 
-        cls.wallets.append(wallet)
+    The chain owns its registry, so yield is paid to this chain's wallets
+    only, wallets go away with their chain, and a deep copy of a chain
+    carries copies of its wallets.  Registered wallets hold yield-bearing
+    assets as shares of the chain's accrual indices (`simulator.accrual`).
+
+    :param indices: The chain's `{asset: AccrualIndex}` (kept as `AccrualIndices`).
+    """
+
+    def __init__(self, indices: dict = None):
+        self.indices = indices if isinstance(indices, AccrualIndices) else AccrualIndices(indices)
+        self._wallets = []
+        self._ids = set()  # id() of every registered wallet
+
+    # copies and pickles get new wallet ids
+    def __getstate__(self):
+        return self.indices, self._wallets
+
+    def __setstate__(self, state):
+        self.indices, self._wallets = state
+        self._ids = {id(wallet) for wallet in self._wallets}
+
+    def register(self, wallet):
+        """Add `wallet` (registering a wallet twice is a no-op)."""
+        if id(wallet) not in self._ids:
+            self._ids.add(id(wallet))
+            self._wallets.append(wallet)
+            wallet.bind_indices(self.indices)
+        return wallet
+
+    def discard(self, wallet):
+        if id(wallet) in self._ids:
+            self._ids.discard(id(wallet))
+            self._wallets = [registered for registered in self._wallets if registered is not wallet]
+
+    def __iter__(self):
+        return iter(self._wallets)
+
+    def __len__(self):
+        return len(self._wallets)
+
+    def __contains__(self, wallet):
+        return id(wallet) in self._ids
+
+
+class TokenBalances(MutableMapping):
+    """
+    `{token: balance}` view of a wallet's token balances, computed from its
+    shares when read (and converted to shares when written), in the order
+    the tokens were first deposited.
+    """
+
+    def __init__(self, wallet):
+        self._wallet = wallet
+
+    def __getitem__(self, token):
+        wallet = self._wallet
+        token_id = _token_id(token)
+        shares = wallet._shares_of(token_id)
+        if shares is None:
+            raise KeyError(token)
+        return shares * wallet._index_of(token_id)
+
+    def __setitem__(self, token, balance):
+        wallet = self._wallet
+        token_id = _token_id(token)
+        wallet._set_shares(token_id, balance / wallet._index_of(token_id))
+
+    def __delitem__(self, token):
+        wallet = self._wallet
+        token_id = _token_id(token)
+        if wallet._shares_of(token_id) is None:
+            raise KeyError(token)
+        save_attr(wallet, "_held")
+        save_item(wallet._shares, token_id)
+        wallet._shares[token_id] = NOT_HELD
+        wallet._held = [held for held in wallet._held if held != token_id]
+
+    def __iter__(self):
+        names = TOKEN_IDS.names
+        return iter([names[token_id] for token_id in self._wallet._held])
+
+    def __len__(self):
+        return len(self._wallet._held)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+# ----------------------------------------------------------------------
+# Wallet
+# ----------------------------------------------------------------------
+class Wallet:
+    """
+    ETH, token and LPT balances of one owner.
+
+    Token balances live in a float array indexed by token ID (`TokenIds`);
+    every token method takes a token name or a `TokenHandle`.
+    """
+
+    __slots__ = ("owner", "_eth", "_shares", "_held", "_indices", "lpt_balances")
 
     def __init__(self, owner: str = None):
         self.owner = 'Unknown wallet' if owner is None else owner
-        self.eth_balance = 0.0
-        self.token_balances = {}  # Tracks balances of any tokens (LST, CT, DS, etc.)
+        # ETH and token amounts, as shares of the accrual index of their
+        # asset once the wallet is registered with a chain (see `_index`)
+        self._eth = 0.0
+        self._shares = array("d")  # token ID -> shares (NOT_HELD if never deposited)
+        self._held = []            # IDs of the tokens held, in first-deposit order
+        self._indices = None
         self.lpt_balances = {}  # Tracks balances of Liquidity Pool Tokens (LPTs)
 
-        Wallet.add_wallet(self)
+    # copies and pickles store token names, not IDs
+    def __getstate__(self):
+        names = TOKEN_IDS.names
+        shares = {names[token_id]: self._shares[token_id] for token_id in self._held}
+        return self.owner, self._eth, shares, self._indices, self.lpt_balances
+
+    def __setstate__(self, state):
+        self.owner, self._eth, shares, self._indices, self.lpt_balances = state
+        self._shares = array("d")
+        self._held = []
+        for token, value in shares.items():
+            self._set_shares(TOKEN_IDS.intern(token), value)
+
+    # ------------------------------------------------------------------
+    # Shares and accrual indices
+    # ------------------------------------------------------------------
+    def bind_indices(self, indices: AccrualIndices):
+        """
+        Hold balances as shares of `indices` (a chain's accrual indices,
+        shared by all its wallets) from now on; the current balances keep
+        their value.
+        """
+        if indices is self._indices:
+            return
+        eth_balance, token_balances = self.eth_balance, dict(self.token_balances)
+        self._indices = indices
+        self.eth_balance = eth_balance
+        self.token_balances = token_balances
+
+    def _index_of(self, token_id: int) -> float:
+        """Current value of one share of a token (1.0 if it does not accrue)."""
+        if self._indices is None:
+            return 1.0
+        by_id = self._indices.by_id
+        if token_id < len(by_id):
+            index = by_id[token_id]
+            if index is not None:
+                return index.value
+        return 1.0
+
+    def _shares_of(self, token_id: int):
+        """Shares held of a token, or None if it was never deposited."""
+        shares = self._shares
+        if token_id < len(shares):
+            value = shares[token_id]
+            if value == value:  # not NOT_HELD
+                return value
+        return None
+
+    def _set_shares(self, token_id: int, value: float):
+        shares = self._shares
+        if token_id >= len(shares):
+            shares.extend([NOT_HELD] * (token_id + 1 - len(shares)))
+        save_item(shares, token_id)
+        if shares[token_id] != shares[token_id]:
+            save_append(self._held)
+            self._held.append(token_id)
+        shares[token_id] = value
+
+    @property
+    def eth_shares(self) -> float:
+        """ETH held, as shares of the ETH accrual index."""
+        return self._eth
+
+    def token_shares(self) -> list[tuple[str, float]]:
+        """`(token, shares)` of every token held, in first-deposit order."""
+        names = TOKEN_IDS.names
+        shares = self._shares
+        return [(names[token_id], shares[token_id]) for token_id in self._held]
+
+    @property
+    def eth_balance(self) -> float:
+        return self._eth * self._index_of(ETH_ID)
+
+    @eth_balance.setter
+    def eth_balance(self, balance: float):
+        save_attr(self, "_eth")
+        self._eth = balance / self._index_of(ETH_ID)
+
+    @property
+    def token_balances(self) -> TokenBalances:
+        return TokenBalances(self)
+
+    @token_balances.setter
+    def token_balances(self, balances: dict):
+        save_attr(self, "_shares")
+        save_attr(self, "_held")
+        self._shares = array("d")
+        self._held = []
+        for token, balance in balances.items():
+            token_id = _token_id(token)
+            self._set_shares(token_id, balance / self._index_of(token_id))
 
 
     def set_initial_balances(self, eth_balance: float, token_balances: dict = None):
@@ -33,35 +353,49 @@ class Wallet:
     def deposit_eth(self, amount: float):
         if amount < 0:
             raise ValueError("Deposit amount must be positive")
-        self.eth_balance += amount
+        self.eth_balance = self.eth_balance + amount
 
     def withdraw_eth(self, amount: float):
-        if amount > self.eth_balance:
+        index = self._index_of(ETH_ID)
+        balance = self._eth * index
+        if _exceeds(amount, balance, index):
             raise ValueError("Not enough ETH balance")
-        self.eth_balance -= amount
+        save_attr(self, "_eth")
+        self._eth = max(balance - amount, 0.0) / index
 
     # Token deposit and withdrawal (general for all token types: LST, CT, DS, etc.)
-    def deposit_token(self, token: str, amount: float):
+    def deposit_token(self, token, amount: float):
         if amount < 0:
             raise ValueError("Deposit amount must be positive")
-        if token not in self.token_balances:
-            self.token_balances[token] = 0.0
-        self.token_balances[token] += amount
+        token_id = _token_id(token)
+        index = self._index_of(token_id)
+        shares = self._shares_of(token_id)
+        self._set_shares(token_id, ((0.0 if shares is None else shares) * index + amount) / index)
 
-    def withdraw_token(self, token: str, amount: float):
-        if token not in self.token_balances or amount > self.token_balances[token]:
+    def withdraw_token(self, token, amount: float):
+        token_id = _token_id(token)
+        shares = self._shares_of(token_id)
+        if shares is None:
+            raise ValueError(f"Not enough {token} balance")
+        index = self._index_of(token_id)
+        balance = shares * index
+        if _exceeds(amount, balance, index):
             raise ValueError(f"Not enough {token} balance")
-        self.token_balances[token] -= amount
+        save_item(self._shares, token_id)
+        self._shares[token_id] = max(balance - amount, 0.0) / index
 
-    def token_balance(self, token: str) -> float:
+    def token_balance(self, token) -> float:
         """Returns the balance of a specific token (LST, CT, DS, etc.)."""
-        return self.token_balances.get(token, 0.0)
+        token_id = _token_id(token)
+        shares = self._shares_of(token_id)
+        return 0.0 if shares is None else shares * self._index_of(token_id)
 
     # LPT deposit and withdrawal
     def deposit_lpt(self, pool_name: str, amount: float):
         """Deposit Liquidity Pool Tokens (LPTs) for a given pool."""
         if amount < 0:
             raise ValueError("Deposit amount must be positive")
+        save_item(self.lpt_balances, pool_name)
         if pool_name not in self.lpt_balances:
             self.lpt_balances[pool_name] = 0.0
         self.lpt_balances[pool_name] += amount
@@ -70,6 +404,7 @@ class Wallet:
         """Withdraw Liquidity Pool Tokens (LPTs) for a given pool."""
         if pool_name not in self.lpt_balances or amount > self.lpt_balances[pool_name]:
             raise ValueError("Not enough LPT balance")
+        save_item(self.lpt_balances, pool_name)
         self.lpt_balances[pool_name] -= amount
 
     def lpt_balance(self, pool_name: str) -> float:
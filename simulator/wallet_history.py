@@ -0,0 +1,173 @@
+"""
+Delta-encoded history of agent wallet balances.
+
+Instead of copying every agent's balance dicts on every recorded block,
+`WalletDeltaTracker` writes a `wallet_deltas` row only when a balance
+actually changed: `(block, agent, kind, asset, shares)` where `kind` is
+"eth", "token" or "lpt".  Yield-bearing balances are recorded as shares of
+their accrual index (`simulator.accrual`), which only change on trades;
+the index values go to the `accrual` table once per recorded block, and
+the balances are `shares * index` as of the same block.  `WalletHistory`
+turns those rows back into full balance matrices or time series.
+"""
+
+import pandas as pd
+
+ETH = "ETH"
+KINDS = ("eth", "token", "lpt")
+
+
+class WalletDeltaTracker:
+    """Remembers the last recorded balances and emits rows for changes."""
+
+    def __init__(self):
+        self._last = {}
+
+    def reset(self):
+        self._last = {}
+
+    def record(self, block_number: int, agent_name: str, wallet, record):
+        """
+        Compare `wallet` with the last recorded state of `agent_name` and call
+        `record("wallet_deltas", row)` for every balance that changed.
+        """
+        last = self._last
+
+        key = (agent_name, "eth", ETH)
+        shares = wallet.eth_shares
+        if last.get(key) != shares:
+            last[key] = shares
+            record("wallet_deltas", (block_number, agent_name, "eth", ETH, shares))
+
+        for token, shares in wallet.token_shares():
+            key = (agent_name, "token", token)
+            if last.get(key) != shares:
+                last[key] = shares
+                record("wallet_deltas", (block_number, agent_name, "token", token, shares))
+
+        for pool, balance in wallet.lpt_balances.items():
+            key = (agent_name, "lpt", pool)
+            if last.get(key) != balance:
+                last[key] = balance
+                record("wallet_deltas", (block_number, agent_name, "lpt", pool, balance))
+
+
+class WalletHistory:
+    """
+    Reconstruction API over a `wallet_deltas` frame.
+
+    :param deltas: `Blockchain.stats["wallet_deltas"]`.
+    :param accrual: `Blockchain.stats["accrual"]`, the index values the
+                    ETH and token shares are converted with (without it,
+                    shares are reported as they are).
+    """
+
+    def __init__(self, deltas: pd.DataFrame, accrual: pd.DataFrame = None):
+        self.deltas = deltas
+        self.accrual = accrual
+
+    def _select(self, kind: str, agent=None, asset=None) -> pd.DataFrame:
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, got '{kind}'")
+        deltas = self.deltas[self.deltas["kind"] == kind]
+        if agent is not None:
+            deltas = deltas[deltas["agent"] == agent]
+        if asset is not None:
+            deltas = deltas[deltas["asset"] == asset]
+        return deltas
+
+    def _index_values(self, blocks, assets) -> pd.DataFrame:
+        """Index value of each asset (columns) as of each block (rows); 1.0 if it does not accrue."""
+        values = pd.DataFrame(1.0, index=pd.Index(blocks, name="block"), columns=pd.Index(assets).unique())
+        if self.accrual is None or values.empty:
+            return values
+        accrual = self.accrual[self.accrual["asset"].isin(values.columns)]
+        if accrual.empty:
+            return values
+        series = accrual.pivot_table(index="block", columns="asset", values="value", aggfunc="last")
+        series = series.reindex(series.index.union(values.index)).ffill().loc[values.index]
+        values.update(series)
+        return values
+
+    def balances_at(self, block: int, kind: str = "token") -> pd.DataFrame:
+        """
+        Balance matrix (agents x assets) as of `block`.
+
+        Assets an agent never held are NaN.
+        """
+        deltas = self._select(kind)
+        deltas = deltas[deltas["block"] <= block]
+        latest = deltas.groupby(["agent", "asset"], sort=False)["shares"].last().unstack("asset")
+        if kind == "lpt":
+            return latest
+        return latest * self._index_values([block], latest.columns).iloc[0]
+
+    def balance_series(self, agent=None, asset=None, kind: str = "token",
+                       blocks=None) -> pd.DataFrame:
+        """
+        Balances over time, one column per (agent, asset), indexed by block.
+
+        :param agent: Restrict to one agent.
+        :param asset: Restrict to one token / pool.
+        :param kind: "eth", "token" or "lpt".
+        :param blocks: Blocks to report (default: every block with a change,
+                       balance or index).
+        """
+        deltas = self._select(kind, agent, asset)
+        series = deltas.pivot_table(
+            index="block", columns=["agent", "asset"], values="shares", aggfunc="last"
+        )
+        if kind == "lpt":
+            if blocks is not None:
+                return series.reindex(series.index.union(blocks)).ffill().loc[blocks]
+            return series.ffill()
+
+        assets = series.columns.get_level_values("asset")
+        if blocks is None:
+            blocks = series.index
+            if self.accrual is not None:
+                accrual_blocks = self.accrual.loc[self.accrual["asset"].isin(assets), "block"]
+                blocks = blocks.union(accrual_blocks[accrual_blocks >= blocks.min()] if len(blocks) else [])
+        series = series.reindex(series.index.union(blocks)).ffill().loc[blocks]
+        values = self._index_values(series.index, assets)
+        return series * values[assets].to_numpy()
+
+
+def attach_balance_dicts(agents: pd.DataFrame, deltas: pd.DataFrame,
+                         accrual: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Add the `wallet_token_balances` / `wallet_lpt_balances` dict columns to
+    an agents frame, rebuilt from the wallet deltas (token shares times the
+    `accrual` index values of the same block).
+    """
+    token_dicts = []
+    lpt_dicts = []
+    current = {}
+    index_values = {}
+    delta_rows = deltas[["block", "agent", "kind", "asset", "shares"]].itertuples(index=False)
+    pending = next(delta_rows, None)
+    if accrual is None:
+        accrual = pd.DataFrame(columns=["block", "asset", "value"])
+    accrual_rows = accrual[["block", "asset", "value"]].itertuples(index=False)
+    pending_index = next(accrual_rows, None)
+
+    for block, agent in zip(agents["block"], agents["agent"]):
+        while pending is not None and pending[0] <= block:
+            _, delta_agent, kind, asset, shares = pending
+            if kind != "eth":
+                current.setdefault((delta_agent, kind), {})[asset] = shares
+            pending = next(delta_rows, None)
+        while pending_index is not None and pending_index[0] <= block:
+            _, asset, value = pending_index
+            index_values[asset] = value
+            pending_index = next(accrual_rows, None)
+        token_dicts.append({
+            token: shares * index_values.get(token, 1.0)
+            for token, shares in current.get((agent, "token"), {}).items()
+        })
+        lpt_dicts.append(dict(current.get((agent, "lpt"), {})))
+
+    agents = agents.copy()
+    agents["wallet_token_balances"] = token_dicts
+    agents["wallet_lpt_balances"] = lpt_dicts
+    return agents